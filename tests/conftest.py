@@ -0,0 +1,7 @@
+import pathlib
+import sys
+
+# The helper's modules import each other from its own directory.
+sys.path.insert(
+    0, str(pathlib.Path(__file__).parent.parent / "train_conductor_world_helper")
+)
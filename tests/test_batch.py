@@ -0,0 +1,25 @@
+import pathlib
+
+import batch
+
+DATA_DIR = pathlib.Path(__file__).parent.parent / "data"
+
+
+def test_a_broken_map_only_fails_its_own_result(tmp_path: pathlib.Path):
+    broken_path = tmp_path / "broken.tmx"
+    broken_path.write_text(
+        '<?xml version="1.0"?>\n<map version="1.0"><layer name="map"/></map>\n',
+        encoding="utf8",
+    )
+    results = list(
+        batch.validate_maps(
+            tmx_paths=[DATA_DIR / "test.tmx", broken_path, DATA_DIR / "test.tmx"],
+            distances_path=DATA_DIR / "distances.json",
+            tiles_path=DATA_DIR / "tiles.json",
+            workers=1,
+        )
+    )
+
+    assert [("error" in result) for result in results] == [False, True, False]
+    assert results[1]["path"] == str(broken_path)
+    assert results[0]["distances"] == results[2]["distances"]
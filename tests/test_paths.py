@@ -0,0 +1,50 @@
+import pathlib
+
+import pytest
+
+import data
+import graphing.pathing.paths
+import helper
+import replay
+import snapshot
+
+DATA_DIR = pathlib.Path(__file__).parent.parent / "data"
+
+
+@pytest.mark.parametrize(
+    "hierarchy_min_cells", [0, graphing.pathing.paths.HIERARCHY_MIN_CELLS]
+)
+def test_distance_matches_route_distance_across_edits(
+    monkeypatch: pytest.MonkeyPatch,
+    hierarchy_min_cells: int,
+):
+    monkeypatch.setattr(
+        graphing.pathing.paths, "HIERARCHY_MIN_CELLS", hierarchy_min_cells
+    )
+    world_data = data.Data(
+        distances_filename=DATA_DIR / "distances.json",
+        tiles_filename=DATA_DIR / "tiles.json",
+        port_limit=helper.PORT_LIMIT,
+    )
+    layer_name_to_grid = replay.read_layer_grids(DATA_DIR / "train-conductor-world.tmx")
+    track_grid = [list(row) for row in layer_name_to_grid[helper.TRACKS_LAYER_NAME]]
+    for save in replay.synthetic_saves(
+        layer_name_to_grid=layer_name_to_grid,
+        world_data=world_data,
+        edits=replay.SyntheticEdits(count=8, edits_per_save=3, seed=0),
+    ):
+        for x, y, tile_id in save.layer_name_to_cells[helper.TRACKS_LAYER_NAME]:
+            track_grid[y][x] = tile_id
+        paths = snapshot.Snapshot.from_matrices_and_data(
+            map_matrix=layer_name_to_grid[helper.MAP_LAYER_NAME],
+            track_matrix=track_grid,
+            world_data=world_data,
+        ).paths
+
+        for port_name, city_name in world_data.port_to_city_name_pairs:
+            distance = paths.distance_between(port_name=port_name, city_name=city_name)
+            route_distance = paths.route_distance_between(
+                port_name=port_name,
+                city_name=city_name,
+            )
+            assert distance == route_distance, (port_name, city_name)
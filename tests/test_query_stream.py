@@ -0,0 +1,32 @@
+import json
+import pathlib
+
+import helper
+import query_stream
+
+DATA_DIR = pathlib.Path(__file__).parent.parent / "data"
+
+
+def test_invalid_queries_are_answered_without_stopping_the_stream():
+    map_helper = helper.Helper(
+        distances_path=DATA_DIR / "distances.json",
+        tiles_path=DATA_DIR / "tiles.json",
+        tmx_path=DATA_DIR / "test.tmx",
+    )
+    lines = [
+        '{"query": ["x"]}',
+        '{"query": "what_if", "edits": 5}',
+        "not json",
+        '{"query": "distance", "port": "Dijon", "city": "Lyon"}',
+    ]
+
+    responses = [
+        json.loads(line)
+        for line in query_stream.answer_lines(
+            lines=lines,
+            path_to_helper={DATA_DIR / "test.tmx": map_helper},
+        )
+    ]
+
+    assert [set(response) for response in responses[:3]] == [{"error"}] * 3
+    assert responses[3]["port"] == "Dijon"
@@ -0,0 +1,112 @@
+import pathlib
+import random
+
+import pytest
+
+import data
+import helper
+import replay
+import snapshot
+import tmx.tiled_map
+import what_if
+
+DATA_DIR = pathlib.Path(__file__).parent.parent / "data"
+
+
+def read_snapshot(filename: pathlib.Path) -> snapshot.Snapshot:
+    tiled_map = tmx.tiled_map.TiledMap(filename=filename)
+    return snapshot.Snapshot.from_matrices_and_data(
+        map_matrix=tiled_map.get_layer_data(name=helper.MAP_LAYER_NAME),
+        track_matrix=tiled_map.get_layer_data(name=helper.TRACKS_LAYER_NAME),
+        world_data=data.Data(
+            distances_filename=DATA_DIR / "distances.json",
+            tiles_filename=DATA_DIR / "tiles.json",
+            port_limit=helper.PORT_LIMIT,
+        ),
+    )
+
+
+@pytest.fixture(scope="module", name="world_snapshot")
+def fixture_world_snapshot() -> snapshot.Snapshot:
+    return read_snapshot(DATA_DIR / "test.tmx")
+
+
+def rebuild(world_snapshot: snapshot.Snapshot) -> snapshot.Snapshot:
+    track_map = world_snapshot.world_map.track_map
+    return snapshot.Snapshot.from_matrices_and_data(
+        map_matrix=[
+            [0 if tile is None else tile.id for tile in row]
+            for row in world_snapshot.world_map.tile_map.grid
+        ],
+        track_matrix=[
+            [0 if tile is None else tile.id for tile in row] for row in track_map.grid
+        ],
+        world_data=world_snapshot.world_data,
+    )
+
+
+def assert_matches_rebuild(
+    world_snapshot: snapshot.Snapshot,
+    edits: list[what_if.TrackEdit],
+) -> None:
+    world_data = world_snapshot.world_data
+    outcome = what_if.evaluate(world_snapshot=world_snapshot, edits=edits)
+    rebuilt_snapshot = rebuild(outcome.after)
+
+    assert outcome.new_unrouted_edges == sorted(
+        rebuilt_snapshot.paths.unrouted_edges - world_snapshot.paths.unrouted_edges
+    )
+    # The distances validation reports, rather than those what-if searches for.
+    assert outcome.distance_changes == [
+        (port_name, city_name, expected_distance, distance_before, distance_after)
+        for port_name, city_name in world_data.port_to_city_name_pairs
+        for expected_distance in [
+            world_data.distance_between(port_name=port_name, city_name=city_name)
+        ]
+        for distance_before, distance_after in [
+            (
+                world_snapshot.paths.distance_between(port_name, city_name),
+                rebuilt_snapshot.paths.distance_between(port_name, city_name),
+            )
+        ]
+        if distance_before != distance_after
+    ]
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_what_if_matches_a_rebuild(world_snapshot: snapshot.Snapshot, seed: int):
+    generator = random.Random(seed)
+    world_data = world_snapshot.world_data
+    track_tiles = list(world_snapshot.world_map.track_map)
+    assert_matches_rebuild(
+        world_snapshot=world_snapshot,
+        edits=[
+            what_if.TrackEdit(
+                x=track_tile.coordinate.x,
+                y=track_tile.coordinate.y,
+                tile_id=generator.choice([0, *world_data.track_tile_ids]),
+            )
+            for track_tile in generator.sample(track_tiles, k=3)
+        ],
+    )
+
+
+def test_what_if_matches_a_rebuild_of_the_world_map():
+    # These edits leave every shortest path from Grimsby to Bruges doubling back on
+    # a cell, while a longer valid route remains.
+    world_snapshot = read_snapshot(DATA_DIR / "train-conductor-world.tmx")
+    saves = replay.synthetic_saves(
+        layer_name_to_grid=replay.read_layer_grids(
+            DATA_DIR / "train-conductor-world.tmx"
+        ),
+        world_data=world_snapshot.world_data,
+        edits=replay.SyntheticEdits(count=2, edits_per_save=3, seed=0),
+    )
+    assert_matches_rebuild(
+        world_snapshot=world_snapshot,
+        edits=[
+            what_if.TrackEdit(x=x, y=y, tile_id=tile_id)
+            for save in saves
+            for x, y, tile_id in save.layer_name_to_cells[helper.TRACKS_LAYER_NAME]
+        ],
+    )
@@ -3,20 +3,28 @@ Contains classes used for creating annotations through adding layers to the tmx
 """
 
 import dataclasses
+import enum
 import logging
 
 import annotations.connection_annotators
+import annotations.connection_object_annotators
+import annotations.layer_cache
 
 # Type checking
 import data
 import graphing.pathing
 import tmx.tiled_map
 
-EMPTY_TILE_ID = 0
-
 logger = logging.getLogger(__name__)
 
 
+class AnnotationFormat(enum.Enum):
+    """Represents how annotations are written to the tmx file."""
+
+    TILES = "tiles"
+    OBJECTS = "objects"
+
+
 @dataclasses.dataclass
 class Annotator:
     """Adds annotations through layers to the supplied tmx file."""
@@ -24,23 +32,66 @@ class Annotator:
     tiled_map: tmx.tiled_map.TiledMap
     paths: graphing.pathing.paths.Paths
     world_data: data.Data
+    layer_cache: annotations.layer_cache.LayerCache = dataclasses.field(
+        default_factory=annotations.layer_cache.LayerCache,
+    )
+    annotation_format: AnnotationFormat = AnnotationFormat.TILES
 
     def __post_init__(self):
         self.width = self.tiled_map.width
         self.height = self.tiled_map.height
-        self.annotation_layers: list[tmx.layers.layer] = []
+        self.annotation_layers: list[tmx.layers.Layer] = []
 
     def annotate_connections(self) -> None:
         """Annotates the port and city connections of the tmx file."""
+        match self.annotation_format:
+            case AnnotationFormat.TILES:
+                self._annotate_connection_tiles()
+            case AnnotationFormat.OBJECTS:
+                self._annotate_connection_objects()
+            case _:
+                raise ValueError(f"Unknown annotation format {self.annotation_format}.")
+
+    def _annotate_connection_tiles(self) -> None:
         annotator = annotations.connection_annotators.ConnectionsAnnotator(
             width=self.width,
             height=self.height,
             layer_name="Annotations",
             world_data=self.world_data,
             paths=self.paths,
+            layer_cache=self.layer_cache,
         )
         logger.info("Creating layers...")
         annotation_layer = annotator.create_layer()
+        logger.debug("Layer cache: %s", self.layer_cache)
+        self.annotation_layers.append(annotation_layer)
+
+    def _annotate_connection_objects(self) -> None:
+        annotator = annotations.connection_object_annotators.ConnectionObjectsAnnotator(
+            width=self.width,
+            height=self.height,
+            tile_width=self.tiled_map.tile_width,
+            tile_height=self.tiled_map.tile_height,
+            layer_name="Annotation Objects",
+            world_data=self.world_data,
+            paths=self.paths,
+        )
+        logger.info("Creating object layers...")
+        annotation_layer = annotator.create_layer()
+        self.annotation_layers.append(annotation_layer)
+
+    def annotate_shortest_bounds(self) -> None:
+        """Annotates every shortest valid route of each port and city connection."""
+        annotator = annotations.connection_annotators.ShortestBoundsAnnotator(
+            width=self.width,
+            height=self.height,
+            layer_name="Shortest Bounds",
+            world_data=self.world_data,
+            paths=self.paths,
+            layer_cache=self.layer_cache,
+        )
+        logger.info("Creating shortest bounds layers...")
+        annotation_layer = annotator.create_layer()
         self.annotation_layers.append(annotation_layer)
 
     def save(self):
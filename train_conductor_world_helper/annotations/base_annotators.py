@@ -1,11 +1,14 @@
 """Holds the base annotators for creating tmx layers."""
+import array
 import dataclasses
 import typing
 
+import data
 import mapping.coordinate
+import metrics
 import tmx.layers
 
-EMPTY_TILE_ID = 0
+TILE_BUFFER_TYPECODE = "I"
 
 
 class LayerAnnotator:
@@ -26,37 +29,66 @@ class TileLayerAnnotator(LayerAnnotator):
 
     def create_layer(self) -> tmx.layers.TileLayer:
         """Creates and returns a tile layer."""
-        layer_data = self._create_data()
-        layer = tmx.layers.TileLayer(
+        layer_buffer = self._create_buffer()
+        layer = tmx.layers.TileLayer.from_buffer(
             name=self.layer_name,
-            data=layer_data,
+            buffer=layer_buffer,
+            width=self.width,
         )
         return layer
 
-    def _create_data(self) -> list[list[int]]:
-        return [
-            [
-                self._coordinate_to_tile_id(mapping.coordinate.Coordinate(x, y))
-                for x in range(self.width)
-            ]
-            for y in range(self.height)
-        ]
+    def _create_buffer(self) -> array.array:
+        """Returns the row major tile ids of the layer."""
+        width = self.width
+        buffer = array.array(TILE_BUFFER_TYPECODE, [data.EMPTY_TILE_ID]) * (
+            width * self.height
+        )
+        for coordinate, tile_id in self.coordinate_to_tile_ids():
+            buffer[coordinate.y * width + coordinate.x] = tile_id
+        metrics.count(
+            metrics.ANNOTATION_CELLS_WRITTEN,
+            len(buffer) - buffer.count(data.EMPTY_TILE_ID),
+        )
+        return buffer
 
-    def coordinate_to_tile_id(
+    def coordinate_to_tile_ids(
         self,
-        coordinate: mapping.coordinate.Coordinate,
-    ) -> int:
-        """Returns a tile id given a coordinate."""
+    ) -> typing.Iterable[tuple[mapping.coordinate.Coordinate, int]]:
+        """
+        Returns the coordinates to be annotated and their tile ids.
+
+        Coordinates that are not returned are left as empty tiles.
+        """
+        raise NotImplementedError
+
+
+@dataclasses.dataclass
+class ObjectGroupAnnotator(LayerAnnotator):
+    """Base annotator for layers with objects."""
+
+    tile_width: int
+    tile_height: int
+    layer_name: str
+
+    def create_layer(self) -> tmx.layers.ObjectGroup:
+        """Creates and returns an object group layer."""
+        layer = tmx.layers.ObjectGroup(
+            name=self.layer_name,
+            objects=list(self.create_objects()),
+        )
+        return layer
+
+    def create_objects(self) -> typing.Iterable[tmx.layers.MapObject]:
+        """Returns the objects to be added to the layer."""
         raise NotImplementedError
 
-    def _coordinate_to_tile_id(
+    def to_pixels(
         self,
-        coordinate: mapping.coordinate.Coordinate,
-    ) -> int:
-        try:
-            return self.coordinate_to_tile_id(coordinate=coordinate)
-        except KeyError:
-            return EMPTY_TILE_ID
+        x: float,
+        y: float,
+    ) -> tuple[float, float]:
+        """Returns the pixel position of the centre of the given grid position."""
+        return (x + 0.5) * self.tile_width, (y + 0.5) * self.tile_height
 
 
 @dataclasses.dataclass
@@ -1,9 +1,11 @@
 """Holds the annotators for creating connection annotation layers."""
+import array
 import dataclasses
 import functools
 import typing
 
 import annotations.base_annotators
+import annotations.layer_cache
 import data
 import graphing.pathing.paths
 import mapping.coordinate
@@ -16,24 +18,48 @@ class ConnectionTileLayerAnnotator(annotations.base_annotators.TileLayerAnnotato
 
     world_data: data.Data
     city_name: str
+    layer_cache: annotations.layer_cache.LayerCache
 
-    def coordinate_to_connection_component(
-        self, coordinate: mapping.coordinate.Coordinate
-    ) -> PathComponent:
+    def coordinate_to_connection_components(
+        self,
+    ) -> dict[mapping.coordinate.Coordinate, PathComponent]:
+        """Returns the connection component to annotate at each coordinate."""
         raise NotImplementedError
 
-    def coordinate_to_tile_id(
+    @functools.cached_property
+    def _coordinate_to_connection_components(
         self,
-        coordinate: mapping.coordinate.Coordinate,
-    ) -> int:
-        connection_component = self.coordinate_to_connection_component(
-            coordinate=coordinate,
+    ) -> dict[mapping.coordinate.Coordinate, PathComponent]:
+        return self.coordinate_to_connection_components()
+
+    @property
+    def fingerprint(self) -> annotations.layer_cache.Fingerprint:
+        """Returns a fingerprint of everything the layer data is created from."""
+        return (
+            self.width,
+            self.height,
+            self.city_name,
+            tuple(self._coordinate_to_connection_components.items()),
+        )
+
+    def _create_buffer(self) -> array.array:
+        return self.layer_cache.get_or_create(
+            key=self.fingerprint,
+            create_value=super()._create_buffer,
         )
-        tile_id = self.world_data.tile_id_from(
+
+    def coordinate_to_tile_ids(
+        self,
+    ) -> typing.Iterable[tuple[mapping.coordinate.Coordinate, int]]:
+        tile_id_table = self.world_data.connection_tile_ids_of(
             city_name=self.city_name,
-            connection_component=connection_component,
         )
-        return tile_id
+        return (
+            (coordinate, tile_id_table[connection_component.value])
+            for coordinate, connection_component in (
+                self._coordinate_to_connection_components.items()
+            )
+        )
 
 
 @dataclasses.dataclass
@@ -43,10 +69,9 @@ class CityToPortConnectionAnnotator(ConnectionTileLayerAnnotator):
     world_data: data.Data
     paths: graphing.pathing.paths.Paths
 
-    @functools.cached_property
-    def _coordinate_to_merged_path_component(
+    def coordinate_to_connection_components(
         self,
-    ) -> dict[mapping.coordinate.Coordinate, PathComponent,]:
+    ) -> dict[mapping.coordinate.Coordinate, PathComponent]:
         city_name = self.city_name
         city_coordinate_to_path_components = {}
         for port_name in self.world_data.port_names_of(city_name=city_name):
@@ -54,15 +79,15 @@ class CityToPortConnectionAnnotator(ConnectionTileLayerAnnotator):
                 port_name=port_name, city_name=city_name
             )
             for coordinate, path_component in coordinate_to_path_component.items():
-                city_coordinate_to_path_components[coordinate] |= path_component
+                city_coordinate_to_path_components[coordinate] = (
+                    city_coordinate_to_path_components.get(
+                        coordinate,
+                        PathComponent.NONE,
+                    )
+                    | path_component
+                )
         return city_coordinate_to_path_components
 
-    def coordinate_to_connection_component(
-        self,
-        coordinate: mapping.coordinate.Coordinate,
-    ) -> PathComponent:
-        return self._coordinate_to_merged_path_component[coordinate]
-
 
 @dataclasses.dataclass
 class CityConnectionsAnnotator(annotations.base_annotators.GroupLayerAnnotator):
@@ -70,6 +95,7 @@ class CityConnectionsAnnotator(annotations.base_annotators.GroupLayerAnnotator):
 
     world_data: data.Data
     paths: graphing.pathing.paths.Paths
+    layer_cache: annotations.layer_cache.LayerCache
 
     def child_annotators(
         self,
@@ -82,6 +108,7 @@ class CityConnectionsAnnotator(annotations.base_annotators.GroupLayerAnnotator):
                 city_name=city_name,
                 world_data=self.world_data,
                 paths=self.paths,
+                layer_cache=self.layer_cache,
             )
             for city_name in self.world_data.city_names
         )
@@ -96,21 +123,14 @@ class PortToCityConnectionAnnotator(ConnectionTileLayerAnnotator):
     world_data: data.Data
     paths: graphing.pathing.paths.Paths
 
-    @functools.cached_property
-    def _coordinate_to_path_component(
+    def coordinate_to_connection_components(
         self,
-    ) -> dict[mapping.coordinate.Coordinate, PathComponent,]:
+    ) -> dict[mapping.coordinate.Coordinate, PathComponent]:
         return self.paths.connection_path(
             port_name=self.port_name,
             city_name=self.city_name,
         )
 
-    def coordinate_to_connection_component(
-        self,
-        coordinate: mapping.coordinate.Coordinate,
-    ) -> PathComponent:
-        return self._coordinate_to_path_component[coordinate]
-
 
 @dataclasses.dataclass
 class PortConnectionAnnotator(annotations.base_annotators.GroupLayerAnnotator):
@@ -119,6 +139,7 @@ class PortConnectionAnnotator(annotations.base_annotators.GroupLayerAnnotator):
     port_name: str
     world_data: data.Data
     paths: graphing.pathing.paths.Paths
+    layer_cache: annotations.layer_cache.LayerCache
 
     def child_annotators(
         self,
@@ -132,6 +153,7 @@ class PortConnectionAnnotator(annotations.base_annotators.GroupLayerAnnotator):
                 city_name=city_name,
                 world_data=self.world_data,
                 paths=self.paths,
+                layer_cache=self.layer_cache,
             )
             for city_name in self.world_data.city_names_from(
                 port_name=self.layer_name,
@@ -145,6 +167,7 @@ class PortConnectionsAnnotator(annotations.base_annotators.GroupLayerAnnotator):
 
     world_data: data.Data
     paths: graphing.pathing.paths.Paths
+    layer_cache: annotations.layer_cache.LayerCache
 
     def child_annotators(
         self,
@@ -157,6 +180,7 @@ class PortConnectionsAnnotator(annotations.base_annotators.GroupLayerAnnotator):
                 port_name=port_name,
                 world_data=self.world_data,
                 paths=self.paths,
+                layer_cache=self.layer_cache,
             )
             for port_name in self.world_data.port_names
         )
@@ -168,6 +192,7 @@ class ConnectionsAnnotator(annotations.base_annotators.GroupLayerAnnotator):
 
     world_data: data.Data
     paths: graphing.pathing.paths.Paths
+    layer_cache: annotations.layer_cache.LayerCache
 
     def child_annotators(
         self,
@@ -178,6 +203,7 @@ class ConnectionsAnnotator(annotations.base_annotators.GroupLayerAnnotator):
             layer_name="City Connections",
             world_data=self.world_data,
             paths=self.paths,
+            layer_cache=self.layer_cache,
         )
         port_annotator = PortConnectionsAnnotator(
             width=self.width,
@@ -185,5 +211,78 @@ class ConnectionsAnnotator(annotations.base_annotators.GroupLayerAnnotator):
             layer_name="Port Connections",
             world_data=self.world_data,
             paths=self.paths,
+            layer_cache=self.layer_cache,
         )
         return city_annotator, port_annotator
+
+
+@dataclasses.dataclass
+class PortToCityShortestBoundsAnnotator(ConnectionTileLayerAnnotator):
+    """A layer of every shortest valid route between a port and a city."""
+
+    port_name: str
+    city_name: str
+    world_data: data.Data
+    paths: graphing.pathing.paths.Paths
+
+    def coordinate_to_connection_components(
+        self,
+    ) -> dict[mapping.coordinate.Coordinate, PathComponent]:
+        return self.paths.shortest_bounds(
+            port_name=self.port_name,
+            city_name=self.city_name,
+        )
+
+
+@dataclasses.dataclass
+class PortShortestBoundsAnnotator(annotations.base_annotators.GroupLayerAnnotator):
+    """A group layer for the shortest bounds of a port's city connections."""
+
+    port_name: str
+    world_data: data.Data
+    paths: graphing.pathing.paths.Paths
+    layer_cache: annotations.layer_cache.LayerCache
+
+    def child_annotators(
+        self,
+    ) -> typing.Iterable[annotations.base_annotators.LayerAnnotator]:
+        return (
+            PortToCityShortestBoundsAnnotator(
+                width=self.width,
+                height=self.height,
+                layer_name=city_name,
+                port_name=self.port_name,
+                city_name=city_name,
+                world_data=self.world_data,
+                paths=self.paths,
+                layer_cache=self.layer_cache,
+            )
+            for city_name in self.world_data.city_names_from(
+                port_name=self.port_name,
+            )
+        )
+
+
+@dataclasses.dataclass
+class ShortestBoundsAnnotator(annotations.base_annotators.GroupLayerAnnotator):
+    """A group layer of ports and the shortest bounds of their connections."""
+
+    world_data: data.Data
+    paths: graphing.pathing.paths.Paths
+    layer_cache: annotations.layer_cache.LayerCache
+
+    def child_annotators(
+        self,
+    ) -> typing.Iterable[annotations.base_annotators.LayerAnnotator]:
+        return (
+            PortShortestBoundsAnnotator(
+                width=self.width,
+                height=self.height,
+                layer_name=port_name,
+                port_name=port_name,
+                world_data=self.world_data,
+                paths=self.paths,
+                layer_cache=self.layer_cache,
+            )
+            for port_name in self.world_data.port_names
+        )
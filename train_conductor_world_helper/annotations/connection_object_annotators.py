@@ -0,0 +1,90 @@
+"""Holds the annotators for creating connection annotation object layers."""
+import dataclasses
+import typing
+
+import annotations.base_annotators
+import data
+import graphing.pathing.paths
+import tmx.layers
+
+
+@dataclasses.dataclass
+class PortConnectionObjectsAnnotator(annotations.base_annotators.ObjectGroupAnnotator):
+    """An object layer of polylines from a port to each of its cities."""
+
+    port_name: str
+    world_data: data.Data
+    paths: graphing.pathing.paths.Paths
+
+    def create_objects(self) -> typing.Iterable[tmx.layers.MapObject]:
+        port_name = self.port_name
+        tile_map = self.paths.world_map.tile_map
+        for city_name in self.world_data.city_names_from(port_name=port_name):
+            properties = {
+                "port": port_name,
+                "city": city_name,
+                "expected_distance": self.world_data.distance_between(
+                    port_name=port_name,
+                    city_name=city_name,
+                ),
+                "actual_distance": self.paths.distance_between(
+                    port_name=port_name,
+                    city_name=city_name,
+                ),
+            }
+            nodes = self.paths.connection_nodes(
+                port_name=port_name,
+                city_name=city_name,
+            )
+            if not nodes:
+                city_coordinate = tile_map.coordinate_of(city_name)
+                x, y = self.to_pixels(city_coordinate.x, city_coordinate.y)
+                yield tmx.layers.MapObject(
+                    name=city_name,
+                    x=x,
+                    y=y,
+                    properties=properties,
+                )
+                continue
+
+            port_coordinate = tile_map.coordinate_of(port_name)
+            city_coordinate = tile_map.coordinate_of(city_name)
+            positions = [
+                (port_coordinate.x, port_coordinate.y),
+                *((node.x, node.y) for node in nodes),
+                (city_coordinate.x, city_coordinate.y),
+            ]
+            pixels = [self.to_pixels(x, y) for x, y in positions]
+            origin_x, origin_y = pixels[0]
+            yield tmx.layers.MapObject(
+                name=city_name,
+                x=origin_x,
+                y=origin_y,
+                points=[(x - origin_x, y - origin_y) for x, y in pixels],
+                properties=properties,
+            )
+
+
+@dataclasses.dataclass
+class ConnectionObjectsAnnotator(annotations.base_annotators.GroupLayerAnnotator):
+    """A group layer of object layers for each port and its connections."""
+
+    tile_width: int
+    tile_height: int
+    world_data: data.Data
+    paths: graphing.pathing.paths.Paths
+
+    def child_annotators(
+        self,
+    ) -> typing.Iterable[annotations.base_annotators.LayerAnnotator]:
+        return (
+            PortConnectionObjectsAnnotator(
+                tile_width=self.tile_width,
+                tile_height=self.tile_height,
+                layer_name=port_name,
+                port_name=port_name,
+                world_data=self.world_data,
+                paths=self.paths,
+            )
+            for port_name in self.world_data.port_names
+        )
@@ -0,0 +1,26 @@
+"""Holds the cache used to reuse annotation layer buffers between updates."""
+import array
+import typing
+
+import lru_cache
+
+DEFAULT_MAX_SIZE = 256
+
+Fingerprint = typing.Hashable
+
+
+class LayerCache(lru_cache.LruCache[Fingerprint, array.array]):
+    """
+    A bounded least recently used cache of annotation layer buffers.
+
+    Entries are keyed by a fingerprint of everything the layer buffer was created
+    from, so a layer is only rebuilt when its fingerprint changes. Buffers are
+    shared between lookups and must not be modified.
+    """
+
+    def __init__(
+        self,
+        max_size: int = DEFAULT_MAX_SIZE,
+    ) -> None:
+        # Fewer than the default of the base cache, as each buffer spans the map.
+        super().__init__(max_size=max_size)
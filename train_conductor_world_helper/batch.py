@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+
+"""Validates many maps, such as the revisions of a map, across a pool of processes."""
+
+import concurrent.futures
+import json
+import logging
+import os
+import pathlib
+import sys
+import typing
+
+import click
+
+import data
+import helper
+import mapping.placements
+import queries
+import snapshot
+import tmx.tiled_map
+
+DATA_DIR = pathlib.Path("./data/")
+DEFAULT_DISTANCES_FILENAME = DATA_DIR / "distances.json"
+DEFAULT_TILES_FILENAME = DATA_DIR / "tiles.json"
+
+logger = logging.getLogger(__name__)
+
+Result = dict[str, typing.Any]
+
+# The data shared by every map validated in a worker, loaded once by each worker.
+_world_data: data.Data | None = None
+_placement_table: mapping.placements.PlacementTable | None = None
+
+
+def load_data(
+    distances_path: os.PathLike,
+    tiles_path: os.PathLike,
+) -> None:
+    """Loads the data that the maps validated in this process are checked against."""
+    global _world_data, _placement_table  # pylint: disable=global-statement
+    # The warnings of each map would interleave, only its result is of interest.
+    logging.getLogger().setLevel(logging.ERROR)
+    _world_data = data.Data(
+        distances_filename=distances_path,
+        tiles_filename=tiles_path,
+        port_limit=helper.PORT_LIMIT,
+    )
+    _placement_table = mapping.placements.PlacementTable(world_data=_world_data)
+
+
+def validate_map(tmx_path: os.PathLike) -> Result:
+    """
+    Returns the track count, unused edges, validation errors and distance of every
+    connection of the map, or the error that stopped it from being validated.
+    """
+    try:
+        return _validate_map(tmx_path)
+    # Any broken map must only fail its own result, not the maps validated after it.
+    except Exception as error:  # pylint: disable=broad-exception-caught
+        return {"path": str(tmx_path), "error": f"{type(error).__name__}: {error}"}
+
+
+def _validate_map(tmx_path: os.PathLike) -> Result:
+    tiled_map = tmx.tiled_map.TiledMap(filename=tmx_path)
+    world_snapshot = snapshot.Snapshot.from_matrices_and_data(
+        map_matrix=tiled_map.get_layer_data(name=helper.MAP_LAYER_NAME),
+        track_matrix=tiled_map.get_layer_data(name=helper.TRACKS_LAYER_NAME),
+        world_data=_world_data,
+        placement_table=_placement_table,
+    )
+    paths = world_snapshot.paths
+    return {
+        "path": str(tmx_path),
+        "tracks": world_snapshot.track_coordinates_table.total,
+        "unused_edges": len(paths.unused_edges),
+        **queries.answer(world_snapshot, {"query": "validation"}),
+        "distances": [
+            {
+                "port": port_name,
+                "city": city_name,
+                "expected_distance": _world_data.distance_between(
+                    port_name=port_name,
+                    city_name=city_name,
+                ),
+                "actual_distance": paths.distance_between(
+                    port_name=port_name,
+                    city_name=city_name,
+                ),
+            }
+            for port_name, city_name in _world_data.port_to_city_name_pairs
+        ],
+    }
+
+
+def validate_maps(
+    tmx_paths: list[os.PathLike],
+    distances_path: os.PathLike,
+    tiles_path: os.PathLike,
+    workers: int | None = None,
+) -> typing.Iterator[Result]:
+    """
+    Yields the result of validating each map in the order of the paths, validating
+    the maps concurrently across the worker processes.
+    """
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=load_data,
+        initargs=(distances_path, tiles_path),
+    ) as executor:
+        yield from executor.map(validate_map, tmx_paths)
+
+
+def distance_changes(
+    previous_result: Result,
+    result: Result,
+) -> list[tuple[str, str, int, int, int]]:
+    """
+    Returns the port name, city name, expected distance, previous distance and
+    distance of each connection whose distance changed between the results.
+    """
+    connection_to_previous_distance = {
+        (distance["port"], distance["city"]): distance["actual_distance"]
+        for distance in previous_result["distances"]
+    }
+    return [
+        (
+            distance["port"],
+            distance["city"],
+            distance["expected_distance"],
+            previous_distance,
+            distance["actual_distance"],
+        )
+        for distance in result["distances"]
+        for previous_distance in [
+            connection_to_previous_distance.get((distance["port"], distance["city"]))
+        ]
+        if previous_distance != distance["actual_distance"]
+    ]
+
+
+def read_paths_file(paths_file: typing.TextIO) -> list[pathlib.Path]:
+    """Returns the paths listed one per line in the file, skipping blank lines."""
+    return [pathlib.Path(line.strip()) for line in paths_file if line.strip()]
+
+
+@click.command()
+@click.argument(
+    "tmx_paths",
+    nargs=-1,
+    type=click.Path(dir_okay=False),
+)
+@click.option(
+    "--paths-file",
+    help="File listing the tmx files to validate one per line, after any arguments.",
+    type=click.File(encoding="utf8"),
+    default=None,
+)
+@click.option(
+    "--distances-path",
+    help="Path to distances json file.",
+    default=DEFAULT_DISTANCES_FILENAME,
+)
+@click.option(
+    "--tiles-path",
+    help="Path to tile json file.",
+    default=DEFAULT_TILES_FILENAME,
+)
+@click.option(
+    "--workers",
+    help="Number of worker processes. Defaults to the number of CPUs.",
+    type=click.IntRange(min=1),
+    default=None,
+)
+def main(
+    tmx_paths: tuple[str, ...],
+    paths_file: typing.TextIO | None,
+    distances_path: pathlib.Path,
+    tiles_path: pathlib.Path,
+    workers: int | None,
+) -> None:
+    """
+    Validates each tmx file, writing the result of each as a line of JSON in the
+    order the files were given, then the distances that changed between each file
+    and the one before it.
+    """
+    logging.basicConfig(level=logging.INFO)
+    paths = [pathlib.Path(path) for path in tmx_paths]
+    if paths_file is not None:
+        paths.extend(read_paths_file(paths_file))
+    if not paths:
+        raise click.UsageError("Give the tmx files as arguments or --paths-file.")
+
+    changes = []
+    failures = 0
+    previous_result = None
+    for result in validate_maps(
+        tmx_paths=paths,
+        distances_path=distances_path,
+        tiles_path=tiles_path,
+        workers=workers,
+    ):
+        sys.stdout.write(json.dumps(result) + "\n")
+        sys.stdout.flush()
+        if "error" in result:
+            logger.error("Couldn't validate %s: %s", result["path"], result["error"])
+            failures += 1
+            continue
+        if previous_result is not None:
+            changes.extend(
+                (previous_result["path"], result["path"], *change)
+                for change in distance_changes(
+                    previous_result=previous_result,
+                    result=result,
+                )
+            )
+        previous_result = result
+
+    if not changes:
+        logger.info("No distance changed between the %s maps.", len(paths) - failures)
+    else:
+        logger.info(
+            "Distance changes:\n%s",
+            _format_table(
+                [("From", "To", "Connection", "Expected", "Before", "After")]
+                + [
+                    (
+                        previous_path,
+                        path,
+                        f"{port_name} -> {city_name}",
+                        str(expected_distance),
+                        _format_distance(previous_distance),
+                        _format_distance(distance),
+                    )
+                    for (
+                        previous_path,
+                        path,
+                        port_name,
+                        city_name,
+                        expected_distance,
+                        previous_distance,
+                        distance,
+                    ) in changes
+                ]
+            ),
+        )
+    if failures:
+        sys.exit(1)
+
+
+def _format_table(rows: list[tuple[str, ...]]) -> str:
+    widths = [max(map(len, column)) for column in zip(*rows)]
+    return "\n".join(
+        "  ".join(cell.ljust(width) for cell, width in zip(row, widths)).rstrip()
+        for row in rows
+    )
+
+
+def _format_distance(distance: int | None) -> str:
+    if distance is None:
+        return "none"
+    if distance == 0:
+        return "unconnected"
+    return str(distance)
+
+
+if __name__ == "__main__":
+    main()
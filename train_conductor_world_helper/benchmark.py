@@ -0,0 +1,407 @@
+#!/usr/bin/env python3
+
+"""Benchmarks each stage of an update in isolation against the bundled maps."""
+
+import dataclasses
+import json
+import logging
+import pathlib
+import shutil
+import statistics
+import sys
+import tempfile
+import textwrap
+import time
+import tracemalloc
+import typing
+
+import click
+
+import annotations.connection_annotators
+import annotations.layer_cache
+import data
+import graphing.graph
+import graphing.pathing.paths
+import helper
+import instrumentation
+import mapping.tile_map
+import mapping.world
+import memory
+import tmx.layers
+import tmx.tiled_map
+
+DATA_DIR = pathlib.Path("./data/")
+DEFAULT_DISTANCES_FILENAME = DATA_DIR / "distances.json"
+DEFAULT_TILES_FILENAME = DATA_DIR / "tiles.json"
+DEFAULT_TMX_FILENAMES = [
+    DATA_DIR / "train-conductor-world.tmx",
+    DATA_DIR / "test.tmx",
+]
+DEFAULT_BASELINE_FILENAME = pathlib.Path("./benchmark-baseline.json")
+DEFAULT_REPEAT = 20
+DEFAULT_TOLERANCE = 0.25
+# Absolute slack so that the noise of very short stages isn't a regression.
+MIN_REGRESSION_MILLISECONDS = 2.0
+MIN_REGRESSION_KIBIBYTES = 64.0
+
+Run = typing.Callable[[], object]
+Setup = typing.Callable[[], Run]
+
+
+@dataclasses.dataclass(frozen=True)
+class StageResult:
+    """The timings and peak memory of a stage run against a map."""
+
+    min_milliseconds: float
+    median_milliseconds: float
+    p95_milliseconds: float
+    peak_kibibytes: float
+
+    def regressions_from(
+        self,
+        baseline: typing.Self,
+        tolerance: float,
+    ) -> list[str]:
+        """
+        Returns a description of each way the result regressed from the baseline.
+        A stage only regressed if even its fastest run was slower than the baseline's
+        median run, since noise only ever slows a run down, and can shift the median
+        of either by a third.
+        """
+        regressions = []
+        if self.min_milliseconds > (
+            baseline.median_milliseconds * (1 + tolerance) + MIN_REGRESSION_MILLISECONDS
+        ):
+            regressions.append(
+                f"median {baseline.median_milliseconds:.2f}ms -> "
+                f"minimum {self.min_milliseconds:.2f}ms"
+            )
+        if self.peak_kibibytes > (
+            baseline.peak_kibibytes * (1 + tolerance) + MIN_REGRESSION_KIBIBYTES
+        ):
+            regressions.append(
+                f"peak memory {baseline.peak_kibibytes:.0f}KiB -> "
+                f"{self.peak_kibibytes:.0f}KiB"
+            )
+        return regressions
+
+
+def measure(
+    setup: Setup,
+    repeat: int,
+    stage: str = "run",
+    recorder: memory.AllocationRecorder | None = None,
+) -> StageResult:
+    """
+    Times the stage returned by the setup over the repeats, then traces the peak
+    memory of one more run. Setting up is neither timed nor traced. The allocations
+    of the traced run are recorded to the recorder as the named stage, if given.
+    """
+    milliseconds = []
+    for _ in range(repeat):
+        run = setup()
+        start_time = time.perf_counter()
+        run()
+        milliseconds.append((time.perf_counter() - start_time) * 1000)
+
+    run = setup()
+    tracemalloc.start()
+    try:
+        if recorder is None:
+            run()
+        else:
+            with instrumentation.recording(recorder), instrumentation.span(stage):
+                run()
+        _, peak_bytes = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    milliseconds.sort()
+    p95_milliseconds = (
+        statistics.quantiles(milliseconds, n=20, method="inclusive")[-1]
+        if len(milliseconds) > 1
+        else milliseconds[0]
+    )
+    return StageResult(
+        min_milliseconds=milliseconds[0],
+        median_milliseconds=statistics.median(milliseconds),
+        p95_milliseconds=p95_milliseconds,
+        peak_kibibytes=peak_bytes / 1024,
+    )
+
+
+def create_stage_setups(
+    tmx_path: pathlib.Path,
+    world_data: data.Data,
+    temporary_directory: pathlib.Path,
+) -> dict[str, Setup]:
+    """
+    Returns the setup of each stage for the map, which prepares the stage's inputs
+    and returns the stage to run.
+    """
+    layer_names = (helper.MAP_LAYER_NAME, helper.TRACKS_LAYER_NAME)
+    tiled_map = tmx.tiled_map.TiledMap(filename=tmx_path)
+    name_to_data_text = tmx.tiled_map.read_layer_data_texts(
+        filename=tmx_path,
+        names=layer_names,
+    )
+    map_grid = tiled_map.get_layer_data(name=helper.MAP_LAYER_NAME)
+    track_grid = tiled_map.get_layer_data(name=helper.TRACKS_LAYER_NAME)
+    world_map = mapping.world.World.from_matrices_and_data(
+        map_matrix=map_grid,
+        track_matrix=track_grid,
+        world_data=world_data,
+    )
+    graph = graphing.graph.Graph(track_map=world_map.track_map)
+
+    def create_paths() -> graphing.pathing.paths.Paths:
+        return graphing.pathing.paths.Paths(
+            world_map=world_map,
+            world_data=world_data,
+            graph=graph,
+        )
+
+    searched_paths = create_paths()
+    _ = searched_paths.unused_edges
+
+    def create_annotator() -> annotations.connection_annotators.ConnectionsAnnotator:
+        searched_paths.path_cache.clear()
+        return annotations.connection_annotators.ConnectionsAnnotator(
+            width=tiled_map.width,
+            height=tiled_map.height,
+            layer_name="Annotations",
+            world_data=world_data,
+            paths=searched_paths,
+            layer_cache=annotations.layer_cache.LayerCache(),
+        )
+
+    annotation_layer = create_annotator().create_layer()
+
+    def setup_save() -> Run:
+        save_path = temporary_directory / tmx_path.name
+        shutil.copyfile(tmx_path, save_path)
+        save_tiled_map = tmx.tiled_map.TiledMap(filename=save_path)
+        save_tiled_map.add_layer(annotation_layer)
+        return save_tiled_map.save
+
+    return {
+        "parse": lambda: lambda: tmx.tiled_map.TiledMap(filename=tmx_path),
+        "layer decode": lambda: lambda: [
+            tmx.layers.TileLayer._to_data(  # pylint: disable=protected-access
+                name_to_data_text[layer_name]
+            )
+            for layer_name in layer_names
+        ],
+        "layer encode": lambda: lambda: [
+            tmx.layers.TileLayer.to_csv_string(grid) for grid in (map_grid, track_grid)
+        ],
+        "tile map": lambda: lambda: [
+            mapping.tile_map.TileMap.from_matrix(matrix=matrix, world_data=world_data)
+            for matrix in (map_grid, track_grid)
+        ],
+        "graph": lambda: lambda: graphing.graph.Graph(track_map=world_map.track_map),
+        "path search": lambda: lambda: (
+            create_paths()._min_paths_dict  # pylint: disable=protected-access
+        ),
+        "annotation": lambda: create_annotator().create_layer,
+        "save": setup_save,
+    }
+
+
+def create_structures(
+    tmx_path: pathlib.Path,
+    world_data: data.Data,
+) -> dict[str, object]:
+    """
+    Returns the structures that a watch session holds for the map after an update,
+    by name.
+    """
+    tiled_map = tmx.tiled_map.TiledMap(filename=tmx_path)
+    world_map = mapping.world.World.from_matrices_and_data(
+        map_matrix=tiled_map.get_layer_data(name=helper.MAP_LAYER_NAME),
+        track_matrix=tiled_map.get_layer_data(name=helper.TRACKS_LAYER_NAME),
+        world_data=world_data,
+    )
+    graph = graphing.graph.Graph(track_map=world_map.track_map)
+    paths = graphing.pathing.paths.Paths(
+        world_map=world_map,
+        world_data=world_data,
+        graph=graph,
+    )
+    layer_cache = annotations.layer_cache.LayerCache()
+    annotations.connection_annotators.ConnectionsAnnotator(
+        width=tiled_map.width,
+        height=tiled_map.height,
+        layer_name="Annotations",
+        world_data=world_data,
+        paths=paths,
+        layer_cache=layer_cache,
+    ).create_layer()
+    return {
+        "tree": tiled_map.tree,
+        "grids": world_map,
+        "graph": graph,
+        "paths": paths,
+        "annotation buffers": layer_cache,
+    }
+
+
+@click.command()
+@click.option(
+    "--distances-path",
+    help="Path to distances json file.",
+    default=DEFAULT_DISTANCES_FILENAME,
+)
+@click.option(
+    "--tiles-path",
+    help="Path to tile json file.",
+    default=DEFAULT_TILES_FILENAME,
+)
+@click.option(
+    "--tmx-path",
+    help="Path to a mapping tmx file to benchmark. Can be given multiple times.",
+    multiple=True,
+    default=DEFAULT_TMX_FILENAMES,
+)
+@click.option(
+    "--repeat",
+    help="Number of timed runs of each stage.",
+    type=click.IntRange(min=1),
+    default=DEFAULT_REPEAT,
+)
+@click.option(
+    "--baseline-path",
+    help="Path to the stored baseline results to compare against.",
+    type=click.Path(dir_okay=False),
+    default=DEFAULT_BASELINE_FILENAME,
+)
+@click.option(
+    "--save-baseline",
+    is_flag=True,
+    help="Stores the results as the baseline instead of comparing against it.",
+    default=False,
+)
+@click.option(
+    "--tolerance",
+    help="Fraction a stage may regress past the baseline before failing.",
+    type=click.FloatRange(min=0),
+    default=DEFAULT_TOLERANCE,
+)
+@click.option(
+    "--memory-report",
+    is_flag=True,
+    help=(
+        "Reports the bytes retained by the structures of each map and the lines whose "
+        "held allocations grew the most in each stage's traced run."
+    ),
+    default=False,
+)
+def main(
+    distances_path: pathlib.Path,
+    tiles_path: pathlib.Path,
+    tmx_path: tuple[pathlib.Path, ...],
+    repeat: int,
+    baseline_path: pathlib.Path,
+    save_baseline: bool,
+    tolerance: float,
+    memory_report: bool,
+) -> None:
+    """Benchmarks each stage and fails if any regressed past the baseline."""
+    logging.basicConfig(level=logging.WARNING)
+    world_data = data.Data(
+        distances_filename=distances_path,
+        tiles_filename=tiles_path,
+        port_limit=helper.PORT_LIMIT,
+    )
+
+    results = {}
+    with tempfile.TemporaryDirectory() as temporary_directory:
+        for map_path in map(pathlib.Path, tmx_path):
+            stage_setups = create_stage_setups(
+                tmx_path=map_path,
+                world_data=world_data,
+                temporary_directory=pathlib.Path(temporary_directory),
+            )
+            click.echo(f"{map_path.name}:")
+            stage_results = results[map_path.name] = {}
+            recorder = memory.AllocationRecorder() if memory_report else None
+            for stage, setup in stage_setups.items():
+                # Each stage is traced afresh, so is compared with its own start.
+                stage_recorder = memory.AllocationRecorder() if memory_report else None
+                result = stage_results[stage] = measure(
+                    setup=setup,
+                    repeat=repeat,
+                    stage=stage,
+                    recorder=stage_recorder,
+                )
+                if memory_report:
+                    recorder.stage_to_sites.update(stage_recorder.stage_to_sites)
+                click.echo(
+                    f"  {stage:<14} min {result.min_milliseconds:8.2f}ms  "
+                    f"median {result.median_milliseconds:8.2f}ms  "
+                    f"p95 {result.p95_milliseconds:8.2f}ms  "
+                    f"peak {result.peak_kibibytes:9.0f}KiB"
+                )
+            if memory_report:
+                report = memory.MemoryTracker().report(
+                    name_to_structure=create_structures(
+                        tmx_path=map_path,
+                        world_data=world_data,
+                    ),
+                    recorder=recorder,
+                )
+                click.echo(textwrap.indent(report, "  "))
+
+    baseline_path = pathlib.Path(baseline_path)
+    if save_baseline:
+        with open(baseline_path, "w", encoding="utf8") as file:
+            json.dump(
+                {
+                    map_name: {
+                        stage: dataclasses.asdict(result)
+                        for stage, result in stage_results.items()
+                    }
+                    for map_name, stage_results in results.items()
+                },
+                file,
+                indent=2,
+            )
+        click.echo(f"Stored the baseline in {baseline_path}.")
+        return
+    if not baseline_path.exists():
+        click.echo(f"No baseline at {baseline_path}, store one with --save-baseline.")
+        return
+
+    with open(baseline_path, encoding="utf8") as file:
+        baseline_results = json.load(file)
+    field_names = {field.name for field in dataclasses.fields(StageResult)}
+    if any(
+        baseline_result.keys() != field_names
+        for baseline_stage_results in baseline_results.values()
+        for baseline_result in baseline_stage_results.values()
+    ):
+        click.echo(
+            f"The baseline at {baseline_path} is of an older format, store it again "
+            "with --save-baseline."
+        )
+        return
+    regressions = [
+        f"{map_name} {stage}: {regression}"
+        for map_name, stage_results in results.items()
+        for stage, result in stage_results.items()
+        if stage in baseline_results.get(map_name, {})
+        for regression in result.regressions_from(
+            baseline=StageResult(**baseline_results[map_name][stage]),
+            tolerance=tolerance,
+        )
+    ]
+    if regressions:
+        click.echo(f"Regressed past the baseline by more than {tolerance:.0%}:")
+        for regression in regressions:
+            click.echo(f"  {regression}")
+        sys.exit(1)
+    click.echo("No stage regressed past the baseline.")
+
+
+if __name__ == "__main__":
+    main()
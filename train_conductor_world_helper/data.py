@@ -9,6 +9,7 @@ import os
 from graphing.pathing.path_component import PathComponent
 
 CELL_ID_REFERENCE = "tmx_id"
+EMPTY_TILE_ID = 0
 
 
 class Data:
@@ -77,6 +78,18 @@ class Data:
         """
         return self._connection_to_tile_id[(city_name, connection_component)]
 
+    def connection_tile_ids_of(
+        self,
+        city_name: str,
+    ) -> list[int]:
+        """
+        Returns a lookup table of the connection tile ids for the given city,
+        indexed by the value of a connection component.
+
+        Connection components without a tile are mapped to the empty tile id.
+        """
+        return self._city_name_to_connection_tile_ids[city_name]
+
     @functools.cached_property
     def city_names(self) -> list[str]:
         """
@@ -95,6 +108,20 @@ class Data:
         """Returns the train conductor world mapping port names."""
         return sorted(self._port_to_city_distance)
 
+    @functools.cached_property
+    def tile_ids(self) -> list[int]:
+        """Returns the ids of all tiles, in the order of the tile data."""
+        return list(self._id_to_tile)
+
+    @functools.cached_property
+    def track_tile_ids(self) -> list[int]:
+        """Returns the ids of all track tiles, in the order of the tile data."""
+        return [
+            tile_id
+            for tile_id, tile_data in self._id_to_tile.items()
+            if tile_data["group"] == "Track"
+        ]
+
     @functools.cached_property
     def _port_names_of_city_names(
         self,
@@ -108,6 +135,23 @@ class Data:
                 city_name_to_port_name_of_city_names[city_name].append(port_name)
         return city_name_to_port_name_of_city_names
 
+    @functools.cached_property
+    def _city_name_to_connection_tile_ids(
+        self,
+    ) -> dict[str, list[int]]:
+        table_size = 1 << len(PathComponent)
+        city_name_to_connection_tile_ids = collections.defaultdict(
+            lambda: [EMPTY_TILE_ID] * table_size
+        )
+        for (
+            city_name,
+            connection_component,
+        ), tile_id in self._connection_to_tile_id.items():
+            city_name_to_connection_tile_ids[city_name][
+                connection_component.value
+            ] = tile_id
+        return city_name_to_connection_tile_ids
+
     @functools.cached_property
     def port_to_city_name_pairs(
         self,
@@ -1,11 +1,16 @@
+import collections
+import functools
+import itertools
 import typing
 
 import networkx as nx
 
+import graphing.edge
 import graphing.node
 import mapping.coordinate
 import mapping.tile
 import mapping.tile_map
+import metrics
 from graphing.pathing.path_component import PathComponent
 
 
@@ -15,9 +20,32 @@ class Graph:
     def __init__(
         self,
         track_map: mapping.tile_map.TileMap,
+        graph: nx.Graph | None = None,
+        edited_coordinates: typing.Iterable[mapping.coordinate.Coordinate] = (),
     ) -> None:
         self.track_map = track_map
-        self._create_track_graph()
+        if graph is None:
+            self._create_track_graph()
+        else:
+            # The given graph's edges at the edited coordinates are replaced with
+            # those of the track map's tiles there.
+            self.graph = graph
+            self._edit_track_graph(coordinates=edited_coordinates)
+
+    def with_track_map(
+        self,
+        track_map: mapping.tile_map.TileMap,
+        coordinates: typing.Iterable[mapping.coordinate.Coordinate],
+    ) -> "Graph":
+        """
+        Returns a copy of the graph for a track map that differs from the graph's
+        track map only at the given coordinates.
+        """
+        return Graph(
+            track_map=track_map,
+            graph=self.graph.copy(),
+            edited_coordinates=coordinates,
+        )
 
     def all_shortest_paths(
         self,
@@ -25,17 +53,82 @@ class Graph:
         target_node: graphing.node.Node,
     ) -> typing.Iterable[list[graphing.node.Node]]:
         """Returns all the shortest paths from a source node to a target node."""
-        return nx.all_shortest_paths(
-            G=self.graph,
-            source=source_node,
-            target=target_node,
+        return self.shortest_paths_to(
+            target_node=target_node,
+            node_to_predecessors=self.shortest_path_predecessors(source_node),
         )
 
+    def shortest_path_predecessors(
+        self,
+        source_node: graphing.node.Node,
+    ) -> dict[graphing.node.Node, list[graphing.node.Node]]:
+        """
+        Returns the nodes before each node reached on its shortest paths from the
+        source node, from a breadth first search of the whole graph.
+        """
+        node_to_predecessors = nx.predecessor(G=self.graph, source=source_node)
+        metrics.count(metrics.BFS_EXPANSIONS, len(node_to_predecessors))
+        return node_to_predecessors
+
+    @staticmethod
+    def shortest_paths_to(
+        target_node: graphing.node.Node,
+        node_to_predecessors: dict[graphing.node.Node, list[graphing.node.Node]],
+    ) -> typing.Iterator[list[graphing.node.Node]]:
+        """
+        Yields the shortest paths to the target node from the source node that the
+        predecessors were searched from, in the order networkx finds them, raising
+        NetworkXNoPath if the target node wasn't reached.
+        """
+        if target_node not in node_to_predecessors:
+            raise nx.NetworkXNoPath(f"{target_node} can't be reached.")
+        # A depth first walk back over the predecessors, as in all_shortest_paths.
+        stack = [(target_node, 0)]
+        while stack:
+            node, index = stack[-1]
+            predecessors = node_to_predecessors[node]
+            if not predecessors:
+                yield [path_node for path_node, _ in reversed(stack)]
+            if index < len(predecessors):
+                stack[-1] = (node, index + 1)
+                stack.append((predecessors[index], 0))
+            else:
+                stack.pop()
+
+    @functools.cached_property
+    def node_to_neighbours(
+        self,
+    ) -> dict[
+        graphing.node.Node,
+        list[tuple[graphing.node.Node, mapping.coordinate.Coordinate]],
+    ]:
+        """
+        Returns the neighbouring nodes of each connected node, along with the
+        coordinate of the edge between them.
+        """
+        node_to_neighbours = collections.defaultdict(list)
+        for from_node, to_node in self.graph.edges:
+            coordinate = graphing.edge.Edge((from_node, to_node)).coordinate
+            node_to_neighbours[from_node].append((to_node, coordinate))
+            node_to_neighbours[to_node].append((from_node, coordinate))
+        metrics.count(metrics.EDGES_CREATED, self.graph.number_of_edges())
+        return node_to_neighbours
+
     def _create_track_graph(self) -> None:
         self.graph = nx.Graph()
         self._add_nodes_on_edges()
         self._add_edges_for_tracks()
 
+    def _edit_track_graph(
+        self,
+        coordinates: typing.Iterable[mapping.coordinate.Coordinate],
+    ) -> None:
+        for coordinate in coordinates:
+            self._remove_edges_for_coordinate(coordinate=coordinate)
+            tile = self.track_map[coordinate]
+            if tile is not None and tile.is_track:
+                self._add_edges_for_track(track=tile)
+
     def _add_nodes_on_edges(self) -> None:
         """
         Creates a graph similar to a grid of a width and height
@@ -67,30 +160,48 @@ class Graph:
                 path_component=path_component,
             )
 
+    def _remove_edges_for_coordinate(
+        self,
+        coordinate: mapping.coordinate.Coordinate,
+    ) -> None:
+        graph = self.graph
+        for from_node, to_node in itertools.combinations(coordinate.edge_nodes, 2):
+            if graph.has_edge(from_node, to_node):
+                graph.remove_edge(from_node, to_node)
+
     def _add_edge_for_coordinate_and_path_component(
         self,
         coordinate: mapping.coordinate.Coordinate,
         path_component: PathComponent,
     ) -> None:
+        self.graph.add_edge(
+            *Graph.nodes_of(coordinate=coordinate, path_component=path_component)
+        )
+
+    @staticmethod
+    def nodes_of(
+        coordinate: mapping.coordinate.Coordinate,
+        path_component: PathComponent,
+    ) -> tuple[graphing.node.Node, graphing.node.Node]:
+        """Returns the nodes joined by a single path component at the coordinate."""
         north = coordinate.north
         east = coordinate.east
         south = coordinate.south
         west = coordinate.west
 
-        graph = self.graph
         match path_component:
             case PathComponent.VERTICAL:
-                graph.add_edge(north, south)
+                return north, south
             case PathComponent.HORIZONTAL:
-                graph.add_edge(west, east)
+                return west, east
             case PathComponent.UP_RIGHT:
-                graph.add_edge(north, east)
+                return north, east
             case PathComponent.DOWN_LEFT:
-                graph.add_edge(south, west)
+                return south, west
             case PathComponent.DOWN_RIGHT:
-                graph.add_edge(south, east)
+                return south, east
             case PathComponent.UP_LEFT:
-                graph.add_edge(north, west)
+                return north, west
             case _:
                 raise ValueError(
                     f"Expected single path component but got {path_component}."
@@ -0,0 +1,324 @@
+import collections
+import functools
+import heapq
+import typing
+
+import graphing.graph
+import metrics
+from graphing.edge import Edge
+from graphing.node import Node
+from graphing.pathing.distance_field import State, coordinates_of, opposite_coordinate
+from mapping.coordinate import Coordinate
+
+DEFAULT_CLUSTER_SIZE = 16
+
+ClusterKey = tuple[int, int]
+
+
+class Cluster:
+    """
+    Represents a square of cells of the map, and the distances of the valid routes
+    that stay within it from each state that enters it.
+
+    States are of a node and the coordinate that the next edge from the node must be
+    within, as in a DistanceField, so a route that leaves the cluster ends at a state
+    entering the neighbouring cluster.
+    """
+
+    def __init__(
+        self,
+        key: ClusterKey,
+        size: int,
+        graph: graphing.graph.Graph,
+    ) -> None:
+        self.key = key
+        self.size = size
+        self._state_to_next_states = self._create_state_to_next_states(graph=graph)
+        self._state_to_reached: dict[State, dict[State, int]] = {}
+        self._state_to_exits: dict[State, list[tuple[State, int]]] = {}
+
+    def contains(self, coordinate: Coordinate) -> bool:
+        """Returns whether the coordinate is within the cluster."""
+        return cluster_key_of(coordinate=coordinate, size=self.size) == self.key
+
+    def reached_from(self, state: State) -> dict[State, int]:
+        """
+        Returns the distance to every state reached from the state without taking an
+        edge outside the cluster, including the states that leave the cluster.
+        """
+        reached = self._state_to_reached.get(state)
+        if reached is None:
+            reached = self._state_to_reached[state] = self._search(state)
+        return reached
+
+    def exits_from(self, state: State) -> list[tuple[State, int]]:
+        """
+        Returns each state that leaves the cluster which is reached from the state,
+        along with its distance.
+        """
+        exits = self._state_to_exits.get(state)
+        if exits is None:
+            exits = self._state_to_exits[state] = [
+                (reached_state, distance)
+                for reached_state, distance in self.reached_from(state).items()
+                if not self.contains(reached_state[1])
+            ]
+        return exits
+
+    def edges_between(
+        self,
+        from_state: State,
+        to_state: State,
+    ) -> list[Edge]:
+        """
+        Returns the edges of a shortest route within the cluster from one state to
+        another reached from it.
+        """
+        state_to_previous_state = {from_state: None}
+        queue = collections.deque([from_state])
+        while queue and to_state not in state_to_previous_state:
+            state = queue.popleft()
+            for next_state in self._state_to_next_states.get(state, ()):
+                if next_state not in state_to_previous_state:
+                    state_to_previous_state[next_state] = state
+                    if self.contains(next_state[1]):
+                        queue.append(next_state)
+
+        edges = []
+        state = to_state
+        while (previous_state := state_to_previous_state[state]) is not None:
+            edges.append(Edge((previous_state[0], state[0])))
+            state = previous_state
+        return edges[::-1]
+
+    @functools.cached_property
+    def entrance_states(self) -> list[State]:
+        """
+        Returns the states with an edge to take within the cluster whose node lies on
+        the boundary of the cluster.
+        """
+        return [
+            state
+            for state in self._state_to_next_states
+            if not self.contains(opposite_coordinate(*state))
+        ]
+
+    def precompute(self) -> None:
+        """Finds the states that leave the cluster from each state entering it."""
+        for state in self.entrance_states:
+            self.exits_from(state)
+
+    def _search(self, state: State) -> dict[State, int]:
+        state_to_next_states = self._state_to_next_states
+        state_to_distance = {state: 0}
+        queue = collections.deque([state])
+        while queue:
+            state = queue.popleft()
+            next_distance = state_to_distance[state] + 1
+            for next_state in state_to_next_states.get(state, ()):
+                if next_state not in state_to_distance:
+                    state_to_distance[next_state] = next_distance
+                    if self.contains(next_state[1]):
+                        queue.append(next_state)
+        metrics.count(metrics.BFS_EXPANSIONS, len(state_to_distance))
+        return state_to_distance
+
+    def _create_state_to_next_states(
+        self,
+        graph: graphing.graph.Graph,
+    ) -> dict[State, list[State]]:
+        node_to_neighbours = graph.node_to_neighbours
+        track_map = graph.track_map
+        key_x, key_y = self.key
+        state_to_next_states = collections.defaultdict(list)
+        for y in range(
+            key_y * self.size, min((key_y + 1) * self.size, track_map.height)
+        ):
+            for x in range(
+                key_x * self.size, min((key_x + 1) * self.size, track_map.width)
+            ):
+                coordinate = Coordinate(x=x, y=y)
+                if track_map[coordinate] is None:
+                    continue
+                for node in coordinate.edge_nodes:
+                    for neighbour, edge_coordinate in node_to_neighbours.get(node, ()):
+                        if edge_coordinate == coordinate:
+                            state_to_next_states[(node, coordinate)].append(
+                                (neighbour, opposite_coordinate(neighbour, coordinate))
+                            )
+        return dict(state_to_next_states)
+
+
+class ClusterHierarchy:
+    """
+    Represents the search of valid routes over a graph split into square clusters of
+    cells.
+
+    Each cluster finds the distances from the states entering it to the states
+    leaving it once, when it is first searched. A route is searched for over only
+    those entering and leaving states, then refined into edges within the clusters
+    it passes through, giving the same distances as a DistanceField.
+    """
+
+    def __init__(
+        self,
+        graph: graphing.graph.Graph,
+        size: int = DEFAULT_CLUSTER_SIZE,
+        clusters: dict[ClusterKey, Cluster] | None = None,
+    ) -> None:
+        self.graph = graph
+        self.size = size
+        self.clusters = {} if clusters is None else clusters
+
+    def with_graph(
+        self,
+        graph: graphing.graph.Graph,
+        coordinates: typing.Iterable[Coordinate],
+    ) -> typing.Self:
+        """
+        Returns the hierarchy of a graph that differs from this graph only at the
+        given coordinates, reusing the clusters that contain none of them.
+        """
+        edited_keys = {
+            cluster_key_of(coordinate=coordinate, size=self.size)
+            for coordinate in coordinates
+        }
+        return ClusterHierarchy(
+            graph=graph,
+            size=self.size,
+            clusters={
+                key: cluster
+                for key, cluster in self.clusters.items()
+                if key not in edited_keys
+            },
+        )
+
+    def distance(
+        self,
+        source_nodes: typing.Iterable[Node],
+        target_nodes: typing.Iterable[Node],
+    ) -> int | None:
+        """
+        Returns the distance of the shortest valid route from any source node to any
+        target node, or None if there is none.
+        """
+        state_to_distance, target_state = self._search(
+            source_nodes=source_nodes,
+            target_nodes=target_nodes,
+        )
+        if target_state is None:
+            return None
+        return state_to_distance[target_state][0]
+
+    def route(
+        self,
+        source_nodes: typing.Iterable[Node],
+        target_nodes: typing.Iterable[Node],
+    ) -> list[Edge]:
+        """
+        Returns the edges of a shortest valid route from any source node to any
+        target node, or an empty list if there is none.
+        """
+        state_to_distance, target_state = self._search(
+            source_nodes=source_nodes,
+            target_nodes=target_nodes,
+        )
+        states = []
+        state = target_state
+        while state is not None:
+            states.append(state)
+            state = state_to_distance[state][1]
+        states.reverse()
+        return [
+            edge
+            for from_state, to_state in zip(states, states[1:])
+            for edge in self._cluster(from_state[1]).edges_between(
+                from_state=from_state,
+                to_state=to_state,
+            )
+        ]
+
+    def _search(
+        self,
+        source_nodes: typing.Iterable[Node],
+        target_nodes: typing.Iterable[Node],
+    ) -> tuple[dict[State, tuple[int, State | None]], State | None]:
+        """
+        Returns the distance and previous state of each state searched, and the
+        first target state found, from a Dijkstra search over the states entering
+        and leaving the clusters.
+        """
+        key_to_target_states = collections.defaultdict(list)
+        target_states = set()
+        for node in target_nodes:
+            for coordinate in coordinates_of(node):
+                target_states.add((node, coordinate))
+                key_to_target_states[
+                    cluster_key_of(coordinate=coordinate, size=self.size)
+                ].append((node, coordinate))
+
+        state_to_distance = {}
+        queue = []
+        for node in source_nodes:
+            for coordinate in coordinates_of(node):
+                state_to_distance[(node, coordinate)] = (0, None)
+                queue.append((0, (node, coordinate)))
+        heapq.heapify(queue)
+
+        while queue:
+            distance, state = heapq.heappop(queue)
+            if state_to_distance[state][0] < distance:
+                continue
+            if state in target_states:
+                return state_to_distance, state
+            if not self._within_map(state[1]):
+                continue
+
+            cluster = self._cluster(state[1])
+            next_states = cluster.exits_from(state)
+            cluster_target_states = key_to_target_states.get(cluster.key)
+            if cluster_target_states:
+                reached = cluster.reached_from(state)
+                next_states = [
+                    *next_states,
+                    *(
+                        (target_state, reached[target_state])
+                        for target_state in cluster_target_states
+                        if target_state in reached
+                    ),
+                ]
+            for next_state, state_distance in next_states:
+                next_distance = distance + state_distance
+                if (
+                    next_distance
+                    < state_to_distance.get(next_state, (next_distance + 1,))[0]
+                ):
+                    state_to_distance[next_state] = (next_distance, state)
+                    heapq.heappush(queue, (next_distance, next_state))
+        return state_to_distance, None
+
+    def _within_map(self, coordinate: Coordinate) -> bool:
+        track_map = self.graph.track_map
+        return (
+            0 <= coordinate.x < track_map.width and 0 <= coordinate.y < track_map.height
+        )
+
+    def _cluster(self, coordinate: Coordinate) -> Cluster:
+        key = cluster_key_of(coordinate=coordinate, size=self.size)
+        cluster = self.clusters.get(key)
+        if cluster is None:
+            cluster = self.clusters[key] = Cluster(
+                key=key,
+                size=self.size,
+                graph=self.graph,
+            )
+            cluster.precompute()
+        return cluster
+
+
+def cluster_key_of(
+    coordinate: Coordinate,
+    size: int,
+) -> ClusterKey:
+    """Returns the key of the cluster of the given size that contains the coordinate."""
+    return coordinate.x // size, coordinate.y // size
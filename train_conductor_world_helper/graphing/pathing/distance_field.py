@@ -0,0 +1,152 @@
+import collections
+import functools
+import typing
+
+import graphing.graph
+import metrics
+from graphing.edge import Edge
+from graphing.node import Node
+from mapping.coordinate import Coordinate
+
+State = tuple[Node, Coordinate]
+
+
+class DistanceField:
+    """
+    Represents the distances of valid routes from a set of source nodes.
+
+    A route is valid when no two consecutive edges share a coordinate, which is
+    tracked by searching over states of a node and the coordinate that the next
+    edge from the node must be within.
+    """
+
+    def __init__(
+        self,
+        graph: graphing.graph.Graph,
+        source_nodes: typing.Iterable[Node],
+    ) -> None:
+        self.graph = graph
+        self._state_to_distance = self._breadth_first_search(
+            source_nodes=source_nodes,
+        )
+
+    def distance_to(
+        self,
+        node: Node,
+        coordinate: Coordinate,
+    ) -> int | None:
+        """
+        Returns the distance to the node when the next edge is within the coordinate,
+        or None if the state is unreachable.
+        """
+        return self._state_to_distance.get((node, coordinate))
+
+    def distance_to_any(
+        self,
+        nodes: typing.Iterable[Node],
+    ) -> int | None:
+        """Returns the minimum distance to any of the nodes, or None if unreachable."""
+        return min(
+            (
+                distance
+                for node in nodes
+                for coordinate in coordinates_of(node)
+                if (distance := self.distance_to(node, coordinate)) is not None
+            ),
+            default=None,
+        )
+
+    def route_to_any(
+        self,
+        nodes: typing.Iterable[Node],
+    ) -> list[Edge]:
+        """
+        Returns the edges of a shortest valid route from the source nodes to any of
+        the nodes, in order, or an empty list if none is reachable.
+        """
+        reached_states = [
+            ((node, coordinate), distance)
+            for node in nodes
+            for coordinate in coordinates_of(node)
+            if (distance := self.distance_to(node, coordinate)) is not None
+        ]
+        if not reached_states:
+            return []
+        state, distance = min(reached_states, key=lambda reached: reached[1])
+
+        # Walks back through the states one closer to the sources each step, which
+        # were entered through an edge within the coordinate behind the node.
+        node_to_neighbours = self.graph.node_to_neighbours
+        state_to_distance = self._state_to_distance
+        edges = []
+        while distance > 0:
+            node, coordinate = state
+            edge_coordinate = opposite_coordinate(node, coordinate)
+            previous_node = next(
+                neighbour
+                for neighbour, neighbour_coordinate in node_to_neighbours[node]
+                if neighbour_coordinate == edge_coordinate
+                and state_to_distance.get((neighbour, edge_coordinate)) == distance - 1
+            )
+            edges.append(Edge((previous_node, node)))
+            state = (previous_node, edge_coordinate)
+            distance -= 1
+        return edges[::-1]
+
+    def reaches_any(
+        self,
+        coordinates: typing.Iterable[Coordinate],
+    ) -> bool:
+        """
+        Returns whether any route from the source nodes can take an edge within any
+        of the coordinates, so whether changing their edges could change the field.
+        """
+        return not self._reached_coordinates.isdisjoint(coordinates)
+
+    @functools.cached_property
+    def _reached_coordinates(self) -> set[Coordinate]:
+        return {coordinate for _, coordinate in self._state_to_distance}
+
+    def _breadth_first_search(
+        self,
+        source_nodes: typing.Iterable[Node],
+    ) -> dict[State, int]:
+        node_to_neighbours = self.graph.node_to_neighbours
+        state_to_distance = {}
+        queue = collections.deque()
+        for node in source_nodes:
+            for coordinate in coordinates_of(node):
+                state_to_distance[(node, coordinate)] = 0
+                queue.append((node, coordinate))
+
+        while queue:
+            state = queue.popleft()
+            node, coordinate = state
+            next_distance = state_to_distance[state] + 1
+            for neighbour, edge_coordinate in node_to_neighbours.get(node, ()):
+                if edge_coordinate != coordinate:
+                    continue
+                next_state = (neighbour, opposite_coordinate(neighbour, coordinate))
+                if next_state not in state_to_distance:
+                    state_to_distance[next_state] = next_distance
+                    queue.append(next_state)
+        metrics.count(metrics.BFS_EXPANSIONS, len(state_to_distance))
+        return state_to_distance
+
+
+def coordinates_of(node: Node) -> tuple[Coordinate, Coordinate]:
+    """Returns the two coordinates that the node lies between."""
+    if node.x.is_integer():
+        return (
+            Coordinate(x=node.x, y=node.y - 0.5),
+            Coordinate(x=node.x, y=node.y + 0.5),
+        )
+    return (
+        Coordinate(x=node.x - 0.5, y=node.y),
+        Coordinate(x=node.x + 0.5, y=node.y),
+    )
+
+
+def opposite_coordinate(node: Node, coordinate: Coordinate) -> Coordinate:
+    """Returns the coordinate on the other side of the node to the given coordinate."""
+    return Coordinate(x=2 * node.x - coordinate.x, y=2 * node.y - coordinate.y)
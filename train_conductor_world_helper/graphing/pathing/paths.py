@@ -1,33 +1,94 @@
 import collections
 import functools
 import logging
+import math
 import typing
 
 import networkx as nx
 
 import data
 import graphing.graph
+import graphing.pathing.cluster_hierarchy
+import graphing.pathing.distance_field
+import instrumentation
+import lru_cache
 import mapping.coordinate
 import mapping.world
+import metrics
 from graphing.edge import Edge
 from graphing.node import Node
 from graphing.pathing.path_component import PathComponent
 
+PATH_CACHE_SIZE = 1024
+# Maps with at least this many cells search routes over clusters of cells, rather
+# than searching the whole graph from each location.
+HIERARCHY_MIN_CELLS = 250_000
+
 logger = logging.getLogger(__name__)
 
 
 class Paths:
     """Represents the paths of connections within the train conductor world mapping."""
 
-    def __init__(
+    def __init__(  # pylint: disable=too-many-arguments
         self,
         world_map: mapping.world.World,
         world_data: data.Data,
         graph: graphing.graph.Graph,
+        reusable_distance_fields: (
+            dict[str, graphing.pathing.distance_field.DistanceField] | None
+        ) = None,
+        reusable_clusters: (
+            dict[
+                graphing.pathing.cluster_hierarchy.ClusterKey,
+                graphing.pathing.cluster_hierarchy.Cluster,
+            ]
+            | None
+        ) = None,
     ):
         self.world_map = world_map
         self.graph = graph
         self.world_data = world_data
+        self.path_cache: lru_cache.LruCache[
+            tuple[str, str, str], dict[mapping.coordinate.Coordinate, PathComponent]
+        ] = lru_cache.LruCache(max_size=PATH_CACHE_SIZE)
+        # The distance fields and clusters of an earlier graph that are unchanged in
+        # this graph, by location name and by cluster.
+        self._reusable_distance_fields = (
+            {} if reusable_distance_fields is None else reusable_distance_fields
+        )
+        self._reusable_clusters = {} if reusable_clusters is None else reusable_clusters
+        self._distance_fields: dict[
+            str, graphing.pathing.distance_field.DistanceField
+        ] = {}
+
+    def with_graph(
+        self,
+        world_map: mapping.world.World,
+        graph: graphing.graph.Graph,
+        coordinates: typing.Collection[mapping.coordinate.Coordinate],
+    ) -> "Paths":
+        """
+        Returns the paths of a graph that differs from this graph only at the given
+        coordinates, reusing the distance fields that never reach them and the
+        clusters that contain none of them.
+        """
+        return Paths(
+            world_map=world_map,
+            world_data=self.world_data,
+            graph=graph,
+            reusable_distance_fields={
+                location_name: distance_field
+                for location_name, distance_field in (
+                    self._location_name_to_distance_field.items()
+                )
+                if not distance_field.reaches_any(coordinates)
+            },
+            reusable_clusters=self.cluster_hierarchy.with_graph(
+                graph=graph,
+                coordinates=coordinates,
+            ).clusters,
+        )
 
     def distance_between(
         self,
@@ -49,7 +110,6 @@ class Paths:
     ) -> list[graphing.edge.Edge]:
         return self._min_paths_dict[port_name][city_name]
 
-    @functools.cache
     def connection_path(
         self,
         port_name: str,
@@ -58,13 +118,243 @@ class Paths:
         """
         Returns the coordinates and path components from the port to the city.
         """
+
+        def create_connection_path() -> (
+            dict[mapping.coordinate.Coordinate, PathComponent]
+        ):
+            edges = self._path(port_name, city_name)
+            return {edge.coordinate: edge.path_component for edge in edges}
+
+        return self.path_cache.get_or_create(
+            key=("connection_path", port_name, city_name),
+            create_value=create_connection_path,
+        )
+
+    def connection_nodes(
+        self,
+        port_name: str,
+        city_name: str,
+    ) -> list[Node]:
+        """
+        Returns the nodes passed through from the port to the city, in order.
+        """
         edges = self._path(port_name, city_name)
-        return {edge.coordinate: edge.path_component for edge in edges}
+        if not edges:
+            return []
+        port_edge_nodes = self.world_map.tile_map.coordinate_of(port_name).edge_nodes
+        first_edge = edges[0]
+        if first_edge.from_node in port_edge_nodes:
+            node = first_edge.from_node
+        else:
+            node = first_edge.to_node
+        nodes = [node]
+        for edge in edges:
+            node = edge.to_node if edge.from_node == node else edge.from_node
+            nodes.append(node)
+        return nodes
+
+    def shortest_bounds(
+        self,
+        port_name: str,
+        city_name: str,
+    ) -> dict[mapping.coordinate.Coordinate, PathComponent]:
+        """
+        Returns the coordinates and path components of every edge that lies on some
+        shortest valid route from the port to the city.
+        """
+        return self.path_cache.get_or_create(
+            key=("shortest_bounds", port_name, city_name),
+            create_value=lambda: self._create_shortest_bounds(
+                port_name=port_name,
+                city_name=city_name,
+            ),
+        )
+
+    def _create_shortest_bounds(
+        self,
+        port_name: str,
+        city_name: str,
+    ) -> dict[mapping.coordinate.Coordinate, PathComponent]:
+        coordinate_to_path_component = collections.defaultdict(
+            lambda: PathComponent.NONE
+        )
+        for edge in self._shortest_route_edges(
+            port_name=port_name,
+            city_name=city_name,
+        ):
+            coordinate_to_path_component[edge.coordinate] |= edge.path_component
+        return dict(coordinate_to_path_component)
+
+    def route_distance_between(
+        self,
+        port_name: str,
+        city_name: str,
+    ) -> int:
+        """
+        Returns the distance of the shortest valid route from the given port to the
+        given city, or 0 if there is none.
+
+        This is always the same as distance_between, but searches for the distance
+        directly rather than enumerating the shortest paths, so is cheap to find for a
+        new graph.
+        """
+        return self._route_distance(port_name=port_name, city_name=city_name) or 0
+
+    def _route_distance(
+        self,
+        port_name: str,
+        city_name: str,
+    ) -> int | None:
+        tile_map = self.world_map.tile_map
+        city_edge_nodes = tile_map.coordinate_of(city_name).edge_nodes
+        if tile_map.width * tile_map.height >= HIERARCHY_MIN_CELLS:
+            return self.cluster_hierarchy.distance(
+                source_nodes=tile_map.coordinate_of(port_name).edge_nodes,
+                target_nodes=city_edge_nodes,
+            )
+        return self._distance_field(port_name).distance_to_any(city_edge_nodes)
+
+    def _route_edges(
+        self,
+        port_name: str,
+        city_name: str,
+    ) -> list[Edge]:
+        tile_map = self.world_map.tile_map
+        city_edge_nodes = tile_map.coordinate_of(city_name).edge_nodes
+        if tile_map.width * tile_map.height >= HIERARCHY_MIN_CELLS:
+            return self.cluster_hierarchy.route(
+                source_nodes=tile_map.coordinate_of(port_name).edge_nodes,
+                target_nodes=city_edge_nodes,
+            )
+        return self._distance_field(port_name).route_to_any(city_edge_nodes)
+
+    @functools.cached_property
+    def cluster_hierarchy(self) -> graphing.pathing.cluster_hierarchy.ClusterHierarchy:
+        """Returns the search of valid routes over clusters of the graph's cells."""
+        return graphing.pathing.cluster_hierarchy.ClusterHierarchy(
+            graph=self.graph,
+            clusters=self._reusable_clusters,
+        )
+
+    def _shortest_route_edges(
+        self,
+        port_name: str,
+        city_name: str,
+    ) -> list[Edge]:
+        min_distance = self._route_distance(port_name=port_name, city_name=city_name)
+        if min_distance is None:
+            return []
+        port_from_distances, port_to_distances = self._edge_distances(port_name)
+        city_from_distances, city_to_distances = self._edge_distances(city_name)
+        return [
+            edge
+            for (
+                edge,
+                port_from_distance,
+                port_to_distance,
+                city_from_distance,
+                city_to_distance,
+            ) in zip(
+                self._graph_edges,
+                port_from_distances,
+                port_to_distances,
+                city_from_distances,
+                city_to_distances,
+            )
+            if port_from_distance + 1 + city_to_distance == min_distance
+            or port_to_distance + 1 + city_from_distance == min_distance
+        ]
+
+    def _edge_distances(
+        self,
+        location_name: str,
+    ) -> tuple[list[float], list[float]]:
+        return self._location_name_to_edge_distances[location_name]
+
+    @functools.cached_property
+    def _location_name_to_edge_distances(
+        self,
+    ) -> dict[str, tuple[list[float], list[float]]]:
+        """
+        Returns the distances from each location to the from node and to node of each
+        graph edge, when the edge is taken next, or infinity where unreachable.
+        """
+        location_name_to_edge_distances = {}
+        for (
+            location_name,
+            distance_field,
+        ) in self._location_name_to_distance_field.items():
+            from_distances = []
+            to_distances = []
+            for edge in self._graph_edges:
+                coordinate = edge.coordinate
+                from_distance = distance_field.distance_to(edge.from_node, coordinate)
+                to_distance = distance_field.distance_to(edge.to_node, coordinate)
+                from_distances.append(
+                    math.inf if from_distance is None else from_distance
+                )
+                to_distances.append(math.inf if to_distance is None else to_distance)
+            location_name_to_edge_distances[location_name] = (
+                from_distances,
+                to_distances,
+            )
+        return location_name_to_edge_distances
+
+    def _distance_field(
+        self,
+        location_name: str,
+    ) -> graphing.pathing.distance_field.DistanceField:
+        """Returns the distance field of the location, creating it on first use."""
+        distance_field = self._distance_fields.get(
+            location_name
+        ) or self._reusable_distance_fields.get(location_name)
+        if distance_field is None:
+            distance_field = graphing.pathing.distance_field.DistanceField(
+                graph=self.graph,
+                source_nodes=self.world_map.tile_map.coordinate_of(
+                    location_name
+                ).edge_nodes,
+            )
+        self._distance_fields[location_name] = distance_field
+        return distance_field
+
+    @functools.cached_property
+    @instrumentation.span("path search")
+    def _location_name_to_distance_field(
+        self,
+    ) -> dict[str, graphing.pathing.distance_field.DistanceField]:
+        return {
+            location_name: self._distance_field(location_name)
+            for location_name in (
+                *self.world_data.port_names,
+                *self.world_data.city_names,
+            )
+        }
 
     @functools.cached_property
     def unused_edges(self) -> set[Edge]:
         """Returns all edges of the graph which are untouched by paths."""
-        return set(Paths._create_edges(self.graph.graph.edges)) - self._used_edges()
+        return set(self._graph_edges) - self._used_edges()
+
+    @functools.cached_property
+    def unrouted_edges(self) -> set[Edge]:
+        """
+        Returns all edges of the graph which lie on no shortest valid route of any
+        connection.
+        """
+        routed_edges = {
+            edge
+            for port_name, city_name in self.world_data.port_to_city_name_pairs
+            for edge in self._shortest_route_edges(
+                port_name=port_name,
+                city_name=city_name,
+            )
+        }
+        return set(self._graph_edges) - routed_edges
+
+    @functools.cached_property
+    def _graph_edges(self) -> list[Edge]:
+        return Paths._create_edges(self.graph.graph.edges)
 
     def _used_edges(self) -> set[Edge]:
         return {
@@ -75,6 +365,7 @@ class Paths:
         }
 
     @functools.cached_property
+    @instrumentation.span("path search")
     def _min_paths_dict(self) -> dict[str, dict[str, list[Edge]]]:
         world_data = self.world_data
 
@@ -83,6 +374,8 @@ class Paths:
         paths_dict = collections.defaultdict(dict)
         for port_name in world_data.port_names:
             port_edge_nodes = tile_map.coordinate_of(port_name).edge_nodes
+            # The search from each edge node of the port is shared by its cities.
+            port_edge_node_to_predecessors = {}
             for city_name in world_data.city_names_from(
                 port_name=port_name,
             ):
@@ -90,6 +383,7 @@ class Paths:
                 node_paths = self._collate_paths(
                     port_edge_nodes=port_edge_nodes,
                     city_edge_nodes=city_edge_nodes,
+                    port_edge_node_to_predecessors=port_edge_node_to_predecessors,
                 )
                 valid_paths = []
                 for min_node_path in node_paths:
@@ -98,6 +392,10 @@ class Paths:
                     )
                     if not Paths._invalid_path(path=min_edge_path):
                         valid_paths.append(min_edge_path)
+                metrics.count(metrics.PATHS_ENUMERATED, len(node_paths))
+                metrics.count(
+                    metrics.PATHS_DISCARDED, len(node_paths) - len(valid_paths)
+                )
 
                 min_valid_path_length = min(
                     map(len, valid_paths),
@@ -108,6 +406,23 @@ class Paths:
                     for valid_path in valid_paths
                     if len(valid_path) == min_valid_path_length
                 ]
+                if len(valid_paths) < len(node_paths):
+                    # Once the shortest paths of some pair of edge nodes are all
+                    # invalid, a longer valid route may be shorter than every path
+                    # left, or the only one, so it is searched for directly.
+                    route_distance = self._route_distance(
+                        port_name=port_name,
+                        city_name=city_name,
+                    )
+                    if route_distance is not None and (
+                        not valid_paths or route_distance < min_valid_path_length
+                    ):
+                        min_valid_paths = [
+                            self._route_edges(
+                                port_name=port_name,
+                                city_name=city_name,
+                            )
+                        ]
 
                 match len(min_valid_paths):
                     case 0:
@@ -134,14 +449,20 @@ class Paths:
         self,
         port_edge_nodes: frozenset[Node],
         city_edge_nodes: frozenset[Node],
+        port_edge_node_to_predecessors: dict[Node, dict[Node, list[Node]]],
     ) -> list[list[Node]]:
         all_paths = []
         for port_edge_node in port_edge_nodes:
+            node_to_predecessors = port_edge_node_to_predecessors.get(port_edge_node)
+            if node_to_predecessors is None:
+                node_to_predecessors = port_edge_node_to_predecessors[
+                    port_edge_node
+                ] = self.graph.shortest_path_predecessors(port_edge_node)
             for city_edge_node in city_edge_nodes:
                 try:
-                    paths = self.graph.all_shortest_paths(
-                        source_node=port_edge_node,
+                    paths = self.graph.shortest_paths_to(
                         target_node=city_edge_node,
+                        node_to_predecessors=node_to_predecessors,
                     )
                     all_paths += paths
                 except nx.NetworkXNoPath:
@@ -161,4 +482,6 @@ class Paths:
     def _create_edges(
         edges: typing.Iterable[tuple[Node, Node]],
     ) -> list[Edge]:
-        return [Edge(edge) for edge in edges]
+        created_edges = [Edge(edge) for edge in edges]
+        metrics.count(metrics.EDGES_CREATED, len(created_edges))
+        return created_edges
@@ -1,20 +1,27 @@
+import collections
 import dataclasses
+import hashlib
 import logging
 import os
+import pathlib
+import time
+import typing
 
 import annotations.annotator
+import annotations.layer_cache
 import data
-
-# why does this basic import work?
-import graphing
-import mapping
+import instrumentation
+import mapping.placements
+import memory
+import metrics
+import snapshot
 import stats
-
-# but this one doesn't? Is it because they were already imported?
 import tmx.tiled_map
 import validations
 
 PORT_LIMIT = 8
+MAP_LAYER_NAME = "map"
+TRACKS_LAYER_NAME = "tracks"
 
 logger = logging.getLogger(__name__)
 
@@ -26,71 +33,241 @@ class Helper:
     distances_path: os.PathLike
     tiles_path: os.PathLike
     tmx_path: os.PathLike
+    annotation_format: annotations.annotator.AnnotationFormat = (
+        annotations.annotator.AnnotationFormat.TILES
+    )
+    shortest_bounds: bool = False
+    metrics_registry: metrics.MetricsRegistry = dataclasses.field(
+        default_factory=metrics.MetricsRegistry
+    )
+    metrics_path: os.PathLike | None = None
+    memory_report: bool = False
 
-    def update_map(self) -> None:
-        """Re-reads the mapping and runs the helping methods."""
-        self._read_map()
-        self._run()
+    def update_map(
+        self,
+        checkpoint: typing.Callable[[], None] = lambda: None,
+    ) -> bool:
+        """
+        Re-reads the mapping and runs the helping methods, returning whether the map
+        was updated.
 
-    def _run(self) -> None:
-        self._stats()
-        self._validations()
-        self._annotations()
+        The checkpoint is called between each stage and may raise to abandon the
+        update before the map is saved. The update is skipped when the map and track
+        layers and the data files are unchanged since the last update.
+        """
+        recorder = (
+            memory.AllocationRecorder()
+            if self.memory_report
+            else instrumentation.SpanRecorder()
+        )
+        with instrumentation.recording(recorder), metrics.counting() as counter:
+            if not self._inputs_changed():
+                return False
+            try:
+                self._read_map()
+                checkpoint()
+                self._run(checkpoint=checkpoint)
+            except BaseException:
+                # The layers aren't annotated yet, so the next update must not be
+                # skipped as unchanged, including when this one was superseded.
+                self._map_digest = None
+                raise
+        logger.debug("Path cache: %s", self.snapshot.paths.path_cache)
+        self._report_timings(recorder=recorder)
+        self._report_metrics(counter=counter)
+        if self.memory_report:
+            self._report_memory(recorder=recorder)
+        return True
+
+    def _report_timings(
+        self,
+        recorder: instrumentation.SpanRecorder,
+    ) -> None:
+        stage_milliseconds = recorder.stage_milliseconds()
+        self.latency_histograms.add(stage_milliseconds)
+        logger.info(
+            "Stage timings: %s",
+            ", ".join(
+                f"{stage} {milliseconds:.1f}ms"
+                for stage, milliseconds in stage_milliseconds.items()
+            ),
+        )
+        logger.debug(
+            "Stage timings over the last %s updates (median/p95/max): %s",
+            len(self.latency_histograms),
+            self.latency_histograms,
+        )
+
+    def _report_metrics(
+        self,
+        counter: collections.Counter,
+    ) -> None:
+        logger.debug(
+            "Work counters: %s",
+            ", ".join(f"{name} {value}" for name, value in counter.items()),
+        )
+        self.metrics_registry.add(
+            map_name=pathlib.Path(self.tmx_path).name,
+            counter=counter,
+        )
+        if self.metrics_path is not None:
+            self.metrics_registry.write(self.metrics_path)
+
+    def _report_memory(
+        self,
+        recorder: memory.AllocationRecorder,
+    ) -> None:
+        current_snapshot = self.snapshot
+        logger.info(
+            "Memory report:\n%s",
+            self.memory_tracker.report(
+                name_to_structure={
+                    "data": current_snapshot.world_data,
+                    "tree": self.annotator.tiled_map.tree,
+                    "grids": current_snapshot.world_map,
+                    "graph": current_snapshot.graph,
+                    "paths": current_snapshot.paths,
+                    "annotation buffers": self.layer_cache,
+                },
+                recorder=recorder,
+            ),
+        )
+
+    def _run(
+        self,
+        checkpoint: typing.Callable[[], None],
+    ) -> None:
+        with instrumentation.span("stats"):
+            self._stats()
+        checkpoint()
+        with instrumentation.span("validation"):
+            self._validations()
+        checkpoint()
+        self._annotations(checkpoint=checkpoint)
 
     def __post_init__(self) -> None:
+        self.layer_cache = annotations.layer_cache.LayerCache()
+        self.latency_histograms = instrumentation.LatencyHistograms()
+        self.memory_tracker = memory.MemoryTracker()
+        self._data_digest = self._create_data_digest()
+        self._map_digest = None
+        self._read_data()
+        self._read_map()
+
+    def _inputs_changed(self) -> bool:
+        """
+        Returns whether the map and track layers or the data files have changed since
+        the last update, reloading the data files if they have changed.
+        """
+        start_time = time.perf_counter()
+        with instrumentation.span("change check"):
+            data_digest = self._create_data_digest()
+            map_digest = self._create_map_digest()
+        elapsed_milliseconds = (time.perf_counter() - start_time) * 1000
+
+        if data_digest != self._data_digest:
+            logger.info("Data files changed, reloading...")
+            self._read_data()
+            self.layer_cache.clear()
+            self._data_digest = data_digest
+            self._map_digest = map_digest
+            return True
+        if map_digest != self._map_digest:
+            self._map_digest = map_digest
+            logger.debug("Map changed (checked in %.1fms).", elapsed_milliseconds)
+            return True
+
+        logger.info(
+            "Map and track layers unchanged, skipping update (checked in %.1fms).",
+            elapsed_milliseconds,
+        )
+        return False
+
+    def _create_data_digest(self) -> bytes:
+        digest = hashlib.blake2b()
+        for path in (self.distances_path, self.tiles_path):
+            with open(path, "rb") as file:
+                digest.update(hashlib.blake2b(file.read()).digest())
+        return digest.digest()
+
+    def _create_map_digest(self) -> bytes:
+        layer_names = (MAP_LAYER_NAME, TRACKS_LAYER_NAME)
+        name_to_data_text = tmx.tiled_map.read_layer_data_texts(
+            filename=self.tmx_path,
+            names=layer_names,
+        )
+        digest = hashlib.blake2b()
+        for layer_name in layer_names:
+            data_text = name_to_data_text.get(layer_name, "")
+            digest.update(hashlib.blake2b(data_text.encode()).digest())
+        return digest.digest()
+
+    def _read_data(self) -> None:
+        logger.debug("Reading data...")
         self.world_data = data.Data(
             distances_filename=self.distances_path,
             tiles_filename=self.tiles_path,
             port_limit=PORT_LIMIT,
         )
-        self._read_map()
+        self.placement_table = mapping.placements.PlacementTable(
+            world_data=self.world_data,
+        )
 
     def _read_map(self) -> None:
+        """
+        Reads the map into a new snapshot and publishes it once it is complete.
+        """
         logger.debug("Reading map...")
-        tiled_map = tmx.tiled_map.TiledMap(
-            filename=self.tmx_path,
-        )
-        map_grid = tiled_map.get_layer_data(name="map")
-        track_grid = tiled_map.get_layer_data(name="tracks")
-        self.world_map = mapping.world.World.from_matrices_and_data(
+        with instrumentation.span("parse"):
+            tiled_map = tmx.tiled_map.TiledMap(
+                filename=self.tmx_path,
+            )
+        with instrumentation.span("decode"):
+            map_grid = tiled_map.get_layer_data(name=MAP_LAYER_NAME)
+            track_grid = tiled_map.get_layer_data(name=TRACKS_LAYER_NAME)
+        new_snapshot = snapshot.Snapshot.from_matrices_and_data(
             map_matrix=map_grid,
             track_matrix=track_grid,
             world_data=self.world_data,
-        )
-        graph = graphing.graph.Graph(
-            track_map=self.world_map.track_map,
-        )
-        self.paths = graphing.pathing.paths.Paths(
-            world_map=self.world_map,
-            world_data=self.world_data,
-            graph=graph,
+            placement_table=self.placement_table,
         )
         self.annotator = annotations.annotator.Annotator(
             tiled_map=tiled_map,
-            world_data=self.world_data,
-            paths=self.paths,
+            world_data=new_snapshot.world_data,
+            paths=new_snapshot.paths,
+            layer_cache=self.layer_cache,
+            annotation_format=self.annotation_format,
         )
+        self.snapshot = new_snapshot
 
     def _stats(self) -> None:
+        current_snapshot = self.snapshot
         stats.count_tracks(
-            world_map=self.world_map,
+            world_map=current_snapshot.world_map,
         )
-        stats.output_track_coordinates_count(
-            world_map=self.world_map,
+        stats.report_track_coordinates_count(
+            track_coordinates_table=current_snapshot.track_coordinates_table,
         )
         stats.find_unused_edges(
-            pathing=self.paths,
+            pathing=current_snapshot.paths,
         )
 
     def _validations(self) -> None:
-        validations.validate_track_placements(
-            world_map=self.world_map,
+        current_snapshot = self.snapshot
+        validations.report_track_placement_errors(
+            track_placement_errors=current_snapshot.track_placement_errors,
         )
-        validations.validate_distances(
-            world_data=self.world_data,
-            pathing=self.paths,
+        validations.report_distance_errors(
+            distance_errors=current_snapshot.distance_errors,
         )
 
-    def _annotations(self) -> None:
-        self.annotator.annotate_connections()
+    def _annotations(
+        self,
+        checkpoint: typing.Callable[[], None],
+    ) -> None:
+        with instrumentation.span("annotation"):
+            self.annotator.annotate_connections()
+            if self.shortest_bounds:
+                self.annotator.annotate_shortest_bounds()
+        checkpoint()
         self.annotator.save()
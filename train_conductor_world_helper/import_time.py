@@ -0,0 +1,115 @@
+"""Summarizes where the time of importing modules is spent, using -X importtime."""
+import dataclasses
+import logging
+import subprocess
+import sys
+import typing
+
+IMPORT_TIME_OPTION = "importtime"
+IMPORT_TIME_PREFIX = "import time:"
+DEFAULT_TOP_IMPORTS = 10
+
+logger = logging.getLogger(__name__)
+
+
+@dataclasses.dataclass(frozen=True)
+class ModuleImport:
+    """Represents the import of a module, timed in microseconds."""
+
+    name: str
+    depth: int
+    self_microseconds: int
+    cumulative_microseconds: int
+
+
+def is_tracing() -> bool:
+    """Returns whether the running interpreter reports its import times."""
+    return IMPORT_TIME_OPTION in sys._xoptions  # pylint: disable=protected-access
+
+
+def parse(lines: typing.Iterable[str]) -> list[ModuleImport]:
+    """Returns the module imports reported in the lines of -X importtime output."""
+    module_imports = []
+    for line in lines:
+        if not line.startswith(IMPORT_TIME_PREFIX):
+            continue
+        self_microseconds, cumulative_microseconds, name = line[
+            len(IMPORT_TIME_PREFIX) :
+        ].split("|")
+        if not self_microseconds.strip().isdigit():
+            # The header line.
+            continue
+        stripped_name = name.rstrip().lstrip(" ")
+        module_imports.append(
+            ModuleImport(
+                name=stripped_name,
+                depth=(len(name.rstrip()) - len(stripped_name) - 1) // 2,
+                self_microseconds=int(self_microseconds),
+                cumulative_microseconds=int(cumulative_microseconds),
+            )
+        )
+    return module_imports
+
+
+def summarize(
+    module_imports: list[ModuleImport],
+    limit: int = DEFAULT_TOP_IMPORTS,
+) -> str:
+    """
+    Returns the total time spent importing, followed by the imports that took the
+    longest including the modules they imported and by themselves.
+    """
+    top_level_imports = [
+        module_import for module_import in module_imports if module_import.depth == 0
+    ]
+    total_microseconds = sum(
+        imported.cumulative_microseconds for imported in top_level_imports
+    )
+    lines = [
+        f"Imported {len(module_imports)} modules in {total_microseconds / 1000:.1f}ms.",
+        "Slowest imports, including the modules they imported:",
+    ]
+    lines.extend(
+        f"  {imported.name} {imported.cumulative_microseconds / 1000:.1f}ms"
+        for imported in sorted(
+            top_level_imports,
+            key=lambda imported: imported.cumulative_microseconds,
+            reverse=True,
+        )[:limit]
+    )
+    lines.append("Slowest modules by themselves:")
+    lines.extend(
+        f"  {imported.name} {imported.self_microseconds / 1000:.1f}ms"
+        for imported in sorted(
+            module_imports,
+            key=lambda imported: imported.self_microseconds,
+            reverse=True,
+        )[:limit]
+    )
+    return "\n".join(lines)
+
+
+def run_traced(arguments: list[str]) -> int:
+    """
+    Runs the python arguments in a new interpreter reporting its import times,
+    passing its other error output through, then logs a summary of the import times
+    and returns the exit code.
+    """
+    with subprocess.Popen(
+        [sys.executable, "-X", IMPORT_TIME_OPTION, *arguments],
+        stderr=subprocess.PIPE,
+        text=True,
+    ) as process:
+        lines = []
+        try:
+            for line in process.stderr:
+                if line.startswith(IMPORT_TIME_PREFIX):
+                    lines.append(line)
+                else:
+                    sys.stderr.write(line)
+        except KeyboardInterrupt:
+            # The interrupt also reaches the traced interpreter, which shuts down.
+            pass
+        return_code = process.wait()
+    logger.info("Import times:\n%s", summarize(parse(lines)))
+    return return_code
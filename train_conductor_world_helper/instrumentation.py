@@ -0,0 +1,170 @@
+"""Holds the timing instrumentation of the stages of an update."""
+import cProfile
+import collections
+import contextlib
+import contextvars
+import dataclasses
+import json
+import logging
+import os
+import pathlib
+import statistics
+import threading
+import time
+import typing
+
+DEFAULT_HISTOGRAM_SIZE = 100
+CHROME_TRACE_SUFFIX = ".json"
+
+logger = logging.getLogger(__name__)
+
+_active_recorders: contextvars.ContextVar[
+    tuple["SpanRecorder", ...]
+] = contextvars.ContextVar("active_recorders", default=())
+
+
+@dataclasses.dataclass(frozen=True)
+class Span:
+    """Represents a named stage that ran for a duration."""
+
+    name: str
+    start_nanoseconds: int
+    duration_nanoseconds: int
+    thread_id: int
+
+    @property
+    def milliseconds(self) -> float:
+        """Returns the duration of the span in milliseconds."""
+        return self.duration_nanoseconds / 1_000_000
+
+
+class SpanRecorder:
+    """Records the spans that end while it is recording."""
+
+    def __init__(self) -> None:
+        self.spans: list[Span] = []
+        self._lock = threading.Lock()
+
+    def start(self, name: str) -> None:
+        """Called as a span of the named stage starts, before it is recorded."""
+
+    def record(self, span_: Span) -> None:
+        """Records the span."""
+        with self._lock:
+            self.spans.append(span_)
+
+    def stage_milliseconds(self) -> dict[str, float]:
+        """
+        Returns the total milliseconds spent in each stage, in the order the stages
+        first ended. Nested stages are also included in the stages around them.
+        """
+        stage_milliseconds = collections.defaultdict(float)
+        for span_ in self.spans:
+            stage_milliseconds[span_.name] += span_.milliseconds
+        return dict(stage_milliseconds)
+
+    def write_chrome_trace(self, filename: os.PathLike) -> None:
+        """Writes the spans as a Chrome trace event file."""
+        process_id = os.getpid()
+        trace_events = [
+            {
+                "name": span_.name,
+                "ph": "X",
+                "ts": span_.start_nanoseconds / 1000,
+                "dur": span_.duration_nanoseconds / 1000,
+                "pid": process_id,
+                "tid": span_.thread_id,
+            }
+            for span_ in self.spans
+        ]
+        with open(filename, "w", encoding="utf8") as file:
+            json.dump({"traceEvents": trace_events}, file)
+
+
+class LatencyHistograms:
+    """Represents rolling histograms of the milliseconds of each stage."""
+
+    def __init__(self, size: int = DEFAULT_HISTOGRAM_SIZE) -> None:
+        self.size = size
+        self._stage_to_milliseconds: dict[
+            str, collections.deque[float]
+        ] = collections.defaultdict(lambda: collections.deque(maxlen=self.size))
+
+    def add(self, stage_milliseconds: dict[str, float]) -> None:
+        """Adds the milliseconds of each stage of an update."""
+        for stage, milliseconds in stage_milliseconds.items():
+            self._stage_to_milliseconds[stage].append(milliseconds)
+
+    def percentiles(self, stage: str) -> tuple[float, float, float]:
+        """Returns the median, 95th percentile and maximum milliseconds of a stage."""
+        milliseconds = sorted(self._stage_to_milliseconds[stage])
+        if len(milliseconds) == 1:
+            return milliseconds[0], milliseconds[0], milliseconds[0]
+        cut_points = statistics.quantiles(milliseconds, n=20, method="inclusive")
+        return statistics.median(milliseconds), cut_points[-1], milliseconds[-1]
+
+    def __len__(self) -> int:
+        return max(map(len, self._stage_to_milliseconds.values()), default=0)
+
+    def __str__(self) -> str:
+        return ", ".join(
+            f"{stage} {median:.1f}/{p95:.1f}/{maximum:.1f}ms"
+            for stage in self._stage_to_milliseconds
+            for median, p95, maximum in [self.percentiles(stage)]
+        )
+
+
+@contextlib.contextmanager
+def span(name: str) -> typing.Iterator[None]:
+    """Times the stage run within the context for every active recorder."""
+    recorders = _active_recorders.get()
+    if not recorders:
+        yield
+        return
+    for recorder in recorders:
+        recorder.start(name)
+    start_nanoseconds = time.perf_counter_ns()
+    try:
+        yield
+    finally:
+        span_ = Span(
+            name=name,
+            start_nanoseconds=start_nanoseconds,
+            duration_nanoseconds=time.perf_counter_ns() - start_nanoseconds,
+            thread_id=threading.get_ident(),
+        )
+        for recorder in recorders:
+            recorder.record(span_)
+
+
+@contextlib.contextmanager
+def recording(recorder: SpanRecorder) -> typing.Iterator[SpanRecorder]:
+    """Records the spans that end within the context to the recorder."""
+    token = _active_recorders.set((*_active_recorders.get(), recorder))
+    try:
+        yield recorder
+    finally:
+        _active_recorders.reset(token)
+
+
+@contextlib.contextmanager
+def profiling(filename: os.PathLike) -> typing.Iterator[None]:
+    """
+    Profiles the run within the context, writing the spans as a Chrome trace event
+    file if the filename ends in .json, otherwise writing cProfile stats.
+    """
+    if pathlib.Path(filename).suffix == CHROME_TRACE_SUFFIX:
+        with recording(SpanRecorder()) as recorder:
+            try:
+                yield
+            finally:
+                recorder.write_chrome_trace(filename)
+    else:
+        profile = cProfile.Profile()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            profile.dump_stats(filename)
+    logger.info("Wrote profile to %s.", filename)
@@ -0,0 +1,83 @@
+"""Holds a bounded least recently used cache."""
+import collections
+import threading
+import typing
+
+DEFAULT_MAX_SIZE = 1024
+
+Key = typing.TypeVar("Key", bound=typing.Hashable)
+Value = typing.TypeVar("Value")
+
+
+class LruCache(typing.Generic[Key, Value]):
+    """
+    A thread safe cache holding at most `max_size` values, evicting the least
+    recently used value when full, which counts its hits and misses.
+    """
+
+    def __init__(
+        self,
+        max_size: int = DEFAULT_MAX_SIZE,
+    ) -> None:
+        if max_size < 1:
+            raise ValueError(f"max_size must be positive but was {max_size}.")
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._key_to_value: collections.OrderedDict[
+            Key, Value
+        ] = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_create(
+        self,
+        key: Key,
+        create_value: typing.Callable[[], Value],
+    ) -> Value:
+        """
+        Returns the cached value for the key, creating and caching it with
+        `create_value` if it is not cached.
+
+        Values are shared between lookups and must not be modified.
+        """
+        key_to_value = self._key_to_value
+        with self._lock:
+            try:
+                value = key_to_value[key]
+            except KeyError:
+                self.misses += 1
+            else:
+                self.hits += 1
+                key_to_value.move_to_end(key)
+                return value
+
+        value = create_value()
+        with self._lock:
+            key_to_value[key] = value
+            if len(key_to_value) > self.max_size:
+                key_to_value.popitem(last=False)
+        return value
+
+    def clear(self) -> None:
+        """Removes all cached values and resets the counters."""
+        with self._lock:
+            self._key_to_value.clear()
+            self.hits = 0
+            self.misses = 0
+
+    @property
+    def hit_rate(self) -> float:
+        """Returns the fraction of lookups that were served from the cache."""
+        lookups = self.hits + self.misses
+        if lookups == 0:
+            return 0.0
+        return self.hits / lookups
+
+    def __len__(self) -> int:
+        return len(self._key_to_value)
+
+    def __str__(self) -> str:
+        return (
+            f"{len(self)}/{self.max_size} cached, "
+            f"{self.hits} hits, {self.misses} misses ({self.hit_rate:.0%} hit rate)"
+        )
@@ -2,13 +2,17 @@
 
 """Represents the command line interface for the helper."""
 
+import contextlib
 import logging
 import pathlib
+import sys
+import threading
+import tracemalloc
+import typing
 
 import click
 
-import helper
-import updater
+import import_time
 
 DATA_DIR = pathlib.Path("./data/")
 DEFAULT_DISTANCES_FILENAME = DATA_DIR / "distances.json"
@@ -16,6 +20,8 @@ DEFAULT_TILES_FILENAME = DATA_DIR / "tiles.json"
 DEFAULT_TMX_FILENAME = DATA_DIR / "train-conductor-world.tmx"
 DEFAULT_AUTO_UPDATE = True
 DEFAULT_LOGGING_LEVEL = logging.INFO
+DEFAULT_ANNOTATION_FORMAT = "tiles"
+DEFAULT_DEBOUNCE_SECONDS = 0.5
 
 
 @click.command()
@@ -26,8 +32,15 @@ DEFAULT_LOGGING_LEVEL = logging.INFO
 )
 @click.option(
     "--tmx-path",
-    help="Path to mapping tmx file.",
-    default=DEFAULT_TMX_FILENAME,
+    help="Path to mapping tmx file. Can be given multiple times.",
+    multiple=True,
+    default=[DEFAULT_TMX_FILENAME],
+)
+@click.option(
+    "--maps-directory",
+    help="Path to a directory whose tmx files are all used, instead of --tmx-path.",
+    type=click.Path(exists=True, file_okay=False),
+    default=None,
 )
 @click.option(
     "--tiles-path",
@@ -39,6 +52,80 @@ DEFAULT_LOGGING_LEVEL = logging.INFO
     help="Whether to update the tmx file on changes.",
     default=DEFAULT_AUTO_UPDATE,
 )
+@click.option(
+    "--debounce-seconds",
+    help="Seconds to wait after the last change before updating the tmx file.",
+    type=click.FloatRange(min=0),
+    default=DEFAULT_DEBOUNCE_SECONDS,
+)
+@click.option(
+    "--annotation-format",
+    help="Whether to annotate connections as tile layers or as polyline objects.",
+    type=click.Choice(["tiles", "objects"]),
+    default=DEFAULT_ANNOTATION_FORMAT,
+)
+@click.option(
+    "--shortest-bounds",
+    is_flag=True,
+    help="Annotates every shortest valid route of each connection.",
+    default=False,
+)
+@click.option(
+    "--stdin-queries",
+    is_flag=True,
+    help=(
+        "Answers JSON queries read one per line from stdin, writing each response as "
+        "a line to stdout, instead of updating the maps."
+    ),
+    default=False,
+)
+@click.option(
+    "--serve-port",
+    help="Serves JSON queries about the maps on this localhost port.",
+    type=click.IntRange(min=0, max=65535),
+    default=None,
+)
+@click.option(
+    "--profile",
+    "profile_path",
+    help=(
+        "Profiles a run with --no-auto-update, writing a Chrome trace event file of "
+        "the stages if the path ends in .json, otherwise cProfile stats."
+    ),
+    type=click.Path(dir_okay=False),
+    default=None,
+)
+@click.option(
+    "--metrics-path",
+    help=(
+        "Writes the work counters of every map to this file after each update, as "
+        "JSON if the path ends in .json, otherwise in the Prometheus text format."
+    ),
+    type=click.Path(dir_okay=False),
+    default=None,
+)
+@click.option(
+    "--memory-report",
+    is_flag=True,
+    help=(
+        "Traces memory and logs the bytes retained by each structure and the lines "
+        "whose held allocations grew the most in each stage and since the previous "
+        "update, after each update. Tracing makes "
+        "updates around four times slower, and the retained bytes take a further "
+        "walk over every structure."
+    ),
+    default=False,
+)
+@click.option(
+    "--import-time",
+    "import_time_report",
+    is_flag=True,
+    help=(
+        "Runs the helper with -X importtime and logs which imports took the longest "
+        "once it exits."
+    ),
+    default=False,
+)
 @click.option(
     "--verbose",
     is_flag=True,
@@ -46,32 +133,124 @@ DEFAULT_LOGGING_LEVEL = logging.INFO
     default=False,
 )
 def main(
-    tmx_path: pathlib.Path,
+    tmx_path: tuple[pathlib.Path, ...],
+    maps_directory: pathlib.Path | None,
     tiles_path: pathlib.Path,
     distances_path: pathlib.Path,
     auto_update: bool,
+    debounce_seconds: float,
+    annotation_format: str,
+    shortest_bounds: bool,
+    stdin_queries: bool,
+    serve_port: int | None,
+    profile_path: pathlib.Path | None,
+    metrics_path: pathlib.Path | None,
+    memory_report: bool,
+    import_time_report: bool,
     verbose: bool,
 ) -> None:
     """The main entry point for the helper."""
+    if profile_path is not None and auto_update:
+        raise click.UsageError("--profile requires --no-auto-update.")
+
     logging_level = logging.DEBUG if verbose else DEFAULT_LOGGING_LEVEL
     logging.basicConfig(level=logging_level)
+    if import_time_report and not import_time.is_tracing():
+        sys.exit(import_time.run_traced(sys.argv))
+    # The subsystems are imported once the arguments are parsed, and only where
+    # they are used, so that the command line starts without paying for them.
+    # pylint: disable=import-outside-toplevel
+    import helper
+    import instrumentation
+    import metrics
+    import tmx.tiled_map
+
+    if memory_report:
+        # Started once the modules are imported, so that their allocations aren't
+        # traced and compared in every snapshot.
+        tracemalloc.start()
+
+    path_to_helper = {}
+    metrics_registry = metrics.MetricsRegistry()
+    if serve_port is not None:
+        import server
+
+        query_server = server.QueryServer(
+            path_to_helper=path_to_helper,
+            port=serve_port,
+        )
+        query_server.start()
+
+    def create_helper(map_path: pathlib.Path) -> helper.Helper:
+        train_conductor_world_helper = helper.Helper(
+            tmx_path=map_path,
+            distances_path=distances_path,
+            tiles_path=tiles_path,
+            annotation_format=helper.annotations.annotator.AnnotationFormat(
+                annotation_format
+            ),
+            shortest_bounds=shortest_bounds,
+            metrics_registry=metrics_registry,
+            metrics_path=metrics_path,
+            memory_report=memory_report,
+        )
+        path_to_helper[map_path] = train_conductor_world_helper
+        return train_conductor_world_helper
+
+    def create_update_function(
+        map_path: pathlib.Path,
+    ) -> typing.Callable[[typing.Callable[[], None]], None]:
+        train_conductor_world_helper = create_helper(map_path)
+
+        def update_function(checkpoint: typing.Callable[[], None] = lambda: None):
+            train_conductor_world_helper.update_map(checkpoint=checkpoint)
+
+        return update_function
+
+    if maps_directory is None:
+        map_paths = tmx_path
+    else:
+        map_paths = sorted(
+            pathlib.Path(maps_directory).glob(f"*{tmx.tiled_map.MAP_SUFFIX}")
+        )
 
-    train_conductor_world_helper = helper.Helper(
-        tmx_path=tmx_path,
-        distances_path=distances_path,
-        tiles_path=tiles_path,
-    )
+    if stdin_queries:
+        import query_stream
 
-    def update_function():
-        train_conductor_world_helper.update_map()
+        for map_path in map_paths:
+            create_helper(map_path)
+        for response_line in query_stream.answer_lines(
+            lines=sys.stdin,
+            path_to_helper=path_to_helper,
+        ):
+            sys.stdout.write(response_line + "\n")
+            sys.stdout.flush()
+    elif auto_update:
+        import updater
 
-    if auto_update:
-        updater.poll_and_call_on_updates(
-            filename=tmx_path,
-            callable_on_update=update_function,
+        watch_service = updater.WatchService(
+            create_update_callable=create_update_function,
+            debounce_seconds=debounce_seconds,
         )
+        if maps_directory is None:
+            for map_path in tmx_path:
+                watch_service.watch_file(map_path)
+        else:
+            watch_service.watch_directory(maps_directory)
+        watch_service.run()
     else:
-        update_function()
+        with (
+            contextlib.nullcontext()
+            if profile_path is None
+            else instrumentation.profiling(profile_path)
+        ):
+            for map_path in map_paths:
+                create_update_function(map_path)()
+        if serve_port is not None:
+            try:
+                threading.Event().wait()
+            except KeyboardInterrupt:
+                pass
 
 
 if __name__ == "__main__":
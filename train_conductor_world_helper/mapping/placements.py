@@ -0,0 +1,79 @@
+"""Holds the legality of placing each track tile on each map tile."""
+import functools
+
+import data
+import mapping.coordinate
+import mapping.tile
+import mapping.world
+
+
+class PlacementTable:
+    """
+    Represents a table of whether each track tile can be placed on each tile.
+
+    The table is built once from the tile data, so that checking a placement is a
+    lookup rather than comparing the names, overlays and types of the tiles.
+    """
+
+    def __init__(
+        self,
+        world_data: data.Data,
+    ) -> None:
+        origin = mapping.coordinate.Coordinate(x=0, y=0)
+        tiles = [
+            mapping.tile.Tile.create_tile(
+                id_=tile_id,
+                coordinate=origin,
+                world_data=world_data,
+            )
+            for tile_id in world_data.tile_ids
+        ]
+        self.track_tile_ids = world_data.track_tile_ids
+        self._stride = max(tile.id for tile in tiles) + 1
+        self._legal = bytearray(self._stride * self._stride)
+        for track_tile in tiles:
+            if not track_tile.is_track:
+                continue
+            offset = track_tile.id * self._stride
+            for tile in tiles:
+                self._legal[offset + tile.id] = track_tile.placeable_on(tile)
+
+    def is_legal(
+        self,
+        track_tile_id: int,
+        tile_id: int,
+    ) -> bool:
+        """Returns whether the track tile can be placed on the tile."""
+        return bool(self._legal[track_tile_id * self._stride + tile_id])
+
+    def allowed_track_tile_ids(
+        self,
+        tile_id: int,
+    ) -> list[int]:
+        """Returns the ids of the track tiles that can be placed on the tile."""
+        return self._tile_id_to_allowed_track_tile_ids[tile_id]
+
+    @functools.cached_property
+    def _tile_id_to_allowed_track_tile_ids(self) -> dict[int, list[int]]:
+        return {
+            tile_id: [
+                track_tile_id
+                for track_tile_id in self.track_tile_ids
+                if self.is_legal(track_tile_id=track_tile_id, tile_id=tile_id)
+            ]
+            for tile_id in range(self._stride)
+        }
+
+    def allowed_track_tile_ids_at(
+        self,
+        world_map: mapping.world.World,
+        coordinate: mapping.coordinate.Coordinate,
+    ) -> list[int]:
+        """
+        Returns the ids of the track tiles that can be placed at the coordinate of the
+        world mapping.
+        """
+        map_tile = world_map.tile_map[coordinate]
+        if map_tile is None:
+            return []
+        return self.allowed_track_tile_ids(tile_id=map_tile.id)
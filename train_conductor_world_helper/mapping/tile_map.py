@@ -41,6 +41,29 @@ class TileMap:
 
         return cls(grid=grid, width=width, height=height)
 
+    def with_tile_ids(
+        self,
+        coordinate_to_tile_id: dict[Coordinate, int],
+        world_data: data.Data,
+    ) -> "TileMap":
+        """
+        Returns a copy of the tile map with the tiles at the given coordinates replaced,
+        sharing the rows that are left unchanged.
+        """
+        grid = list(self.grid)
+        copied_rows = set()
+        for coordinate, id_ in coordinate_to_tile_id.items():
+            x, y = coordinate.x, coordinate.y
+            if y not in copied_rows:
+                grid[y] = list(grid[y])
+                copied_rows.add(y)
+            grid[y][x] = Tile.create_tile(
+                id_=id_,
+                coordinate=coordinate,
+                world_data=world_data,
+            )
+        return TileMap(grid=grid, width=self.width, height=self.height)
+
     @functools.cached_property
     def _name_to_coordinate(self) -> dict[str, Coordinate]:
         return {tile.name: tile.coordinate for tile in self if tile.group == "Location"}
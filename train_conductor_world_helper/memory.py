@@ -0,0 +1,244 @@
+"""Holds the memory accounting of the structures and stages of an update."""
+import collections
+import gc
+import logging
+import os
+import sys
+import threading
+import tracemalloc
+import types
+import typing
+
+import instrumentation
+
+DEFAULT_TOP_SITES = 5
+
+# Objects shared by everything, which no structure retains.
+_SHARED_TYPES = (
+    type,
+    types.ModuleType,
+    types.FunctionType,
+    types.BuiltinFunctionType,
+    types.MethodType,
+    logging.Logger,
+)
+# Files whose allocations are the accounting's own rather than an update's.
+_IGNORED_FILENAMES = (tracemalloc.__file__, instrumentation.__file__, __file__)
+
+
+def retained_sizes(name_to_structure: dict[str, object]) -> dict[str, int]:
+    """
+    Returns the bytes of every object reachable from each structure, counting an
+    object reachable from several structures only in the first of them.
+    """
+    seen = set()
+    return {
+        name: _deep_size(structure, seen=seen)
+        for name, structure in name_to_structure.items()
+    }
+
+
+def _deep_size(structure: object, seen: set[int]) -> int:
+    size = 0
+    objects = [structure]
+    while objects:
+        object_ = objects.pop()
+        if id(object_) in seen or isinstance(object_, _SHARED_TYPES):
+            continue
+        seen.add(id(object_))
+        size += sys.getsizeof(object_)
+        objects.extend(gc.get_referents(object_))
+    return size
+
+
+# The count of each allocation still held, keyed by its raw trace.
+HeldTraces = collections.Counter
+
+
+class Site(typing.NamedTuple):
+    """Represents how the memory held that was allocated by a line changed."""
+
+    filename: str
+    lineno: int
+    size_diff: int
+    count_diff: int
+
+
+def held_traces() -> HeldTraces:
+    """Returns the allocations still held, from a snapshot of the traced memory."""
+    # Counting the raw traces is several times faster than grouping them by line,
+    # so only those that changed between snapshots are grouped.
+    return collections.Counter(
+        tracemalloc.take_snapshot().traces._traces  # pylint: disable=protected-access
+    )
+
+
+def top_sites(
+    traces: HeldTraces,
+    previous_traces: HeldTraces,
+    limit: int = DEFAULT_TOP_SITES,
+) -> list[Site]:
+    """Returns the lines whose allocations still held grew the most between traces."""
+    frame_to_growth = collections.defaultdict(lambda: [0, 0])
+    for sign, changed_traces in (
+        (1, traces - previous_traces),
+        (-1, previous_traces - traces),
+    ):
+        for (_, size, frames, _), count in changed_traces.items():
+            growth = frame_to_growth[frames[0]]
+            growth[0] += sign * size * count
+            growth[1] += sign * count
+    sites = [
+        Site(
+            filename=filename, lineno=lineno, size_diff=size_diff, count_diff=count_diff
+        )
+        for (filename, lineno), (size_diff, count_diff) in frame_to_growth.items()
+        if size_diff > 0 and filename not in _IGNORED_FILENAMES
+    ]
+    return sorted(sites, key=lambda site: site.size_diff, reverse=True)[:limit]
+
+
+class AllocationRecorder(instrumentation.SpanRecorder):
+    """
+    Records the spans that end while it is recording, along with the lines whose
+    allocations grew the most within each stage.
+
+    Memory must be traced with tracemalloc for allocations to be recorded. The
+    traces are snapshotted once as each outermost stage ends, and compared with
+    those as the stage before it ended, or as the first stage started, rather than
+    snapshotting both ends of every stage. Allocations between stages are counted
+    in the stage after them, and those of a nested stage in the stage around it.
+    """
+
+    def __init__(self, limit: int = DEFAULT_TOP_SITES) -> None:
+        super().__init__()
+        self.limit = limit
+        self.stage_to_sites: dict[str, list[Site]] = collections.defaultdict(list)
+        # The allocations held as the last outermost stage ended.
+        self.traces: HeldTraces | None = None
+        self._local = threading.local()
+
+    def start(self, name: str) -> None:
+        stages = self._stages()
+        stages.append(name)
+        if len(stages) == 1 and self.traces is None and tracemalloc.is_tracing():
+            traces = held_traces()
+            with self._lock:
+                self.traces = traces
+
+    def record(self, span_: instrumentation.Span) -> None:
+        stages = self._stages()
+        stage = stages.pop() if stages else span_.name
+        if not stages and tracemalloc.is_tracing():
+            traces = held_traces()
+            with self._lock:
+                if self.traces is not None:
+                    self.stage_to_sites[stage] = _merge_sites(
+                        [
+                            *self.stage_to_sites[stage],
+                            *top_sites(
+                                traces=traces,
+                                previous_traces=self.traces,
+                                limit=self.limit,
+                            ),
+                        ],
+                        limit=self.limit,
+                    )
+                self.traces = traces
+        super().record(span_)
+
+    def _stages(self) -> list[str]:
+        # The names of the stages running on this thread, outermost first.
+        if not hasattr(self._local, "stages"):
+            self._local.stages = []
+        return self._local.stages
+
+
+def _merge_sites(sites: list[Site], limit: int) -> list[Site]:
+    # Sums the growth of each line across the spans of a stage.
+    line_to_site = {}
+    for site in sites:
+        line = (site.filename, site.lineno)
+        merged_site = line_to_site.get(line)
+        line_to_site[line] = (
+            site
+            if merged_site is None
+            else site._replace(
+                size_diff=merged_site.size_diff + site.size_diff,
+                count_diff=merged_site.count_diff + site.count_diff,
+            )
+        )
+    return sorted(line_to_site.values(), key=lambda site: site.size_diff, reverse=True)[
+        :limit
+    ]
+
+
+class MemoryTracker:
+    """
+    Tracks the memory retained by each structure across updates, and the lines
+    whose allocations grew the most since the previous update.
+    """
+
+    def __init__(self, limit: int = DEFAULT_TOP_SITES) -> None:
+        self.limit = limit
+        self._previous_sizes: dict[str, int] = {}
+        self._previous_traces: HeldTraces | None = None
+
+    def report(
+        self,
+        name_to_structure: dict[str, object],
+        recorder: AllocationRecorder | None = None,
+    ) -> str:
+        """
+        Returns a report of the bytes retained by each structure and how they
+        changed since the previous report, the lines that allocated the most in each
+        stage recorded by the recorder, and the lines that grew the most between the
+        end of the recorder's last stage and that of the previous report's.
+        """
+        sizes = retained_sizes(name_to_structure)
+        lines = [
+            "Retained: "
+            + ", ".join(
+                f"{name} {_format_bytes(size)}"
+                + (
+                    f" ({_format_bytes(size - self._previous_sizes[name], sign=True)})"
+                    if name in self._previous_sizes
+                    else ""
+                )
+                for name, size in sizes.items()
+            )
+        ]
+        self._previous_sizes = sizes
+
+        if recorder is not None:
+            for stage, sites in recorder.stage_to_sites.items():
+                if sites:
+                    lines.append(f"Allocated in {stage}:")
+                    lines.extend(f"  {_format_site(site)}" for site in sites)
+
+            if recorder.traces is not None:
+                if self._previous_traces is not None:
+                    sites = top_sites(
+                        traces=recorder.traces,
+                        previous_traces=self._previous_traces,
+                        limit=self.limit,
+                    )
+                    if sites:
+                        lines.append("Grown since the previous update:")
+                        lines.extend(f"  {_format_site(site)}" for site in sites)
+                self._previous_traces = recorder.traces
+        return "\n".join(lines)
+
+
+def _format_site(site: Site) -> str:
+    filename = site.filename
+    if not os.path.relpath(filename).startswith(os.pardir):
+        filename = os.path.relpath(filename)
+    return (
+        f"{filename}:{site.lineno} {_format_bytes(site.size_diff, sign=True)}"
+        f" in {site.count_diff:+} blocks"
+    )
+
+
+def _format_bytes(size: int, sign: bool = False) -> str:
+    return f"{size / 1024:{'+' if sign else ''}.0f}KiB"
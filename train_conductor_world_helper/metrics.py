@@ -0,0 +1,119 @@
+"""Holds the counters of the work done by each update, and their export."""
+import collections
+import contextlib
+import contextvars
+import json
+import os
+import pathlib
+import threading
+import typing
+
+METRIC_PREFIX = "train_conductor"
+JSON_SUFFIX = ".json"
+
+BFS_EXPANSIONS = "bfs_expansions"
+PATHS_ENUMERATED = "paths_enumerated"
+PATHS_DISCARDED = "paths_discarded"
+EDGES_CREATED = "edges_created"
+ANNOTATION_CELLS_WRITTEN = "annotation_cells_written"
+LAYERS_WRITTEN = "layers_written"
+BYTES_WRITTEN = "bytes_written"
+
+_active_counters: contextvars.ContextVar[
+    tuple[collections.Counter, ...]
+] = contextvars.ContextVar("active_counters", default=())
+
+
+def count(name: str, amount: int = 1) -> None:
+    """Adds the amount to the named counter of every update being counted."""
+    for counter in _active_counters.get():
+        counter[name] += amount
+
+
+@contextlib.contextmanager
+def counting() -> typing.Iterator[collections.Counter]:
+    """Counts the work done within the context into the yielded counter."""
+    counter = collections.Counter()
+    token = _active_counters.set((*_active_counters.get(), counter))
+    try:
+        yield counter
+    finally:
+        _active_counters.reset(token)
+
+
+class MetricsRegistry:
+    """
+    Represents the counters of the updates of each map, both of the last update and
+    in total.
+    """
+
+    def __init__(self) -> None:
+        self._map_name_to_last_update: dict[str, collections.Counter] = {}
+        self._map_name_to_totals: dict[
+            str, collections.Counter
+        ] = collections.defaultdict(collections.Counter)
+        self._map_name_to_updates: collections.Counter = collections.Counter()
+        self._lock = threading.RLock()
+
+    def add(
+        self,
+        map_name: str,
+        counter: collections.Counter,
+    ) -> None:
+        """Adds the counter of an update of the map."""
+        with self._lock:
+            self._map_name_to_last_update[map_name] = counter
+            self._map_name_to_totals[map_name].update(counter)
+            self._map_name_to_updates[map_name] += 1
+
+    def to_dict(self) -> dict[str, dict]:
+        """Returns the counters of each map as a dictionary."""
+        with self._lock:
+            return {
+                map_name: {
+                    "updates": self._map_name_to_updates[map_name],
+                    "last_update": dict(last_update),
+                    "totals": dict(self._map_name_to_totals[map_name]),
+                }
+                for map_name, last_update in self._map_name_to_last_update.items()
+            }
+
+    def to_prometheus(self) -> str:
+        """Returns the counters of each map in the Prometheus text format."""
+        name_to_samples = collections.defaultdict(list)
+        for map_name, map_metrics in self.to_dict().items():
+            labels = f'{{map="{_escape_label(map_name)}"}}'
+            name_to_samples[("updates_total", "counter")].append(
+                (labels, map_metrics["updates"])
+            )
+            for name, value in map_metrics["totals"].items():
+                name_to_samples[(f"{name}_total", "counter")].append((labels, value))
+            for name, value in map_metrics["last_update"].items():
+                name_to_samples[(f"{name}_last_update", "gauge")].append(
+                    (labels, value)
+                )
+
+        lines = []
+        for (name, metric_type), samples in name_to_samples.items():
+            metric_name = f"{METRIC_PREFIX}_{name}"
+            lines.append(f"# TYPE {metric_name} {metric_type}")
+            for labels, value in samples:
+                lines.append(f"{metric_name}{labels} {value}")
+        return "".join(f"{line}\n" for line in lines)
+
+    def write(self, filename: os.PathLike) -> None:
+        """
+        Writes the counters to the file as JSON if the filename ends in .json,
+        otherwise in the Prometheus text format.
+        """
+        with self._lock:
+            if pathlib.Path(filename).suffix == JSON_SUFFIX:
+                content = json.dumps(self.to_dict(), indent=2)
+            else:
+                content = self.to_prometheus()
+            with open(filename, "w", encoding="utf8") as file:
+                file.write(content)
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
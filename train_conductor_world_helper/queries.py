@@ -0,0 +1,355 @@
+"""Answers JSON queries about the state of the train conductor world mapping."""
+import logging
+import os
+import pathlib
+import typing
+
+import mapping.coordinate
+import mapping.tile
+import route_planner
+import snapshot
+import what_if
+
+logger = logging.getLogger(__name__)
+
+Query = dict[str, typing.Any]
+Response = dict[str, typing.Any]
+T = typing.TypeVar("T")
+
+
+class QueryError(ValueError):
+    """Raised when a query can't be answered."""
+
+
+def answer(
+    world_snapshot: snapshot.Snapshot,
+    query: Query,
+) -> Response:
+    """
+    Returns the response to the query about the snapshot, raising a QueryError if
+    it is invalid.
+    """
+    query_type = query.get("query")
+    if not isinstance(query_type, str) or query_type not in _QUERY_TYPE_TO_FUNCTION:
+        raise QueryError(
+            f"Unknown query `{query_type}`, expected one of "
+            f"{', '.join(_QUERY_TYPE_TO_FUNCTION)}."
+        )
+    query_function = _QUERY_TYPE_TO_FUNCTION[query_type]
+    try:
+        return query_function(world_snapshot, query)
+    except KeyError as error:
+        raise QueryError(f"Unknown or missing {error} in query.") from error
+    except TypeError as error:
+        raise QueryError(f"Invalid value in query: {error}") from error
+
+
+def for_map(
+    path_to_value: dict[os.PathLike, T],
+    map_name: str | None,
+) -> T:
+    """
+    Returns the value of the map with the given file name, which may be left out
+    when there is only one map, raising a QueryError if there is no such map.
+    """
+    map_names = ", ".join(pathlib.Path(path).name for path in path_to_value)
+    if map_name is None:
+        if len(path_to_value) != 1:
+            raise QueryError(f"`map` must be given, expected one of {map_names}.")
+        return next(iter(path_to_value.values()))
+    for path, value in path_to_value.items():
+        if pathlib.Path(path).name == map_name:
+            return value
+    raise QueryError(f"Unknown map `{map_name}`, expected one of {map_names}.")
+
+
+def _distance(
+    world_snapshot: snapshot.Snapshot,
+    query: Query,
+) -> Response:
+    port_name = query["port"]
+    city_name = query["city"]
+    world_data = world_snapshot.world_data
+    paths = world_snapshot.paths
+    if (port_name, city_name) not in world_data.port_to_city_name_pairs:
+        raise QueryError(f"{port_name} -> {city_name} is not a connection.")
+    return {
+        "port": port_name,
+        "city": city_name,
+        "expected_distance": world_data.distance_between(
+            port_name=port_name,
+            city_name=city_name,
+        ),
+        "actual_distance": paths.distance_between(
+            port_name=port_name,
+            city_name=city_name,
+        ),
+    }
+
+
+def _path(
+    world_snapshot: snapshot.Snapshot,
+    query: Query,
+) -> Response:
+    port_name = query["port"]
+    city_name = query["city"]
+    world_data = world_snapshot.world_data
+    if (port_name, city_name) not in world_data.port_to_city_name_pairs:
+        raise QueryError(f"{port_name} -> {city_name} is not a connection.")
+    coordinate_to_path_component = world_snapshot.paths.connection_path(
+        port_name=port_name,
+        city_name=city_name,
+    )
+    return {
+        "port": port_name,
+        "city": city_name,
+        "cells": [
+            {
+                "x": coordinate.x,
+                "y": coordinate.y,
+                "path_component": path_component.name,
+            }
+            for coordinate, path_component in coordinate_to_path_component.items()
+        ],
+    }
+
+
+def _validation(
+    world_snapshot: snapshot.Snapshot,
+    query: Query,  # pylint: disable=unused-argument
+) -> Response:
+    return {
+        "track_placement_errors": [
+            {
+                "x": track_tile.coordinate.x,
+                "y": track_tile.coordinate.y,
+                "track": track_tile.name,
+                "track_type": track_tile.type,
+                "environment": map_tile.name,
+            }
+            for track_tile, map_tile in world_snapshot.track_placement_errors
+        ],
+        "distance_errors": [
+            {
+                "port": port_name,
+                "city": city_name,
+                "expected_distance": expected_distance,
+                "actual_distance": actual_distance,
+            }
+            for (
+                port_name,
+                city_name,
+                expected_distance,
+                actual_distance,
+            ) in world_snapshot.distance_errors
+        ],
+    }
+
+
+def _coordinate(
+    world_snapshot: snapshot.Snapshot,
+    query: Query,
+) -> mapping.coordinate.Coordinate:
+    tile_map = world_snapshot.world_map.tile_map
+    x = query["x"]
+    y = query["y"]
+    if not (
+        isinstance(x, int)
+        and isinstance(y, int)
+        and 0 <= x < tile_map.width
+        and 0 <= y < tile_map.height
+    ):
+        raise QueryError(f"({x}, {y}) is not a coordinate on the map.")
+    return mapping.coordinate.Coordinate(x=x, y=y)
+
+
+def _tile_response(tile: mapping.tile.Tile | None) -> Response | None:
+    if tile is None:
+        return None
+    return {
+        "tile_id": tile.id,
+        "name": tile.name,
+        "group": tile.group,
+        "type": tile.type,
+    }
+
+
+def _tile_at(
+    world_snapshot: snapshot.Snapshot,
+    query: Query,
+) -> Response:
+    coordinate = _coordinate(world_snapshot=world_snapshot, query=query)
+    world_map = world_snapshot.world_map
+    return {
+        "x": coordinate.x,
+        "y": coordinate.y,
+        "tile": _tile_response(world_map.tile_map[coordinate]),
+        "track": _tile_response(world_map.track_map[coordinate]),
+    }
+
+
+def _placement_check(
+    world_snapshot: snapshot.Snapshot,
+    query: Query,
+) -> Response:
+    coordinate = _coordinate(world_snapshot=world_snapshot, query=query)
+    tile_id = query["tile_id"]
+    world_data = world_snapshot.world_data
+    if tile_id not in world_data.track_tile_ids:
+        raise QueryError(f"{tile_id} is not the id of a track tile.")
+    map_tile = world_snapshot.world_map.tile_map[coordinate]
+    return {
+        "x": coordinate.x,
+        "y": coordinate.y,
+        "tile_id": tile_id,
+        "track": world_data.data_of(tile_id=tile_id)["name"],
+        "environment": None if map_tile is None else map_tile.name,
+        "legal": map_tile is not None
+        and world_snapshot.placement_table.is_legal(
+            track_tile_id=tile_id,
+            tile_id=map_tile.id,
+        ),
+    }
+
+
+def _allowed_tracks(
+    world_snapshot: snapshot.Snapshot,
+    query: Query,
+) -> Response:
+    coordinate = _coordinate(world_snapshot=world_snapshot, query=query)
+    world_data = world_snapshot.world_data
+    return {
+        "x": coordinate.x,
+        "y": coordinate.y,
+        "tracks": [
+            {
+                "tile_id": tile_id,
+                "track": world_data.data_of(tile_id=tile_id)["name"],
+                "track_type": world_data.data_of(tile_id=tile_id).get("type", ""),
+            }
+            for tile_id in world_snapshot.placement_table.allowed_track_tile_ids_at(
+                world_map=world_snapshot.world_map,
+                coordinate=coordinate,
+            )
+        ],
+    }
+
+
+def _stats(
+    world_snapshot: snapshot.Snapshot,
+    query: Query,  # pylint: disable=unused-argument
+) -> Response:
+    track_coordinates_table = world_snapshot.track_coordinates_table
+    path_cache = world_snapshot.paths.path_cache
+    return {
+        "tracks": track_coordinates_table.total,
+        "unused_edges": len(world_snapshot.paths.unused_edges),
+        "path_cache": {
+            "size": len(path_cache),
+            "max_size": path_cache.max_size,
+            "hits": path_cache.hits,
+            "misses": path_cache.misses,
+            "hit_rate": path_cache.hit_rate,
+        },
+        "track_coordinates_count": track_coordinates_table.to_dict(),
+    }
+
+
+def _what_if(
+    world_snapshot: snapshot.Snapshot,
+    query: Query,
+) -> Response:
+    try:
+        edits = [
+            what_if.TrackEdit(x=edit["x"], y=edit["y"], tile_id=edit["tile_id"])
+            for edit in query["edits"]
+        ]
+        outcome = what_if.evaluate(world_snapshot=world_snapshot, edits=edits)
+    except (TypeError, ValueError) as error:
+        raise QueryError(str(error)) from error
+    return _what_if_response(outcome)
+
+
+def _what_if_response(outcome: what_if.WhatIf) -> Response:
+    return {
+        "distance_changes": [
+            {
+                "port": port_name,
+                "city": city_name,
+                "expected_distance": expected_distance,
+                "distance_before": distance_before,
+                "distance_after": distance_after,
+            }
+            for (
+                port_name,
+                city_name,
+                expected_distance,
+                distance_before,
+                distance_after,
+            ) in outcome.distance_changes
+        ],
+        "new_track_placement_errors": [
+            {
+                "x": track_tile.coordinate.x,
+                "y": track_tile.coordinate.y,
+                "track": track_tile.name,
+                "track_type": track_tile.type,
+                "environment": map_tile.name,
+            }
+            for track_tile, map_tile in outcome.new_track_placement_errors
+        ],
+        "new_unrouted_edges": [
+            {
+                "x": edge.coordinate.x,
+                "y": edge.coordinate.y,
+                "path_component": edge.path_component.name,
+            }
+            for edge in outcome.new_unrouted_edges
+        ],
+    }
+
+
+def _suggest_route(
+    world_snapshot: snapshot.Snapshot,
+    query: Query,
+) -> Response:
+    port_name = query["port"]
+    city_name = query["city"]
+    if (port_name, city_name) not in world_snapshot.world_data.port_to_city_name_pairs:
+        raise QueryError(f"{port_name} -> {city_name} is not a connection.")
+    suggestion = route_planner.RoutePlanner(world_snapshot).suggest(
+        port_name=port_name,
+        city_name=city_name,
+    )
+    if suggestion is None:
+        return {
+            "port": port_name,
+            "city": city_name,
+            "expected_distance": world_snapshot.world_data.distance_between(
+                port_name=port_name,
+                city_name=city_name,
+            ),
+            "edits": None,
+        }
+    return {
+        "port": port_name,
+        "city": city_name,
+        "expected_distance": suggestion.expected_distance,
+        "edits": [edit._asdict() for edit in suggestion.edits],
+        **_what_if_response(suggestion.outcome),
+    }
+
+
+_QUERY_TYPE_TO_FUNCTION: dict[
+    str, typing.Callable[[snapshot.Snapshot, Query], Response]
+] = {
+    "distance": _distance,
+    "path": _path,
+    "validation": _validation,
+    "allowed_tracks": _allowed_tracks,
+    "tile_at": _tile_at,
+    "placement_check": _placement_check,
+    "stats": _stats,
+    "what_if": _what_if,
+    "suggest_route": _suggest_route,
+}
@@ -0,0 +1,35 @@
+"""Answers JSON queries read as lines, writing a line of JSON for each response."""
+import json
+import os
+import typing
+
+import helper
+import queries
+
+
+def answer_lines(
+    lines: typing.Iterable[str],
+    path_to_helper: dict[os.PathLike, helper.Helper],
+) -> typing.Iterator[str]:
+    """
+    Yields the response to the query on each line as soon as it is answered, or the
+    error it raised. Blank lines are skipped.
+
+    Queries may name the map they are about by its file name through a `map` field,
+    which can be left out when there is only one map.
+    """
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            query = json.loads(line)
+            if not isinstance(query, dict):
+                raise queries.QueryError("Expected the query to be a JSON object.")
+            map_helper = queries.for_map(
+                path_to_value=path_to_helper,
+                map_name=query.get("map"),
+            )
+            response = queries.answer(map_helper.snapshot, query)
+        except (json.JSONDecodeError, queries.QueryError) as error:
+            response = {"error": str(error)}
+        yield json.dumps(response)
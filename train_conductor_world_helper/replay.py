@@ -0,0 +1,700 @@
+#!/usr/bin/env python3
+
+"""Records and replays sessions of map edits, timing the watch mode's updates."""
+
+import contextlib
+import dataclasses
+import hashlib
+import json
+import logging
+import os
+import pathlib
+import random
+import resource
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import typing
+from xml.etree import ElementTree as ET
+
+import click
+import watchdog.observers
+
+import annotations.annotator
+import data
+import helper
+import mapping.placements
+import tmx.layers
+import tmx.tiled_map
+import updater
+
+DATA_DIR = pathlib.Path("./data/")
+DEFAULT_DISTANCES_FILENAME = DATA_DIR / "distances.json"
+DEFAULT_TILES_FILENAME = DATA_DIR / "tiles.json"
+DEFAULT_TMX_FILENAME = DATA_DIR / "train-conductor-world.tmx"
+DEFAULT_SAVES = 20
+DEFAULT_EDITS_PER_SAVE = 1
+DEFAULT_INTERVAL_SECONDS = 2.0
+DEFAULT_SEED = 0
+DEFAULT_TIMEOUT_SECONDS = 300.0
+DEFAULT_ANNOTATION_FORMAT = "tiles"
+LAYER_NAMES = (helper.MAP_LAYER_NAME, helper.TRACKS_LAYER_NAME)
+# Chance that a synthetic edit changes an existing track rather than any cell.
+TRACK_EDIT_CHANCE = 0.5
+TEMPORARY_SUFFIX = ".replay"
+
+logger = logging.getLogger(__name__)
+
+Cell = tuple[int, int, int]
+
+
+class Save(typing.NamedTuple):
+    """Represents the cells changed by a save, and the seconds since the last save."""
+
+    seconds: float
+    layer_name_to_cells: dict[str, list[Cell]]
+
+
+@dataclasses.dataclass(frozen=True)
+class SyntheticEdits:
+    """Represents how many random edits to make, and how often to save them."""
+
+    count: int = DEFAULT_SAVES
+    edits_per_save: int = DEFAULT_EDITS_PER_SAVE
+    interval_seconds: float = DEFAULT_INTERVAL_SECONDS
+    seed: int = DEFAULT_SEED
+
+
+@dataclasses.dataclass(frozen=True)
+class ReplaySettings:
+    """Represents the data files and watch mode settings that saves are replayed with."""
+
+    distances_path: os.PathLike
+    tiles_path: os.PathLike
+    debounce_seconds: float = updater.DEFAULT_DEBOUNCE_SECONDS
+    annotation_format: annotations.annotator.AnnotationFormat = (
+        annotations.annotator.AnnotationFormat.TILES
+    )
+    timeout_seconds: float = DEFAULT_TIMEOUT_SECONDS
+
+
+@dataclasses.dataclass(frozen=True)
+class ReplayResult:
+    """Represents the latency of each save of a replay, and its memory growth."""
+
+    latency_milliseconds: list[float | None]
+    updates: int
+    seconds: float
+    start_kibibytes: int
+    end_kibibytes: int
+
+    def report(self) -> str:
+        """Returns a summary of the replay."""
+        latency_milliseconds = sorted(
+            milliseconds
+            for milliseconds in self.latency_milliseconds
+            if milliseconds is not None
+        )
+        lines = [
+            f"{len(self.latency_milliseconds)} saves, {self.updates} updates in"
+            f" {self.seconds:.1f}s"
+            f" ({len(self.latency_milliseconds) / max(self.seconds, 1e-9):.2f} saves/s)",
+            f"peak memory {self.start_kibibytes}KiB -> {self.end_kibibytes}KiB"
+            f" (+{self.end_kibibytes - self.start_kibibytes}KiB)",
+        ]
+        if len(latency_milliseconds) > 1:
+            lines.insert(
+                1,
+                f"latency median {statistics.median(latency_milliseconds):.1f}ms"
+                " p95 "
+                + format(
+                    statistics.quantiles(
+                        latency_milliseconds, n=20, method="inclusive"
+                    )[-1],
+                    ".1f",
+                )
+                + f"ms max {latency_milliseconds[-1]:.1f}ms",
+            )
+        missed_saves = len(self.latency_milliseconds) - len(latency_milliseconds)
+        if missed_saves:
+            lines.append(f"{missed_saves} saves were never annotated")
+        return "\n".join(lines)
+
+
+class DeltaLogWriter:
+    """
+    Writes a delta log, which is a json line naming the map and the digest of its
+    layers, followed by a json line of the changed cells of each save.
+
+    The log is opened and its header written as the writer's context is entered.
+    """
+
+    def __init__(
+        self,
+        filename: os.PathLike,
+        tmx_path: os.PathLike,
+        layer_name_to_grid: dict[str, list[list[int]]],
+    ) -> None:
+        self.filename = filename
+        self._header = {
+            "map": pathlib.Path(tmx_path).name,
+            "digest": layers_digest(layer_name_to_grid),
+        }
+        self._file: typing.TextIO | None = None
+
+    def write(self, save: Save) -> None:
+        """Writes the save."""
+        self._write_line(
+            {
+                "seconds": round(save.seconds, 3),
+                **{
+                    layer_name: cells
+                    for layer_name, cells in save.layer_name_to_cells.items()
+                    if cells
+                },
+            }
+        )
+
+    def close(self) -> None:
+        """Closes the delta log."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self) -> typing.Self:
+        with contextlib.ExitStack() as stack:
+            self._file = stack.enter_context(open(self.filename, "w", encoding="utf8"))
+            self._write_line(self._header)
+            # Only closed from here on by leaving the writer's context.
+            stack.pop_all()
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
+
+    def _write_line(self, line: dict) -> None:
+        self._file.write(json.dumps(line, separators=(",", ":")) + "\n")
+        self._file.flush()
+
+
+def read_delta_log(filename: os.PathLike) -> tuple[dict, list[Save]]:
+    """Returns the header and saves of a delta log."""
+    with open(filename, encoding="utf8") as file:
+        header = json.loads(next(file))
+        saves = []
+        for line in file:
+            save_dict = json.loads(line)
+            saves.append(
+                Save(
+                    seconds=save_dict["seconds"],
+                    layer_name_to_cells={
+                        layer_name: [
+                            tuple(cell) for cell in save_dict.get(layer_name, [])
+                        ]
+                        for layer_name in LAYER_NAMES
+                    },
+                )
+            )
+    return header, saves
+
+
+def write_delta_log(
+    filename: os.PathLike,
+    tmx_path: os.PathLike,
+    layer_name_to_grid: dict[str, list[list[int]]],
+    saves: list[Save],
+) -> None:
+    """Writes the saves of the map's layers as a delta log."""
+    with DeltaLogWriter(
+        filename=filename,
+        tmx_path=tmx_path,
+        layer_name_to_grid=layer_name_to_grid,
+    ) as writer:
+        for save in saves:
+            writer.write(save)
+
+
+def read_layer_grids(filename: os.PathLike) -> dict[str, list[list[int]]]:
+    """Returns the grid of each edited layer of the tmx file."""
+    tiled_map = tmx.tiled_map.TiledMap(filename=filename)
+    return {
+        layer_name: tiled_map.get_layer_data(name=layer_name)
+        for layer_name in LAYER_NAMES
+    }
+
+
+def layers_digest(layer_name_to_grid: dict[str, list[list[int]]]) -> str:
+    """Returns a digest of the layers, to check a delta log applies to a map."""
+    digest = hashlib.blake2b(digest_size=16)
+    for layer_name in LAYER_NAMES:
+        digest.update(
+            tmx.layers.TileLayer.to_csv_string(layer_name_to_grid[layer_name]).encode()
+        )
+    return digest.hexdigest()
+
+
+def changed_cells(
+    grid: list[list[int]],
+    new_grid: list[list[int]],
+) -> list[Cell]:
+    """Returns the cells of the new grid that differ from the grid."""
+    return [
+        (x, y, tile_id)
+        for y, (row, new_row) in enumerate(zip(grid, new_grid))
+        if row != new_row
+        for x, (old_tile_id, tile_id) in enumerate(zip(row, new_row))
+        if old_tile_id != tile_id
+    ]
+
+
+def synthetic_saves(
+    layer_name_to_grid: dict[str, list[list[int]]],
+    world_data: data.Data,
+    edits: SyntheticEdits,
+) -> list[Save]:
+    """
+    Returns saves that each replace the tracks of random cells with a legal track
+    or nothing, half of the time choosing among the cells that have tracks.
+    """
+    generator = random.Random(edits.seed)
+    placement_table = mapping.placements.PlacementTable(world_data=world_data)
+    map_grid = layer_name_to_grid[helper.MAP_LAYER_NAME]
+    track_grid = [list(row) for row in layer_name_to_grid[helper.TRACKS_LAYER_NAME]]
+    placeable_cells = [
+        (x, y)
+        for y, row in enumerate(map_grid)
+        for x, tile_id in enumerate(row)
+        if tile_id
+        and world_data.data_of(tile_id=tile_id)["group"] != "Location"
+        and placement_table.allowed_track_tile_ids(tile_id)
+    ]
+    # Cells whose tracks were since removed are left in, and are edited as any cell.
+    track_cells = [
+        (x, y)
+        for y, row in enumerate(track_grid)
+        for x, tile_id in enumerate(row)
+        if tile_id
+    ]
+    saves = []
+    for _ in range(edits.count):
+        cells = []
+        for _ in range(edits.edits_per_save):
+            if track_cells and generator.random() < TRACK_EDIT_CHANCE:
+                x, y = generator.choice(track_cells)
+            else:
+                x, y = generator.choice(placeable_cells)
+            tile_id = generator.choice(
+                [
+                    tile_id
+                    for tile_id in (
+                        0,
+                        *placement_table.allowed_track_tile_ids(map_grid[y][x]),
+                    )
+                    if tile_id != track_grid[y][x]
+                ]
+            )
+            track_grid[y][x] = tile_id
+            if tile_id:
+                track_cells.append((x, y))
+            cells.append((x, y, tile_id))
+        saves.append(
+            Save(
+                seconds=edits.interval_seconds,
+                layer_name_to_cells={
+                    helper.MAP_LAYER_NAME: [],
+                    helper.TRACKS_LAYER_NAME: cells,
+                },
+            )
+        )
+    return saves
+
+
+def replay(
+    tmx_path: os.PathLike,
+    saves: list[Save],
+    settings: ReplaySettings,
+) -> ReplayResult:
+    """
+    Writes each save to a copy of the map in a watched directory, as Tiled does, and
+    times how long after each save the watch mode finishes annotating it.
+
+    A save is annotated by the first update that both starts after the save and
+    completes, which may also annotate the saves that follow it.
+    """
+    tiled_map = tmx.tiled_map.TiledMap(filename=tmx_path)
+    layer_name_to_grid = {
+        layer_name: [list(row) for row in tiled_map.get_layer_data(name=layer_name)]
+        for layer_name in LAYER_NAMES
+    }
+    condition = threading.Condition()
+    update_times: list[tuple[float, float]] = []
+
+    def create_update_callable(
+        map_path: pathlib.Path,
+    ) -> typing.Callable[[typing.Callable[[], None]], None]:
+        replay_helper = helper.Helper(
+            tmx_path=map_path,
+            distances_path=settings.distances_path,
+            tiles_path=settings.tiles_path,
+            annotation_format=settings.annotation_format,
+        )
+
+        def update_function(checkpoint: typing.Callable[[], None]) -> None:
+            start_time = time.perf_counter()
+            if replay_helper.update_map(checkpoint=checkpoint):
+                with condition:
+                    update_times.append((start_time, time.perf_counter()))
+                    condition.notify_all()
+
+        return update_function
+
+    with tempfile.TemporaryDirectory() as directory:
+        map_path = pathlib.Path(directory) / pathlib.Path(tmx_path).name
+        shutil.copyfile(tmx_path, map_path)
+        watch_service = updater.WatchService(
+            create_update_callable=create_update_callable,
+            debounce_seconds=settings.debounce_seconds,
+        )
+        watch_service.watch_file(map_path)
+        start_kibibytes = _peak_kibibytes()
+        watch_service.start()
+        save_times = []
+        try:
+            for save in saves:
+                time.sleep(save.seconds)
+                _apply_save(
+                    tiled_map=tiled_map,
+                    layer_name_to_grid=layer_name_to_grid,
+                    save=save,
+                )
+                _write_atomically(tiled_map=tiled_map, filename=map_path)
+                save_times.append(time.perf_counter())
+            with condition:
+                condition.wait_for(
+                    lambda: any(
+                        start_time >= save_times[-1] for start_time, _ in update_times
+                    ),
+                    timeout=settings.timeout_seconds,
+                )
+        finally:
+            watch_service.stop()
+
+    return ReplayResult(
+        latency_milliseconds=[
+            _latency_milliseconds(save_time=save_time, update_times=update_times)
+            for save_time in save_times
+        ],
+        updates=len(update_times),
+        seconds=max((end_time for _, end_time in update_times), default=save_times[-1])
+        - save_times[0],
+        start_kibibytes=start_kibibytes,
+        end_kibibytes=_peak_kibibytes(),
+    )
+
+
+def _apply_save(
+    tiled_map: tmx.tiled_map.TiledMap,
+    layer_name_to_grid: dict[str, list[list[int]]],
+    save: Save,
+) -> None:
+    """Changes the cells of the save in the grids, replacing the changed layers."""
+    for layer_name, cells in save.layer_name_to_cells.items():
+        if not cells:
+            continue
+        grid = layer_name_to_grid[layer_name]
+        for x, y, tile_id in cells:
+            grid[y][x] = tile_id
+        tiled_map.add_layer(tmx.layers.TileLayer(name=layer_name, data=grid))
+
+
+def _latency_milliseconds(
+    save_time: float,
+    update_times: list[tuple[float, float]],
+) -> float | None:
+    """
+    Returns the milliseconds from the save until the end of the first update that
+    started after it, or None if no update did.
+    """
+    end_time = next(
+        (end_time for start_time, end_time in update_times if start_time >= save_time),
+        None,
+    )
+    return None if end_time is None else (end_time - save_time) * 1000
+
+
+def _write_atomically(
+    tiled_map: tmx.tiled_map.TiledMap,
+    filename: pathlib.Path,
+) -> None:
+    """Writes the map to a temporary file then moves it over the file, as Tiled does."""
+    temporary_filename = filename.with_name(filename.name + TEMPORARY_SUFFIX)
+    with open(temporary_filename, "wb") as file:
+        file.write(ET.tostring(tiled_map.root))
+    os.replace(temporary_filename, filename)
+
+
+def _peak_kibibytes() -> int:
+    # The maximum resident set size is in kibibytes on Linux.
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+@click.group()
+def main() -> None:
+    """Records and replays sessions of map edits."""
+    logging.basicConfig(level=logging.ERROR)
+
+
+@main.command()
+@click.option(
+    "--tmx-path",
+    help="Path to the mapping tmx file to record the edits of.",
+    type=click.Path(exists=True, dir_okay=False),
+    default=DEFAULT_TMX_FILENAME,
+)
+@click.option(
+    "--log-path",
+    help="Path to write the delta log to.",
+    type=click.Path(dir_okay=False),
+    required=True,
+)
+def record(
+    tmx_path: pathlib.Path,
+    log_path: pathlib.Path,
+) -> None:
+    """Records each save of the map's layers to a delta log until interrupted."""
+    path = pathlib.Path(tmx_path).resolve()
+    layer_name_to_grid = read_layer_grids(path)
+    last_save_time = time.monotonic()
+    lock = threading.Lock()
+
+    with DeltaLogWriter(
+        filename=log_path,
+        tmx_path=path,
+        layer_name_to_grid=layer_name_to_grid,
+    ) as writer:
+
+        def on_update(updated_path: pathlib.Path) -> None:
+            nonlocal layer_name_to_grid, last_save_time
+            if updated_path.resolve() != path:
+                return
+            with lock:
+                try:
+                    new_layer_name_to_grid = read_layer_grids(path)
+                except (ET.ParseError, FileNotFoundError):
+                    logger.debug("Skipped a partially written save.")
+                    return
+                layer_name_to_cells = {
+                    layer_name: changed_cells(
+                        layer_name_to_grid[layer_name],
+                        new_layer_name_to_grid[layer_name],
+                    )
+                    for layer_name in LAYER_NAMES
+                }
+                if not any(layer_name_to_cells.values()):
+                    return
+                save_time = time.monotonic()
+                writer.write(
+                    Save(
+                        seconds=save_time - last_save_time,
+                        layer_name_to_cells=layer_name_to_cells,
+                    )
+                )
+                click.echo(
+                    "Recorded a save of "
+                    f"{sum(map(len, layer_name_to_cells.values()))} cells."
+                )
+                layer_name_to_grid = new_layer_name_to_grid
+                last_save_time = save_time
+
+        observer = watchdog.observers.Observer()
+        observer.schedule(
+            event_handler=updater.MapEventHandler(callable_on_update=on_update),
+            path=str(path.parent),
+        )
+        observer.start()
+        click.echo(f"Recording saves of {path} to {log_path}...")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            observer.stop()
+            observer.join()
+
+
+@main.command(name="run")
+@click.option(
+    "--distances-path",
+    help="Path to distances json file.",
+    default=DEFAULT_DISTANCES_FILENAME,
+)
+@click.option(
+    "--tiles-path",
+    help="Path to tile json file.",
+    default=DEFAULT_TILES_FILENAME,
+)
+@click.option(
+    "--tmx-path",
+    help="Path to the mapping tmx file that the saves are applied to.",
+    type=click.Path(exists=True, dir_okay=False),
+    default=DEFAULT_TMX_FILENAME,
+)
+@click.option(
+    "--log-path",
+    help="Path to a delta log to replay, instead of synthetic edits.",
+    type=click.Path(exists=True, dir_okay=False),
+    default=None,
+)
+@click.option(
+    "--saves",
+    help="Number of synthetic saves.",
+    type=click.IntRange(min=1),
+    default=DEFAULT_SAVES,
+)
+@click.option(
+    "--edits-per-save",
+    help="Number of cells each synthetic save edits.",
+    type=click.IntRange(min=1),
+    default=DEFAULT_EDITS_PER_SAVE,
+)
+@click.option(
+    "--seed",
+    help="Seed of the synthetic edits.",
+    type=int,
+    default=DEFAULT_SEED,
+)
+@click.option(
+    "--interval-seconds",
+    help=(
+        "Seconds between saves, by default those recorded in the delta log or "
+        f"{DEFAULT_INTERVAL_SECONDS} for synthetic saves."
+    ),
+    type=click.FloatRange(min=0),
+    default=None,
+)
+@click.option(
+    "--debounce-seconds",
+    help="Seconds to wait after the last change before updating the tmx file.",
+    type=click.FloatRange(min=0),
+    default=updater.DEFAULT_DEBOUNCE_SECONDS,
+)
+@click.option(
+    "--annotation-format",
+    help="Whether to annotate connections as tile layers or as polyline objects.",
+    type=click.Choice(["tiles", "objects"]),
+    default=DEFAULT_ANNOTATION_FORMAT,
+)
+@click.option(
+    "--timeout-seconds",
+    help="Seconds to wait for the last save to be annotated.",
+    type=click.FloatRange(min=0),
+    default=DEFAULT_TIMEOUT_SECONDS,
+)
+@click.option(
+    "--save-log-path",
+    help="Path to write the replayed saves to as a delta log.",
+    type=click.Path(dir_okay=False),
+    default=None,
+)
+def run_replay(  # pylint: disable=too-many-arguments
+    distances_path: pathlib.Path,
+    tiles_path: pathlib.Path,
+    tmx_path: pathlib.Path,
+    log_path: pathlib.Path | None,
+    saves: int,
+    edits_per_save: int,
+    seed: int,
+    interval_seconds: float | None,
+    debounce_seconds: float,
+    annotation_format: str,
+    timeout_seconds: float,
+    save_log_path: pathlib.Path | None,
+) -> None:
+    """
+    Replays saves of the map against the watch mode, reporting the latency from
+    each save to its annotation, the throughput and the memory growth.
+    """
+    layer_name_to_grid = read_layer_grids(tmx_path)
+    if log_path is None:
+        replayed_saves = synthetic_saves(
+            layer_name_to_grid=layer_name_to_grid,
+            world_data=data.Data(
+                distances_filename=distances_path,
+                tiles_filename=tiles_path,
+                port_limit=helper.PORT_LIMIT,
+            ),
+            edits=SyntheticEdits(
+                count=saves,
+                edits_per_save=edits_per_save,
+                interval_seconds=(
+                    DEFAULT_INTERVAL_SECONDS
+                    if interval_seconds is None
+                    else interval_seconds
+                ),
+                seed=seed,
+            ),
+        )
+    else:
+        replayed_saves = _read_recorded_saves(
+            log_path=log_path,
+            layer_name_to_grid=layer_name_to_grid,
+            interval_seconds=interval_seconds,
+        )
+    if not replayed_saves:
+        raise click.UsageError("There are no saves to replay.")
+
+    if save_log_path is not None:
+        write_delta_log(
+            filename=save_log_path,
+            tmx_path=tmx_path,
+            layer_name_to_grid=layer_name_to_grid,
+            saves=replayed_saves,
+        )
+
+    result = replay(
+        tmx_path=tmx_path,
+        saves=replayed_saves,
+        settings=ReplaySettings(
+            distances_path=distances_path,
+            tiles_path=tiles_path,
+            debounce_seconds=debounce_seconds,
+            annotation_format=annotations.annotator.AnnotationFormat(annotation_format),
+            timeout_seconds=timeout_seconds,
+        ),
+    )
+    click.echo(
+        "\n".join(
+            f"save {index:>4}: "
+            + ("never annotated" if milliseconds is None else f"{milliseconds:.1f}ms")
+            for index, milliseconds in enumerate(result.latency_milliseconds, start=1)
+        )
+    )
+    click.echo(result.report())
+    if None in result.latency_milliseconds:
+        sys.exit(1)
+
+
+def _read_recorded_saves(
+    log_path: pathlib.Path,
+    layer_name_to_grid: dict[str, list[list[int]]],
+    interval_seconds: float | None,
+) -> list[Save]:
+    """
+    Returns the saves of the delta log, spaced by the interval if given, after
+    checking that the log was recorded from the map's layers.
+    """
+    header, recorded_saves = read_delta_log(log_path)
+    if header["digest"] != layers_digest(layer_name_to_grid):
+        raise click.UsageError(
+            f"{log_path} was recorded from a different version of {header['map']}."
+        )
+    if interval_seconds is None:
+        return recorded_saves
+    return [save._replace(seconds=interval_seconds) for save in recorded_saves]
+
+
+if __name__ == "__main__":
+    main()
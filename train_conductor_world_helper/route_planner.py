@@ -0,0 +1,308 @@
+"""Suggests track placements that connect a port to a city at the expected distance."""
+import collections
+import dataclasses
+import functools
+import heapq
+import itertools
+import typing
+
+import networkx as nx
+
+import graphing.graph
+import graphing.pathing.distance_field
+import mapping.coordinate
+import snapshot
+import what_if
+from graphing.node import Node
+from graphing.pathing.path_component import PathComponent
+
+MAX_CANDIDATE_ROUTES = 32
+ROUTES_PER_STATE = 3
+PLACEMENT_COST = 1
+
+
+class _Move(typing.NamedTuple):
+    neighbour: Node
+    coordinate: mapping.coordinate.Coordinate
+    cost: int
+    tile_id: int
+
+
+class _Route(typing.NamedTuple):
+    move: _Move
+    previous: typing.Optional["_Route"]
+
+
+@dataclasses.dataclass(frozen=True)
+class RouteSuggestion:
+    """Track edits that connect a port to a city at the expected distance."""
+
+    port_name: str
+    city_name: str
+    expected_distance: int
+    edits: list[what_if.TrackEdit]
+    outcome: what_if.WhatIf
+
+
+class RoutePlanner:
+    """
+    Plans routes over the legal track placements of a snapshot.
+
+    A route may reuse the path components of existing tracks for free, place a track
+    on an empty cell, or replace a track with a branching track that keeps its path
+    components, where the track can legally be placed on the map tile below it.
+    """
+
+    def __init__(
+        self,
+        world_snapshot: snapshot.Snapshot,
+    ) -> None:
+        self.world_snapshot = world_snapshot
+
+    def suggest(
+        self,
+        port_name: str,
+        city_name: str,
+    ) -> RouteSuggestion | None:
+        """
+        Returns the fewest track edits found that connect the port to the city at
+        their expected distance, or None if no such edits were found.
+        """
+        world_snapshot = self.world_snapshot
+        expected_distance = world_snapshot.world_data.distance_between(
+            port_name=port_name,
+            city_name=city_name,
+        )
+        actual_distance = world_snapshot.paths.route_distance_between(
+            port_name=port_name,
+            city_name=city_name,
+        )
+        if 0 < actual_distance < expected_distance:
+            # Placing tracks can only ever shorten a connection.
+            return None
+
+        candidate_edits = (
+            [[]]
+            if actual_distance == expected_distance
+            else self._candidate_edits(
+                port_name=port_name,
+                city_name=city_name,
+                expected_distance=expected_distance,
+            )
+        )
+        for edits in itertools.islice(candidate_edits, MAX_CANDIDATE_ROUTES):
+            outcome = what_if.evaluate(world_snapshot=world_snapshot, edits=edits)
+            distance = outcome.after.paths.route_distance_between(
+                port_name=port_name,
+                city_name=city_name,
+            )
+            if distance == expected_distance:
+                return RouteSuggestion(
+                    port_name=port_name,
+                    city_name=city_name,
+                    expected_distance=expected_distance,
+                    edits=edits,
+                    outcome=outcome,
+                )
+        return None
+
+    def _candidate_edits(
+        self,
+        port_name: str,
+        city_name: str,
+        expected_distance: int,
+    ) -> typing.Iterator[list[what_if.TrackEdit]]:
+        """
+        Yields the edits of routes of exactly the expected distance from the port to
+        the city, in order of fewest placements, that pass through each cell once.
+        """
+        for route in self._candidate_routes(
+            port_name=port_name,
+            city_name=city_name,
+            expected_distance=expected_distance,
+        ):
+            moves = []
+            while route is not None:
+                moves.append(route.move)
+                route = route.previous
+            coordinates = {move.coordinate for move in moves}
+            if len(coordinates) != len(moves):
+                continue
+            yield [
+                what_if.TrackEdit(
+                    x=move.coordinate.x,
+                    y=move.coordinate.y,
+                    tile_id=move.tile_id,
+                )
+                for move in reversed(moves)
+                if move.cost
+            ]
+
+    def _candidate_routes(
+        self,
+        port_name: str,
+        city_name: str,
+        expected_distance: int,
+    ) -> typing.Iterator[_Route]:
+        """
+        Runs a best-first search by placement cost over states of a node, the
+        coordinate the next edge must be within and the distance so far, pruning
+        states that can't reach the city within the expected distance.
+        """
+        tile_map = self.world_snapshot.world_map.tile_map
+        port_coordinate = tile_map.coordinate_of(port_name)
+        port_nodes = port_coordinate.edge_nodes
+        city_nodes = tile_map.coordinate_of(city_name).edge_nodes
+        node_to_moves = self._node_to_moves
+        # Distances from the city over every legal placement bound those remaining.
+        lower_bound_field = graphing.pathing.distance_field.DistanceField(
+            graph=self._placeable_graph,
+            source_nodes=city_nodes,
+        )
+
+        tie_breaker = itertools.count()
+        queue = [
+            (
+                0,
+                0,
+                next(tie_breaker),
+                node,
+                graphing.pathing.distance_field.opposite_coordinate(
+                    node, port_coordinate
+                ),
+                None,
+            )
+            for node in port_nodes
+        ]
+        state_to_pops = collections.Counter()
+        while queue:
+            cost, distance, _, node, coordinate, route = heapq.heappop(queue)
+            state = (node, coordinate, distance)
+            state_to_pops[state] += 1
+            if state_to_pops[state] > ROUTES_PER_STATE:
+                continue
+            if distance:
+                if node in city_nodes:
+                    if distance == expected_distance:
+                        yield route
+                    continue
+                if node in port_nodes:
+                    continue
+            next_distance = distance + 1
+            for move in node_to_moves.get(node, ()):
+                if move.coordinate != coordinate:
+                    continue
+                neighbour = move.neighbour
+                remaining_distance = lower_bound_field.distance_to(
+                    neighbour, move.coordinate
+                )
+                if (
+                    remaining_distance is None
+                    or next_distance + remaining_distance > expected_distance
+                ):
+                    continue
+                heapq.heappush(
+                    queue,
+                    (
+                        cost + move.cost,
+                        next_distance,
+                        next(tie_breaker),
+                        neighbour,
+                        graphing.pathing.distance_field.opposite_coordinate(
+                            neighbour, move.coordinate
+                        ),
+                        _Route(move=move, previous=route),
+                    ),
+                )
+
+    @functools.cached_property
+    def _node_to_moves(self) -> dict[Node, list[_Move]]:
+        node_to_moves = collections.defaultdict(list)
+        for (
+            coordinate,
+            path_component_to_move,
+        ) in self._coordinate_to_path_component_to_move.items():
+            for path_component, (cost, tile_id) in path_component_to_move.items():
+                from_node, to_node = graphing.graph.Graph.nodes_of(
+                    coordinate=coordinate,
+                    path_component=path_component,
+                )
+                node_to_moves[from_node].append(
+                    _Move(to_node, coordinate, cost, tile_id)
+                )
+                node_to_moves[to_node].append(
+                    _Move(from_node, coordinate, cost, tile_id)
+                )
+        return node_to_moves
+
+    @functools.cached_property
+    def _placeable_graph(self) -> graphing.graph.Graph:
+        """Returns the graph of every path component a route may use."""
+        placeable_graph = nx.Graph()
+        for node, moves in self._node_to_moves.items():
+            for move in moves:
+                placeable_graph.add_edge(node, move.neighbour)
+        return graphing.graph.Graph(
+            track_map=self.world_snapshot.world_map.track_map,
+            graph=placeable_graph,
+        )
+
+    @functools.cached_property
+    def _coordinate_to_path_component_to_move(
+        self,
+    ) -> dict[mapping.coordinate.Coordinate, dict[PathComponent, tuple[int, int]]]:
+        """
+        Returns the cost and tile id of each path component a route may use at each
+        coordinate.
+        """
+        world_map = self.world_snapshot.world_map
+        map_tile_id_to_legal_tile_ids = self._map_tile_id_to_legal_tile_ids
+        coordinate_to_path_component_to_move = {}
+        for map_tile in world_map.tile_map:
+            coordinate = map_tile.coordinate
+            legal_tile_ids = map_tile_id_to_legal_tile_ids[map_tile.id]
+            track_tile = world_map.track_map[coordinate]
+            track_path_component = (
+                PathComponent.NONE if track_tile is None else track_tile.path_component
+            )
+            path_component_to_move = {}
+            for path_component in PathComponent:
+                if path_component in track_path_component:
+                    path_component_to_move[path_component] = (0, track_tile.id)
+                elif tile_id := legal_tile_ids.get(
+                    track_path_component | path_component
+                ):
+                    path_component_to_move[path_component] = (
+                        PLACEMENT_COST,
+                        tile_id,
+                    )
+            if path_component_to_move:
+                coordinate_to_path_component_to_move[
+                    coordinate
+                ] = path_component_to_move
+        return coordinate_to_path_component_to_move
+
+    @functools.cached_property
+    def _map_tile_id_to_legal_tile_ids(
+        self,
+    ) -> dict[int, dict[PathComponent, int]]:
+        """
+        Returns the first track tile id, in the order of the tile data, that can be
+        placed on each map tile for each combination of path components.
+        """
+        world_snapshot = self.world_snapshot
+        world_data = world_snapshot.world_data
+        placement_table = world_snapshot.placement_table
+        map_tile_id_to_legal_tile_ids = {}
+        for map_tile in world_snapshot.world_map.tile_map:
+            if map_tile.id in map_tile_id_to_legal_tile_ids:
+                continue
+            legal_tile_ids = {}
+            if map_tile.group != "Location":
+                for tile_id in placement_table.allowed_track_tile_ids(map_tile.id):
+                    path_component = PathComponent.from_dict(
+                        dictionary=world_data.data_of(tile_id=tile_id),
+                    )
+                    legal_tile_ids.setdefault(path_component, tile_id)
+            map_tile_id_to_legal_tile_ids[map_tile.id] = legal_tile_ids
+        return map_tile_id_to_legal_tile_ids
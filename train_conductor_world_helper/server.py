@@ -0,0 +1,82 @@
+"""Serves queries about the warm state of the helpers over localhost HTTP."""
+import http
+import http.server
+import json
+import logging
+import pathlib
+import threading
+
+import helper
+import queries
+
+DEFAULT_HOST = "127.0.0.1"
+
+logger = logging.getLogger(__name__)
+
+
+class QueryServer(http.server.ThreadingHTTPServer):
+    """
+    An HTTP server answering JSON queries posted to it with JSON responses.
+
+    Queries may name the map they are about by its file name through a `map` field,
+    which can be left out when only one map is served.
+    """
+
+    def __init__(
+        self,
+        path_to_helper: dict[pathlib.Path, helper.Helper],
+        port: int,
+        host: str = DEFAULT_HOST,
+    ) -> None:
+        super().__init__((host, port), _QueryRequestHandler)
+        self.path_to_helper = path_to_helper
+
+    def start(self) -> None:
+        """Starts serving on a background thread."""
+        host, port = self.server_address[:2]
+        logger.info("Serving queries on http://%s:%s/...", host, port)
+        threading.Thread(
+            target=self.serve_forever,
+            name="query-server",
+            daemon=True,
+        ).start()
+
+    def helper_for(
+        self,
+        map_name: str | None,
+    ) -> helper.Helper:
+        """Returns the helper of the map with the given file name."""
+        return queries.for_map(path_to_value=self.path_to_helper, map_name=map_name)
+
+
+class _QueryRequestHandler(http.server.BaseHTTPRequestHandler):
+    server: QueryServer
+
+    def do_POST(self) -> None:  # pylint: disable=invalid-name
+        """Answers the JSON query in the request body."""
+        try:
+            content_length = int(self.headers.get("Content-Length", 0))
+            query = json.loads(self.rfile.read(content_length))
+            if not isinstance(query, dict):
+                raise queries.QueryError("Expected the query to be a JSON object.")
+            map_helper = self.server.helper_for(map_name=query.get("map"))
+            response = queries.answer(map_helper.snapshot, query)
+        except (json.JSONDecodeError, queries.QueryError) as error:
+            self._send_json(http.HTTPStatus.BAD_REQUEST, {"error": str(error)})
+        else:
+            self._send_json(http.HTTPStatus.OK, response)
+
+    def _send_json(
+        self,
+        status: http.HTTPStatus,
+        body: dict,
+    ) -> None:
+        encoded_body = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(encoded_body)))
+        self.end_headers()
+        self.wfile.write(encoded_body)
+
+    def log_message(self, format, *args) -> None:  # pylint: disable=redefined-builtin
+        logger.debug(format, *args)
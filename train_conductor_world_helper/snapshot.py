@@ -0,0 +1,131 @@
+"""Holds the immutable snapshots of the train conductor world mapping."""
+import dataclasses
+import functools
+import typing
+
+import data
+import graphing.graph
+import graphing.pathing.paths
+import instrumentation
+import mapping.coordinate
+import mapping.placements
+import mapping.tile
+import mapping.world
+import stats
+import validations
+
+
+@dataclasses.dataclass(frozen=True)
+class Snapshot:
+    """
+    An immutable view of the world mapping and everything derived from it.
+
+    Snapshots are built off to the side and published by replacing the reference to
+    them, so a reader that holds on to a snapshot never sees a partially updated
+    state. Reports are calculated on first use and kept for the snapshot's lifetime.
+    """
+
+    world_data: data.Data
+    world_map: mapping.world.World
+    graph: graphing.graph.Graph
+    paths: graphing.pathing.paths.Paths
+    placement_table: mapping.placements.PlacementTable
+
+    @classmethod
+    def from_matrices_and_data(
+        cls,
+        map_matrix: list[list[int]],
+        track_matrix: list[list[int]],
+        world_data: data.Data,
+        placement_table: mapping.placements.PlacementTable | None = None,
+    ) -> typing.Self:
+        """
+        Creates a snapshot of the world created from the data lists, creating the
+        placement table from the data if it is not given.
+        """
+        with instrumentation.span("world"):
+            world_map = mapping.world.World.from_matrices_and_data(
+                map_matrix=map_matrix,
+                track_matrix=track_matrix,
+                world_data=world_data,
+            )
+        with instrumentation.span("graph"):
+            graph = graphing.graph.Graph(
+                track_map=world_map.track_map,
+            )
+        paths = graphing.pathing.paths.Paths(
+            world_map=world_map,
+            world_data=world_data,
+            graph=graph,
+        )
+        return cls(
+            world_data=world_data,
+            world_map=world_map,
+            graph=graph,
+            paths=paths,
+            placement_table=placement_table
+            or mapping.placements.PlacementTable(world_data=world_data),
+        )
+
+    def with_track_tile_ids(
+        self,
+        coordinate_to_tile_id: dict[mapping.coordinate.Coordinate, int],
+    ) -> typing.Self:
+        """
+        Returns a snapshot with the tracks at the given coordinates replaced, leaving
+        this snapshot untouched.
+
+        The track map and graph of the new snapshot are copies of this snapshot's with
+        only the edited coordinates rebuilt, and the distance fields that never reach
+        the edited coordinates are shared, rather than all being created from scratch.
+        """
+        world_data = self.world_data
+        track_map = self.world_map.track_map.with_tile_ids(
+            coordinate_to_tile_id=coordinate_to_tile_id,
+            world_data=world_data,
+        )
+        world_map = mapping.world.World(
+            tile_map=self.world_map.tile_map,
+            track_map=track_map,
+        )
+        graph = self.graph.with_track_map(
+            track_map=track_map,
+            coordinates=coordinate_to_tile_id,
+        )
+        paths = self.paths.with_graph(
+            world_map=world_map,
+            graph=graph,
+            coordinates=coordinate_to_tile_id.keys(),
+        )
+        return dataclasses.replace(
+            self,
+            world_map=world_map,
+            graph=graph,
+            paths=paths,
+        )
+
+    @functools.cached_property
+    def track_placement_errors(
+        self,
+    ) -> list[tuple[mapping.tile.Tile, mapping.tile.Tile]]:
+        """Returns each track tile that can't be placed on the map tile below it."""
+        return validations.find_track_placement_errors(
+            world_map=self.world_map,
+            placement_table=self.placement_table,
+        )
+
+    @functools.cached_property
+    def distance_errors(self) -> list[tuple[str, str, int, int]]:
+        """
+        Returns the port name, city name, expected distance and actual distance of
+        each connection that is not of the expected length.
+        """
+        return validations.find_distance_errors(
+            world_data=self.world_data,
+            pathing=self.paths,
+        )
+
+    @functools.cached_property
+    def track_coordinates_table(self) -> stats.TrackCoordinatesTable:
+        """Returns the count of each track on each environment."""
+        return stats.TrackCoordinatesTable.from_world(world_map=self.world_map)
@@ -1,6 +1,8 @@
 """Holds the stats functions for the train conductor world mapping."""
 import collections
+import dataclasses
 import logging
+import typing
 
 import graphing.pathing.paths
 import mapping.world
@@ -8,30 +10,84 @@ import mapping.world
 logger = logging.getLogger(__name__)
 
 
-def output_track_coordinates_count(
-    world_map: mapping.world.World,
+@dataclasses.dataclass(frozen=True)
+class TrackCoordinatesTable:
+    """
+    Represents the contingency table of track abbreviations on environment names,
+    along with the totals and the track length of each track type.
+    """
+
+    counts: dict[str, collections.Counter]
+    totals: collections.Counter
+    type_to_track_length: dict[str, int]
+
+    @classmethod
+    def from_world(
+        cls,
+        world_map: mapping.world.World,
+    ) -> typing.Self:
+        """
+        Creates the table by counting each pair of map tile id and track tile id,
+        then labelling the counts by name.
+        """
+        overlaying_tiles = world_map.overlaying_tiles
+        id_pair_counts = collections.Counter(
+            (map_tile.id, track_tile.id) for track_tile, map_tile in overlaying_tiles
+        )
+        id_to_tile = {tile.id: tile for tiles in overlaying_tiles for tile in tiles}
+
+        counts = collections.defaultdict(collections.Counter)
+        type_to_track_length = collections.Counter()
+        for (map_tile_id, track_tile_id), count in id_pair_counts.items():
+            map_tile = id_to_tile[map_tile_id]
+            track_tile = id_to_tile[track_tile_id]
+            counts[map_tile.name][track_tile.abbreviation] += count
+            type_to_track_length[track_tile.type] += count * len(
+                track_tile.path_component
+            )
+        return cls(
+            counts=dict(counts),
+            totals=sum(counts.values(), start=collections.Counter()),
+            type_to_track_length=dict(type_to_track_length),
+        )
+
+    @property
+    def total(self) -> int:
+        """Returns the total number of tracks."""
+        return self.totals.total()
+
+    def to_dict(self) -> dict[str, dict[str, int]]:
+        """Returns the table as a dictionary that can be serialised as JSON."""
+        return {
+            "counts": {
+                map_tile_name: dict(counter)
+                for map_tile_name, counter in self.counts.items()
+            },
+            "totals": dict(self.totals),
+            "track_lengths": self.type_to_track_length,
+        }
+
+
+def report_track_coordinates_count(
+    track_coordinates_table: TrackCoordinatesTable,
 ) -> None:
-    """Calculates the count of all tracks and their environmental coordinates."""
-    counters = collections.defaultdict(collections.Counter)
-    for track_tile, map_tile in world_map.overlaying_tiles:
-        map_tile_name = map_tile.name
-        track_tile_name = track_tile.abbreviation
-
-        counters[map_tile_name][track_tile_name] += 1
-
-    for map_tile_name, counter in counters.items():
+    """Logs the count of all tracks and their environmental coordinates."""
+    for map_tile_name, counter in track_coordinates_table.counts.items():
         _print_counter(map_tile_name, counter)
 
-    total_counter = sum(counters.values(), start=collections.Counter())
-    _print_counter("Totals", total_counter)
+    _print_counter("Totals", track_coordinates_table.totals)
+    for (
+        track_type,
+        track_length,
+    ) in track_coordinates_table.type_to_track_length.items():
+        logger.debug("%s track length: %s", track_type, track_length)
 
 
 def _print_counter(
     counter_name: str,
     counter: collections.Counter,
 ) -> None:
-    total = len(list(counter.elements()))
-    logger.info("%s (%s):", counter_name, total)
+    logger.info("%s (%s):", counter_name, counter.total())
     for key, count in counter.most_common():
         logger.info("%s: %s", key, count)
 
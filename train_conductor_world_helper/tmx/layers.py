@@ -1,8 +1,10 @@
 #!/usr/bin/env python3
 """Represents a Python interface for a tmx file."""
 
+import array
 import dataclasses
 import logging
+import typing
 import xml.etree.ElementTree as ET
 
 import validations
@@ -75,7 +77,7 @@ class GroupLayer(Layer):
 class TileLayer(Layer):
     """Class for interfacing between tmx xml layers."""
 
-    data: list[list[int]]
+    data: list[typing.Sequence[int]]
     width: int = None
     height: int = None
 
@@ -83,6 +85,21 @@ class TileLayer(Layer):
         self.width = validations.validate_width(self.data)
         self.height = len(self.data)
 
+    @classmethod
+    def from_buffer(
+        cls,
+        name: str,
+        buffer: array.array,
+        width: int,
+    ) -> "TileLayer":
+        """Returns a Layer whose rows are slices of the row major buffer."""
+        return cls(
+            name=name,
+            data=[
+                buffer[start : start + width] for start in range(0, len(buffer), width)
+            ],
+        )
+
     @classmethod
     def from_element(cls, element: ET.Element) -> "TileLayer":
         """Returns the Element as a Layer."""
@@ -120,9 +137,129 @@ class TileLayer(Layer):
 
     @staticmethod
     def to_csv_string(
-        grid: list[list[int]],
+        grid: list[typing.Sequence[int]],
     ) -> str:
         """Converts a 2d grid to a csv string."""
         if not all(isinstance(item, int) for row in grid for item in row):
             raise TypeError(f"Found non int item in {grid}")
         return ",\n".join(",".join(map(str, row)) for row in grid)
+
+
+@dataclasses.dataclass(kw_only=True)
+class MapObject:
+    """Class for keeping a tmx object, drawn as a polyline when it has points."""
+
+    name: str
+    x: float
+    y: float
+    points: list[tuple[float, float]] | None = None
+    properties: dict[str, str | int] = dataclasses.field(default_factory=dict)
+    visible: bool = True
+    id: int = None
+
+    @classmethod
+    def from_element(cls, element: ET.Element) -> "MapObject":
+        """Returns the Element as a MapObject."""
+        polyline_element = element.find("polyline")
+        points = None
+        if polyline_element is not None:
+            points = [
+                tuple(map(float, point.split(",")))
+                for point in polyline_element.get("points").split()
+            ]
+        properties = {}
+        for property_element in element.iterfind("properties/property"):
+            value = property_element.get("value")
+            if property_element.get("type") == "int":
+                value = int(value)
+            properties[property_element.get("name")] = value
+        return cls(
+            id=int(element.get("id")),
+            name=element.get("name"),
+            x=float(element.get("x")),
+            y=float(element.get("y")),
+            points=points,
+            properties=properties,
+            visible=element.get("visible", "1") != "0",
+        )
+
+    def to_element(self) -> ET.Element:
+        """Returns the MapObject as an Element."""
+        if self.id is None:
+            raise ValueError("id was not set.")
+        object_element = ET.Element(
+            "object",
+            {
+                "id": str(self.id),
+                "name": str(self.name),
+                "x": _format_number(self.x),
+                "y": _format_number(self.y),
+            },
+        )
+        if not self.visible:
+            object_element.set("visible", "0")
+        if self.properties:
+            properties_element = ET.SubElement(object_element, "properties")
+            for name, value in self.properties.items():
+                property_element = ET.SubElement(
+                    properties_element,
+                    "property",
+                    name=name,
+                    value=str(value),
+                )
+                if isinstance(value, int):
+                    property_element.set("type", "int")
+        if self.points is None:
+            ET.SubElement(object_element, "point")
+        else:
+            ET.SubElement(
+                object_element,
+                "polyline",
+                points=" ".join(
+                    f"{_format_number(x)},{_format_number(y)}" for x, y in self.points
+                ),
+            )
+        return object_element
+
+
+@dataclasses.dataclass(kw_only=True)
+class ObjectGroup(Layer):
+    """Class for keeping a tmx object group layer."""
+
+    objects: list[MapObject]
+
+    @classmethod
+    def from_element(
+        cls,
+        element: ET.Element,
+    ):
+        """Returns the Element as a Layer."""
+        return cls(
+            id=int(element.get("id")),
+            name=element.get("name"),
+            locked=bool(element.get("locked")),
+            objects=[
+                MapObject.from_element(object_element)
+                for object_element in element.findall("object")
+            ],
+        )
+
+    def to_element(self) -> ET.Element:
+        """Returns the Layer as an Element, without its objects."""
+        if self.id is None:
+            raise ValueError("id was not set.")
+        layer_element = ET.Element(
+            "objectgroup",
+            {
+                "id": str(self.id),
+                "name": str(self.name),
+                "locked": "1" if self.locked else "0",
+            },
+        )
+        return layer_element
+
+
+def _format_number(number: float) -> str:
+    if float(number).is_integer():
+        return str(int(number))
+    return str(number)
@@ -1,10 +1,15 @@
 import logging
 import os
+import typing
 from xml.etree import ElementTree as ET
 
+import instrumentation
+import metrics
 import tmx.layers
 
+MAP_SUFFIX = ".tmx"
 NEXT_LAYER_ID_FIELD = "nextlayerid"
+NEXT_OBJECT_ID_FIELD = "nextobjectid"
 
 logger = logging.getLogger(__name__)
 
@@ -21,6 +26,8 @@ class TiledMap:
         self.root = self.tree.getroot()
         self.width = int(self.root.get("width"))
         self.height = int(self.root.get("height"))
+        self.tile_width = int(self.root.get("tilewidth"))
+        self.tile_height = int(self.root.get("tileheight"))
 
     def get_layer(
         self,
@@ -95,9 +102,14 @@ class TiledMap:
                     f"Mismatch in dimensions layer={layer_dimensions} tmx={tmx_dimensions}"
                 )
             self._add_data_layer(layer=layer, parent=parent)
+            metrics.count(metrics.LAYERS_WRITTEN)
+        elif isinstance(layer, tmx.layers.ObjectGroup):
+            self._add_object_group(object_group=layer, parent=parent)
+            metrics.count(metrics.LAYERS_WRITTEN)
         else:
             raise ValueError(
-                f"Argument {type(layer)} is not of type {tmx.layers.GroupLayer} or {tmx.layers.TileLayer}"
+                f"Argument {type(layer)} is not of type {tmx.layers.GroupLayer}, "
+                f"{tmx.layers.TileLayer} or {tmx.layers.ObjectGroup}"
             )
 
     def _add_data_layer(
@@ -162,13 +174,71 @@ class TiledMap:
                     parent=group_layer_to_edit,
                 )
 
+    def _add_object_group(
+        self,
+        object_group: tmx.layers.ObjectGroup,
+        parent: ET.Element | None,
+    ) -> None:
+        try:
+            object_group_to_edit = self._get_layer(
+                layer_type="objectgroup",
+                name=object_group.name,
+                layer_id=object_group.id,
+                parent=parent,
+            )
+        except ValueError:
+            object_group_to_edit = self._append_layer(
+                layer=object_group,
+                parent=parent,
+            )
+        self._replace_objects(
+            objects=object_group.objects,
+            object_group_element=object_group_to_edit,
+        )
+
+    def _replace_objects(
+        self,
+        objects: list[tmx.layers.MapObject],
+        object_group_element: ET.Element,
+    ) -> None:
+        """
+        Replaces the objects of the object group element, keeping the id and
+        visibility of existing objects with the same name.
+        """
+        name_to_object_element = {}
+        for object_element in object_group_element.findall("object"):
+            name_to_object_element[object_element.get("name")] = object_element
+            object_group_element.remove(object_element)
+
+        for map_object in objects:
+            existing_object_element = name_to_object_element.get(map_object.name)
+            if existing_object_element is None:
+                next_object_id = self._get_next_object_id()
+                map_object.id = next_object_id
+                self.root.set(NEXT_OBJECT_ID_FIELD, str(next_object_id + 1))
+            else:
+                existing_object = tmx.layers.MapObject.from_element(
+                    existing_object_element
+                )
+                map_object.id = existing_object.id
+                map_object.visible = existing_object.visible
+            object_group_element.append(map_object.to_element())
+
+    def _get_next_object_id(self):
+        return int(self.root.get(NEXT_OBJECT_ID_FIELD, 1))
+
     def _get_next_layer_id(self):
         return int(self.root.get(NEXT_LAYER_ID_FIELD))
 
     def save(self) -> None:
         """Saves the current state to the tmx file."""
         logger.info("Saving to %s...", self.filename)
-        self.tree.write(self.filename)
+        with instrumentation.span("serialization"):
+            content = ET.tostring(self.root)
+        with instrumentation.span("write"):
+            with open(self.filename, "wb") as file:
+                file.write(content)
+        metrics.count(metrics.BYTES_WRITTEN, len(content))
         logger.info("Saved!")
 
     def save_layers(self, *layers: tmx.layers.Layer) -> None:
@@ -176,3 +246,28 @@ class TiledMap:
         for layer in layers:
             self.add_layer(layer)
         self.save()
+
+
+def read_layer_data_texts(
+    filename: os.PathLike,
+    names: typing.Collection[str],
+) -> dict[str, str]:
+    """
+    Returns the raw data text of the named top level tile layers, without parsing
+    the rest of the file once they have all been found.
+    """
+    name_to_data_text = {}
+    depth = 0
+    for event, element in ET.iterparse(filename, events=("start", "end")):
+        if event == "start":
+            depth += 1
+            continue
+        depth -= 1
+        if depth != 1 or element.tag != "layer":
+            continue
+        name = element.get("name")
+        if name in names:
+            name_to_data_text[name] = element.findtext("data")
+            if len(name_to_data_text) == len(names):
+                break
+    return name_to_data_text
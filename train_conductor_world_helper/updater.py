@@ -1,60 +1,261 @@
 """Handles the auto updating of the tmx file."""
 import logging
 import os
+import pathlib
+import threading
 import time
 import typing
 
 import watchdog.events
 import watchdog.observers
 
+import tmx.tiled_map
+
+DEFAULT_DEBOUNCE_SECONDS = 0.5
+
 logger = logging.getLogger(__name__)
 
 
-class OverwrittenFileHandler(watchdog.events.FileSystemEventHandler):
-    """Event handler that checks if a file is updated via overwriting."""
+class UpdateSuperseded(Exception):
+    """Raised from a checkpoint when a newer update has been requested."""
+
+
+class UpdateScheduler:
+    """
+    Runs updates on a dedicated worker thread, merging bursts of requests into one.
+
+    An update is only run once no request has been made for the debounce window.
+    The update is given a checkpoint callable which raises `UpdateSuperseded` if a
+    newer request has arrived since the update started, so that a stale update can
+    be abandoned before it saves.
+    """
 
     def __init__(
         self,
-        filename: os.PathLike,
-        callable_on_overwrite: typing.Callable,
+        callable_on_update: typing.Callable[[typing.Callable[[], None]], None],
+        debounce_seconds: float = DEFAULT_DEBOUNCE_SECONDS,
     ) -> None:
-        self.filename = filename
-        self.callable_on_overwrite = callable_on_overwrite
+        self.callable_on_update = callable_on_update
+        self.debounce_seconds = debounce_seconds
+        self._condition = threading.Condition()
+        self._generation = 0
+        self._completed_generation = 0
+        self._last_request_time = 0.0
+        self._stopping = False
+        self._worker = threading.Thread(
+            target=self._run_updates,
+            name="update-scheduler",
+            daemon=True,
+        )
+
+    def start(self) -> None:
+        """Starts the worker thread."""
+        self._worker.start()
+
+    def stop(self) -> None:
+        """Stops the worker thread, waiting for any running update to finish."""
+        with self._condition:
+            self._stopping = True
+            self._condition.notify_all()
+        self._worker.join()
+
+    def request_update(self) -> None:
+        """Requests an update, superseding any pending or running update."""
+        with self._condition:
+            self._generation += 1
+            self._last_request_time = time.monotonic()
+            self._condition.notify_all()
+        logger.debug("Update %s requested.", self._generation)
+
+    def _run_updates(self) -> None:
+        while True:
+            generation = self._wait_for_update()
+            if generation is None:
+                return
+            self._run_update(generation=generation)
+
+    def _wait_for_update(self) -> int | None:
+        """
+        Waits until an update is pending and no request has been made within the
+        debounce window, returning its generation or None when stopping.
+        """
+        with self._condition:
+            while True:
+                if self._stopping:
+                    return None
+                if self._generation == self._completed_generation:
+                    self._condition.wait()
+                    continue
+                remaining_seconds = (
+                    self._last_request_time + self.debounce_seconds - time.monotonic()
+                )
+                if remaining_seconds > 0:
+                    self._condition.wait(timeout=remaining_seconds)
+                    continue
+                return self._generation
+
+    def _run_update(self, generation: int) -> None:
+        def checkpoint() -> None:
+            if self._stopping or self._generation != generation:
+                raise UpdateSuperseded
+
+        logger.debug("Running update %s...", generation)
+        try:
+            self.callable_on_update(checkpoint)
+        except UpdateSuperseded:
+            logger.info("Update superseded by a newer change, restarting...")
+            return
+        except Exception:  # pylint: disable=broad-exception-caught
+            logger.exception("Update %s failed.", generation)
+        with self._condition:
+            self._completed_generation = generation
+
+
+class MapEventHandler(watchdog.events.FileSystemEventHandler):
+    """
+    Event handler that checks if a watched map was updated, either by being written
+    in place or by having another file moved over it.
+    """
+
+    def __init__(
+        self,
+        callable_on_update: typing.Callable[[pathlib.Path], None],
+    ) -> None:
+        self.callable_on_update = callable_on_update
+
+    def on_closed(
+        self,
+        event: watchdog.events.FileClosedEvent,
+    ) -> None:
+        logger.debug("File closed after writing: %s", event.src_path)
+        if not event.is_directory:
+            self.callable_on_update(pathlib.Path(event.src_path))
 
     def on_moved(
         self,
         event: watchdog.events.FileMovedEvent,
     ) -> None:
-        logger.debug("File move detected.")
-        if not event.is_directory and event.dest_path.endswith(self.filename):
-            logger.debug("File moved was a directory and ends with `%s`", self.filename)
-            self.callable_on_overwrite()
-
-
-def poll_and_call_on_updates(
-    filename: os.PathLike,
-    callable_on_update: typing.Callable,
-) -> None:
-    """Runs the callable whenever the given file has been updated."""
-    event_handler = OverwrittenFileHandler(
-        filename=filename,
-        callable_on_overwrite=callable_on_update,
-    )
-    observer = watchdog.observers.Observer()
-    parent_directory = os.path.dirname(filename)
-    logger.debug("Observing %s", parent_directory)
-    observer.schedule(
-        event_handler=event_handler,
-        path=parent_directory,
-    )
-    logger.info("Starting polling to look for changes to %s...", filename)
-    observer.start()
-    try:
-        while True:
-            seconds = 1
-            # Why sleep by 1 second?
-            time.sleep(seconds)
-            logger.debug("Waited %ss for changes to %s...", seconds, filename)
-    except KeyboardInterrupt:
-        observer.stop()
-    observer.join()
+        logger.debug("File moved: %s -> %s", event.src_path, event.dest_path)
+        if not event.is_directory:
+            self.callable_on_update(pathlib.Path(event.dest_path))
+
+
+class WatchService:
+    """
+    Watches maps with a single observer, updating each map on its own scheduler.
+
+    Maps are watched either individually, or as every map within a directory,
+    including maps which are added to the directory while it is being watched.
+    """
+
+    def __init__(
+        self,
+        create_update_callable: typing.Callable[
+            [pathlib.Path], typing.Callable[[typing.Callable[[], None]], None]
+        ],
+        debounce_seconds: float = DEFAULT_DEBOUNCE_SECONDS,
+    ) -> None:
+        self.create_update_callable = create_update_callable
+        self.debounce_seconds = debounce_seconds
+        self._observer = watchdog.observers.Observer()
+        self._event_handler = MapEventHandler(callable_on_update=self._on_update)
+        self._lock = threading.Lock()
+        self._path_to_scheduler: dict[pathlib.Path, UpdateScheduler] = {}
+        self._watched_directories: set[pathlib.Path] = set()
+        self._observed_directories: set[pathlib.Path] = set()
+
+    def watch_file(
+        self,
+        filename: os.PathLike,
+    ) -> None:
+        """Watches the given map for updates."""
+        path = pathlib.Path(filename).resolve()
+        self._observe(path.parent)
+        self._add_map(path)
+
+    def watch_directory(
+        self,
+        directory: os.PathLike,
+    ) -> None:
+        """Watches every map within the given directory for updates."""
+        directory = pathlib.Path(directory).resolve()
+        self._observe(directory)
+        with self._lock:
+            self._watched_directories.add(directory)
+        for path in sorted(directory.glob(f"*{tmx.tiled_map.MAP_SUFFIX}")):
+            self._add_map(path)
+
+    def run(self) -> None:
+        """Blocks and updates the watched maps until interrupted."""
+        self.start()
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            logger.info("Stopping...")
+        finally:
+            self.stop()
+
+    def start(self) -> None:
+        """Starts updating the watched maps in the background."""
+        logger.info(
+            "Watching %s for changes...",
+            ", ".join(map(str, self._path_to_scheduler)) or "nothing",
+        )
+        self._observer.start()
+
+    def stop(self) -> None:
+        """Stops watching, waiting for any running updates to finish."""
+        self._observer.stop()
+        self._observer.join()
+        for scheduler in self._path_to_scheduler.values():
+            scheduler.stop()
+
+    def _observe(
+        self,
+        directory: pathlib.Path,
+    ) -> None:
+        if directory in self._observed_directories:
+            return
+        logger.debug("Observing %s", directory)
+        self._observer.schedule(
+            event_handler=self._event_handler,
+            path=str(directory),
+        )
+        self._observed_directories.add(directory)
+
+    def _add_map(
+        self,
+        path: pathlib.Path,
+    ) -> UpdateScheduler:
+        """Starts a scheduler for the map, raising if the map cannot be loaded."""
+        with self._lock:
+            scheduler = self._path_to_scheduler.get(path)
+            if scheduler is None:
+                logger.info("Loading %s...", path)
+                scheduler = UpdateScheduler(
+                    callable_on_update=self.create_update_callable(path),
+                    debounce_seconds=self.debounce_seconds,
+                )
+                scheduler.start()
+                self._path_to_scheduler[path] = scheduler
+            return scheduler
+
+    def _on_update(
+        self,
+        path: pathlib.Path,
+    ) -> None:
+        path = path.resolve()
+        scheduler = self._path_to_scheduler.get(path)
+        if scheduler is None:
+            if (
+                path.suffix != tmx.tiled_map.MAP_SUFFIX
+                or path.parent not in self._watched_directories
+            ):
+                return
+            try:
+                scheduler = self._add_map(path)
+            except Exception:  # pylint: disable=broad-exception-caught
+                logger.exception("Failed to load %s.", path)
+                return
+        logger.debug("Update detected for %s", path)
+        scheduler.request_update()
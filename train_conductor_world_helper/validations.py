@@ -6,35 +6,64 @@ import data
 logger = logging.getLogger(__name__)
 
 
+def find_track_placement_errors(
+    world_map: "mapping.map.World",
+    placement_table: "mapping.placements.PlacementTable",
+) -> list[tuple["mapping.tile.Tile", "mapping.tile.Tile"]]:
+    """Returns each track tile that can't be placed on the map tile below it."""
+    return [
+        (track_tile, map_tile)
+        for track_tile, map_tile in world_map.overlaying_tiles
+        if not placement_table.is_legal(
+            track_tile_id=track_tile.id,
+            tile_id=map_tile.id,
+        )
+    ]
+
+
 def validate_track_placements(
     world_map: "mapping.map.World",
+    placement_table: "mapping.placements.PlacementTable",
 ) -> bool:
     """Returns whether all track placements are valid on the world mapping."""
+    return report_track_placement_errors(
+        track_placement_errors=find_track_placement_errors(
+            world_map=world_map,
+            placement_table=placement_table,
+        ),
+    )
+
+
+def report_track_placement_errors(
+    track_placement_errors: list[tuple["mapping.tile.Tile", "mapping.tile.Tile"]],
+) -> bool:
+    """Logs the track placement errors and returns whether there were none."""
     check_passed = True
 
-    for track_tile, map_tile in world_map.overlaying_tiles:
-        if not track_tile.placeable_on(map_tile):
-            logger.error(
-                "%s %s track at coordinate %s can't be placed on %s",
-                track_tile.abbreviation,
-                track_tile.type,
-                track_tile.coordinate,
-                map_tile,
-            )
-            check_passed = False
+    for track_tile, map_tile in track_placement_errors:
+        logger.error(
+            "%s %s track at coordinate %s can't be placed on %s",
+            track_tile.abbreviation,
+            track_tile.type,
+            track_tile.coordinate,
+            map_tile,
+        )
+        check_passed = False
 
     if check_passed:
         logger.info("All track placements are valid. You are awesome!")
     return check_passed
 
 
-def validate_distances(
+def find_distance_errors(
     world_data: data.Data,
     pathing: "graphing.paths.Paths",
-) -> bool:
-    """Returns whether all the connection distances are of the expected length."""
-    logger.info("Checking all distances...")
-    check_passed = True
+) -> list[tuple[str, str, int, int]]:
+    """
+    Returns the port name, city name, expected distance and actual distance of
+    each connection that is not of the expected length.
+    """
+    distance_errors = []
     for port_name, city_name in world_data.port_to_city_name_pairs:
         actual_distance = pathing.distance_between(
             port_name=port_name,
@@ -45,17 +74,45 @@ def validate_distances(
             city_name=city_name,
         )
         if actual_distance != expected_distance:
-            check_passed = False
-            if actual_distance == 0:
-                logger.warning("%s -> %s is not connected.", port_name, city_name)
-            else:
-                logger.warning(
-                    "%s -> %s distance is non minimum.\tExpected %s but was %s.",
-                    port_name,
-                    city_name,
-                    expected_distance,
-                    actual_distance,
-                )
+            distance_errors.append(
+                (port_name, city_name, expected_distance, actual_distance)
+            )
+    return distance_errors
+
+
+def validate_distances(
+    world_data: data.Data,
+    pathing: "graphing.paths.Paths",
+) -> bool:
+    """Returns whether all the connection distances are of the expected length."""
+    return report_distance_errors(
+        distance_errors=find_distance_errors(world_data=world_data, pathing=pathing),
+    )
+
+
+def report_distance_errors(
+    distance_errors: list[tuple[str, str, int, int]],
+) -> bool:
+    """Logs the distance errors and returns whether there were none."""
+    logger.info("Checking all distances...")
+    check_passed = True
+    for (
+        port_name,
+        city_name,
+        expected_distance,
+        actual_distance,
+    ) in distance_errors:
+        check_passed = False
+        if actual_distance == 0:
+            logger.warning("%s -> %s is not connected.", port_name, city_name)
+        else:
+            logger.warning(
+                "%s -> %s distance is non minimum.\tExpected %s but was %s.",
+                port_name,
+                city_name,
+                expected_distance,
+                actual_distance,
+            )
     if check_passed:
         logger.info("All distance tests passed. You are awesome!")
     return check_passed
@@ -0,0 +1,130 @@
+"""Evaluates hypothetical track edits without touching the current mapping."""
+import dataclasses
+import functools
+import typing
+
+import mapping.coordinate
+import mapping.tile
+import snapshot
+from graphing.edge import Edge
+
+
+class TrackEdit(typing.NamedTuple):
+    """Represents placing a track tile at a coordinate, or removing it with id 0."""
+
+    x: int
+    y: int
+    tile_id: int
+
+
+@dataclasses.dataclass(frozen=True)
+class WhatIf:
+    """The outcome of applying track edits to a snapshot."""
+
+    before: snapshot.Snapshot
+    after: snapshot.Snapshot
+
+    @functools.cached_property
+    def distance_changes(self) -> list[tuple[str, str, int, int, int]]:
+        """
+        Returns the port name, city name, expected distance, distance before and
+        distance after of each connection whose distance was changed by the edits.
+
+        The distances are searched for directly, but are those validation reports.
+        """
+        distance_changes = []
+        world_data = self.after.world_data
+        for port_name, city_name in world_data.port_to_city_name_pairs:
+            distance_before = self.before.paths.route_distance_between(
+                port_name=port_name,
+                city_name=city_name,
+            )
+            distance_after = self.after.paths.route_distance_between(
+                port_name=port_name,
+                city_name=city_name,
+            )
+            if distance_before != distance_after:
+                expected_distance = world_data.distance_between(
+                    port_name=port_name,
+                    city_name=city_name,
+                )
+                distance_changes.append(
+                    (
+                        port_name,
+                        city_name,
+                        expected_distance,
+                        distance_before,
+                        distance_after,
+                    )
+                )
+        return distance_changes
+
+    @functools.cached_property
+    def new_track_placement_errors(
+        self,
+    ) -> list[tuple[mapping.tile.Tile, mapping.tile.Tile]]:
+        """Returns the track placement errors introduced by the edits."""
+        errors_before = {
+            (track_tile.coordinate, track_tile.id)
+            for track_tile, _ in self.before.track_placement_errors
+        }
+        return [
+            (track_tile, map_tile)
+            for track_tile, map_tile in self.after.track_placement_errors
+            if (track_tile.coordinate, track_tile.id) not in errors_before
+        ]
+
+    @functools.cached_property
+    def new_unrouted_edges(self) -> list[Edge]:
+        """
+        Returns the edges that lie on no shortest valid route of any connection after
+        the edits, but did before them or didn't exist.
+
+        Unlike the unused edges reported by the stats, which are those off the one
+        minimum path chosen for each connection, an edge on any of several equally
+        short routes counts as routed, so ties don't depend on which path is chosen.
+        """
+        return sorted(
+            self.after.paths.unrouted_edges - self.before.paths.unrouted_edges
+        )
+
+
+def evaluate(
+    world_snapshot: snapshot.Snapshot,
+    edits: typing.Iterable[TrackEdit],
+) -> WhatIf:
+    """
+    Returns the outcome of applying the edits to the snapshot, in order, raising a
+    ValueError if any edit is invalid. The snapshot is left untouched.
+    """
+    coordinate_to_tile_id = {}
+    for edit in edits:
+        _validate_edit(world_snapshot=world_snapshot, edit=edit)
+        coordinate = mapping.coordinate.Coordinate(x=edit.x, y=edit.y)
+        coordinate_to_tile_id[coordinate] = edit.tile_id
+    return WhatIf(
+        before=world_snapshot,
+        after=world_snapshot.with_track_tile_ids(
+            coordinate_to_tile_id=coordinate_to_tile_id,
+        ),
+    )
+
+
+def _validate_edit(
+    world_snapshot: snapshot.Snapshot,
+    edit: TrackEdit,
+) -> None:
+    track_map = world_snapshot.world_map.track_map
+    if not (0 <= edit.x < track_map.width and 0 <= edit.y < track_map.height):
+        raise ValueError(
+            f"({edit.x}, {edit.y}) is outside of the "
+            f"{track_map.width}x{track_map.height} map."
+        )
+    if edit.tile_id == 0:
+        return
+    try:
+        tile_data = world_snapshot.world_data.data_of(tile_id=edit.tile_id)
+    except KeyError as error:
+        raise ValueError(f"Unknown tile id {edit.tile_id}.") from error
+    if tile_data["group"] != "Track":
+        raise ValueError(f"{tile_data['name']} ({edit.tile_id}) is not a track.")
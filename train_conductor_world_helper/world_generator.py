@@ -0,0 +1,674 @@
+#!/usr/bin/env python3
+
+"""Generates synthetic worlds of a configurable size for scale testing."""
+
+import array
+import dataclasses
+import json
+import os
+import pathlib
+import random
+import typing
+import xml.etree.ElementTree as ET
+
+import click
+import networkx as nx
+
+import data
+import graphing.graph
+import graphing.pathing.distance_field
+import helper
+import mapping.coordinate
+import mapping.placements
+import mapping.tile_map
+import tmx.layers
+from graphing.pathing.path_component import PathComponent
+
+DATA_DIR = pathlib.Path("./data/")
+DEFAULT_DISTANCES_FILENAME = DATA_DIR / "distances.json"
+DEFAULT_TILES_FILENAME = DATA_DIR / "tiles.json"
+DEFAULT_TILE_IMAGES_DIRECTORY = DATA_DIR / "tile_images"
+DEFAULT_OUTPUT_DIRECTORY = pathlib.Path("./generated/")
+DEFAULT_SIZE = 200
+DEFAULT_PORTS = 12
+DEFAULT_CITIES = 48
+DEFAULT_SEED = 0
+MIN_SIZE = 50
+MAX_SIZE = 2000
+TMX_FILENAME = "world.tmx"
+TILES_FILENAME = "tiles.json"
+DISTANCES_FILENAME = "distances.json"
+TILE_SIZE = 64
+
+# Tile ids of the bundled tile data used to paint the terrain.
+GRASS_TILE_IDS = (4, 5, 6, 7)
+GRASS_WEIGHTS = (4, 4, 1, 1)
+FOREST_TILE_IDS = (8, 9)
+WATER_TILE_IDS = (2, 3)
+MOUNTAIN_TILE_IDS = (10, 11)
+# Cells of the map per patch of each terrain, and the range of the patch radii.
+CELLS_PER_FOREST = 400
+FOREST_RADII = (2, 8)
+CELLS_PER_LAKE = 900
+LAKE_RADII = (2, 6)
+CELLS_PER_MOUNTAIN = 1600
+MOUNTAIN_RADII = (1, 4)
+# Cells that must lie between any two locations.
+LOCATION_SPACING = 2
+MAX_PLACEMENT_ATTEMPTS = 10_000
+# Ports a city tries to route to, nearest first, before it is left unconnected.
+PORTS_TRIED_PER_CITY = 3
+
+Cell = tuple[int, int]
+
+NORTH = (0, -1)
+EAST = (1, 0)
+SOUTH = (0, 1)
+WEST = (-1, 0)
+
+SIDES_TO_PATH_COMPONENT = {
+    frozenset((NORTH, SOUTH)): PathComponent.VERTICAL,
+    frozenset((WEST, EAST)): PathComponent.HORIZONTAL,
+    frozenset((NORTH, EAST)): PathComponent.UP_RIGHT,
+    frozenset((SOUTH, WEST)): PathComponent.DOWN_LEFT,
+    frozenset((SOUTH, EAST)): PathComponent.DOWN_RIGHT,
+    frozenset((NORTH, WEST)): PathComponent.UP_LEFT,
+}
+PATH_COMPONENT_TO_SIDES = {
+    path_component: sides for sides, path_component in SIDES_TO_PATH_COMPONENT.items()
+}
+
+
+@dataclasses.dataclass(frozen=True)
+class Location:
+    """Represents a generated port or city."""
+
+    name: str
+    type: str
+    cell: Cell
+
+
+class WorldGenerator:
+    """
+    Generates a world of random terrain, ports and cities, and the track network
+    that connects them.
+
+    Each city is routed towards its nearest ports, one cell at a time, until it
+    reaches a port or joins an existing track with a legal branching track, so the
+    network grows as trees of branching tracks around the ports, like the bundled
+    map's network.
+    """
+
+    def __init__(
+        self,
+        world_data: data.Data,
+        width: int,
+        height: int,
+        seed: int,
+    ) -> None:
+        self.world_data = world_data
+        self.width = width
+        self.height = height
+        self.random = random.Random(seed)
+        self.map_grid: list[array.array] = []
+        self.locations: list[Location] = []
+        self._cell_to_location: dict[Cell, Location] = {}
+        self._cell_to_path_component: dict[Cell, PathComponent] = {}
+        self._map_tile_id_to_legal_tile_ids = self._create_legal_tile_ids(world_data)
+
+    def generate(
+        self,
+        port_count: int,
+        city_count: int,
+    ) -> None:
+        """Generates the terrain, locations and tracks of the world."""
+        self._paint_terrain()
+        ports = self._place_locations(location_type="Port", count=port_count)
+        cities = self._place_locations(location_type="City", count=city_count)
+        for city in cities:
+            nearest_ports = sorted(
+                ports,
+                key=lambda port, city=city: _manhattan_distance(port.cell, city.cell),
+            )
+            for port in nearest_ports[:PORTS_TRIED_PER_CITY]:
+                if self._route(from_cell=city.cell, to_cell=port.cell):
+                    break
+
+    @property
+    def track_count(self) -> int:
+        """Returns the number of cells with tracks."""
+        return len(self._cell_to_path_component)
+
+    def track_grid(self) -> list[array.array]:
+        """Returns the track tile id of each cell, row by row."""
+        track_grid = [array.array("I", [0]) * self.width for _ in range(self.height)]
+        for (x, y), tile_id in self._cell_to_track_tile_id().items():
+            track_grid[y][x] = tile_id
+        return track_grid
+
+    def distances(self) -> dict[str, list[dict[str, str | int]]]:
+        """
+        Returns the distance of the shortest valid route from each port to each city
+        it reaches over the generated tracks, nearest first, in the format of the
+        distances json file.
+        """
+        coordinate_to_tile_id = {
+            mapping.coordinate.Coordinate(x=x, y=y): tile_id
+            for (x, y), tile_id in self._cell_to_track_tile_id().items()
+        }
+        # Only the tracks are graphed, rather than every edge node of the map.
+        empty_track_map = mapping.tile_map.TileMap(
+            grid=[[None] * self.width] * self.height,
+            width=self.width,
+            height=self.height,
+        )
+        track_map = empty_track_map.with_tile_ids(
+            coordinate_to_tile_id=coordinate_to_tile_id,
+            world_data=self.world_data,
+        )
+        graph = graphing.graph.Graph(
+            track_map=empty_track_map,
+            graph=nx.Graph(),
+        ).with_track_map(
+            track_map=track_map,
+            coordinates=coordinate_to_tile_id,
+        )
+
+        cities = [location for location in self.locations if location.type == "City"]
+        distances = {}
+        for port in self.locations:
+            if port.type != "Port":
+                continue
+            distance_field = graphing.pathing.distance_field.DistanceField(
+                graph=graph,
+                source_nodes=_coordinate_of(port.cell).edge_nodes,
+            )
+            city_distances = [
+                {"name": city.name, "distance": distance}
+                for city in cities
+                if (
+                    distance := distance_field.distance_to_any(
+                        _coordinate_of(city.cell).edge_nodes
+                    )
+                )
+                is not None
+            ]
+            if city_distances:
+                distances[port.name] = sorted(
+                    city_distances,
+                    key=lambda city_distance: city_distance["distance"],
+                )
+        return distances
+
+    def tiles(self) -> list[dict]:
+        """
+        Returns the bundled tile data with a location tile appended for each
+        generated port and city, in the format of the tiles json file.
+        """
+        tiles = [
+            self.world_data.data_of(tile_id=tile_id)
+            for tile_id in self.world_data.tile_ids
+        ]
+        location_tiles = [tile for tile in tiles if tile["group"] == "Location"]
+        type_to_template_tiles = {
+            location_type: [
+                tile for tile in location_tiles if tile["type"] == location_type
+            ]
+            for location_type in ("Port", "City")
+        }
+        next_tile_id = self._first_location_tile_id
+        next_group_id = max(tile["group_id"] for tile in location_tiles) + 1
+        generated_tiles = []
+        for index, location in enumerate(self.locations):
+            template_tiles = type_to_template_tiles[location.type]
+            template_tile = template_tiles[index % len(template_tiles)]
+            x, y = location.cell
+            generated_tiles.append(
+                {
+                    **template_tile,
+                    "abbreviation": location.name[0] + location.name.split()[-1],
+                    "name": location.name,
+                    "id": next_tile_id - 1 + index,
+                    data.CELL_ID_REFERENCE: next_tile_id + index,
+                    "group_id": next_group_id + index,
+                    "x": x,
+                    "y": y,
+                }
+            )
+        return tiles + generated_tiles
+
+    @property
+    def _first_location_tile_id(self) -> int:
+        return max(self.world_data.tile_ids) + 1
+
+    def _cell_to_track_tile_id(self) -> dict[Cell, int]:
+        return {
+            (x, y): self._map_tile_id_to_legal_tile_ids[self.map_grid[y][x]][
+                path_component
+            ]
+            for (x, y), path_component in self._cell_to_path_component.items()
+        }
+
+    def _paint_terrain(self) -> None:
+        width, height = self.width, self.height
+        self.map_grid = [
+            array.array(
+                "I",
+                self.random.choices(GRASS_TILE_IDS, weights=GRASS_WEIGHTS, k=width),
+            )
+            for _ in range(height)
+        ]
+        area = width * height
+        for cells_per_patch, radii, tile_ids in (
+            (CELLS_PER_FOREST, FOREST_RADII, FOREST_TILE_IDS),
+            (CELLS_PER_LAKE, LAKE_RADII, WATER_TILE_IDS),
+            (CELLS_PER_MOUNTAIN, MOUNTAIN_RADII, MOUNTAIN_TILE_IDS),
+        ):
+            for _ in range(area // cells_per_patch):
+                self._paint_patch(
+                    radius=self.random.randint(*radii),
+                    tile_ids=tile_ids,
+                )
+
+    def _paint_patch(
+        self,
+        radius: int,
+        tile_ids: tuple[int, ...],
+    ) -> None:
+        center_x = self.random.randrange(self.width)
+        center_y = self.random.randrange(self.height)
+        tile_id = self.random.choice(tile_ids)
+        for y in range(
+            max(center_y - radius, 0), min(center_y + radius + 1, self.height)
+        ):
+            row = self.map_grid[y]
+            for x in range(
+                max(center_x - radius, 0), min(center_x + radius + 1, self.width)
+            ):
+                # Roughens the edge of the patch.
+                if (x - center_x) ** 2 + (y - center_y) ** 2 <= (
+                    radius + self.random.random() - 0.5
+                ) ** 2:
+                    row[x] = tile_id
+
+    def _place_locations(
+        self,
+        location_type: str,
+        count: int,
+    ) -> list[Location]:
+        locations = []
+        for _ in range(MAX_PLACEMENT_ATTEMPTS * count):
+            if len(locations) == count:
+                break
+            cell = (
+                self.random.randrange(self.width),
+                self.random.randrange(self.height),
+            )
+            x, y = cell
+            if self.map_grid[y][x] not in GRASS_TILE_IDS or self._near_location(cell):
+                continue
+            location = Location(
+                name=f"{location_type} {len(locations) + 1}",
+                type=location_type,
+                cell=cell,
+            )
+            locations.append(location)
+            self._cell_to_location[cell] = location
+            # The map shows the location's tile rather than its terrain.
+            self.map_grid[y][x] = self._first_location_tile_id + len(self.locations)
+            self.locations.append(location)
+        if len(locations) < count:
+            raise ValueError(
+                f"Could only place {len(locations)} of {count} {location_type.lower()}"
+                f" locations on a {self.width}x{self.height} map."
+            )
+        return locations
+
+    def _near_location(self, cell: Cell) -> bool:
+        x, y = cell
+        return any(
+            (x + x_offset, y + y_offset) in self._cell_to_location
+            for x_offset in range(-LOCATION_SPACING, LOCATION_SPACING + 1)
+            for y_offset in range(-LOCATION_SPACING, LOCATION_SPACING + 1)
+        )
+
+    def _route(
+        self,
+        from_cell: Cell,
+        to_cell: Cell,
+    ) -> bool:
+        """
+        Walks from the cell towards the other cell, placing tracks until reaching it
+        or joining an existing track, and returns whether the walk succeeded. Nothing
+        is placed when the walk is blocked.
+        """
+        cell_to_path_component = {}
+        cell = from_cell
+        entry_side = None
+        while True:
+            for direction in self._directions_towards(cell=cell, to_cell=to_cell):
+                if entry_side is not None and not self._is_legal(
+                    cell=cell,
+                    path_component=SIDES_TO_PATH_COMPONENT[
+                        frozenset((entry_side, direction))
+                    ],
+                ):
+                    continue
+                next_cell = (cell[0] + direction[0], cell[1] + direction[1])
+                next_entry_side = (-direction[0], -direction[1])
+                if next_cell == to_cell:
+                    break
+                if next_cell in self._cell_to_location:
+                    continue
+                if next_cell in self._cell_to_path_component:
+                    if branch := self._branch(
+                        cell=next_cell,
+                        entry_side=next_entry_side,
+                    ):
+                        cell_to_path_component[next_cell] = branch
+                        break
+                    continue
+                if not self._map_tile_id_to_legal_tile_ids[
+                    self._map_tile_id(next_cell)
+                ]:
+                    continue
+                break
+            else:
+                return False
+
+            if entry_side is not None:
+                cell_to_path_component[cell] = SIDES_TO_PATH_COMPONENT[
+                    frozenset((entry_side, direction))
+                ]
+            if next_cell == to_cell or next_cell in self._cell_to_path_component:
+                self._cell_to_path_component.update(cell_to_path_component)
+                return True
+            cell = next_cell
+            entry_side = next_entry_side
+
+    def _directions_towards(
+        self,
+        cell: Cell,
+        to_cell: Cell,
+    ) -> list[tuple[int, int]]:
+        """
+        Returns the directions that step closer to the other cell, in a random order
+        weighted by how far there is left to go along each.
+        """
+        x_distance = to_cell[0] - cell[0]
+        y_distance = to_cell[1] - cell[1]
+        directions = []
+        if x_distance:
+            directions.append(EAST if x_distance > 0 else WEST)
+        if y_distance:
+            directions.append(SOUTH if y_distance > 0 else NORTH)
+        if len(directions) == 2 and self.random.randrange(
+            abs(x_distance) + abs(y_distance)
+        ) >= abs(x_distance):
+            directions.reverse()
+        return directions
+
+    def _branch(
+        self,
+        cell: Cell,
+        entry_side: tuple[int, int],
+    ) -> PathComponent | None:
+        """
+        Returns the path components of the track at the cell joined from the entry
+        side to one of its existing ends, or None if no such track is legal.
+        """
+        path_component = self._cell_to_path_component[cell]
+        ends = {
+            side
+            for component in path_component
+            for side in PATH_COMPONENT_TO_SIDES[component]
+        }
+        branches = [
+            path_component | SIDES_TO_PATH_COMPONENT[frozenset((entry_side, end))]
+            for end in ends
+            if end != entry_side
+        ]
+        self.random.shuffle(branches)
+        for branch in branches:
+            if self._is_legal(cell=cell, path_component=branch):
+                return branch
+        return None
+
+    def _is_legal(
+        self,
+        cell: Cell,
+        path_component: PathComponent,
+    ) -> bool:
+        return (
+            path_component
+            in self._map_tile_id_to_legal_tile_ids[self._map_tile_id(cell)]
+        )
+
+    def _map_tile_id(self, cell: Cell) -> int:
+        x, y = cell
+        return self.map_grid[y][x]
+
+    @staticmethod
+    def _create_legal_tile_ids(
+        world_data: data.Data,
+    ) -> dict[int, dict[PathComponent, int]]:
+        """
+        Returns the first track tile id, in the order of the tile data, that can be
+        placed on each terrain tile for each combination of path components.
+        """
+        placement_table = mapping.placements.PlacementTable(world_data=world_data)
+        map_tile_id_to_legal_tile_ids = {}
+        for map_tile_id in (
+            *GRASS_TILE_IDS,
+            *FOREST_TILE_IDS,
+            *WATER_TILE_IDS,
+            *MOUNTAIN_TILE_IDS,
+        ):
+            legal_tile_ids = {}
+            for tile_id in placement_table.allowed_track_tile_ids(map_tile_id):
+                path_component = PathComponent.from_dict(
+                    dictionary=world_data.data_of(tile_id=tile_id),
+                )
+                legal_tile_ids.setdefault(path_component, tile_id)
+            map_tile_id_to_legal_tile_ids[map_tile_id] = legal_tile_ids
+        return map_tile_id_to_legal_tile_ids
+
+
+def write_tmx(
+    filename: os.PathLike,
+    tiles: list[dict],
+    map_grid: list[typing.Sequence[int]],
+    track_grid: list[typing.Sequence[int]],
+    tile_images_directory: pathlib.Path,
+) -> None:
+    """Writes a tmx file of the map and track layers, with a tileset of the tiles."""
+    height = len(map_grid)
+    width = len(map_grid[0])
+    root = ET.Element(
+        "map",
+        {
+            "version": "1.9",
+            "tiledversion": "1.9.2",
+            "orientation": "orthogonal",
+            "renderorder": "right-down",
+            "width": str(width),
+            "height": str(height),
+            "tilewidth": str(TILE_SIZE),
+            "tileheight": str(TILE_SIZE),
+            "infinite": "0",
+            "nextlayerid": "3",
+            "nextobjectid": "1",
+        },
+    )
+    editor_settings = ET.SubElement(root, "editorsettings")
+    ET.SubElement(editor_settings, "export", format="csv")
+    tileset = ET.SubElement(
+        root,
+        "tileset",
+        {
+            "firstgid": "1",
+            "name": "tiles",
+            "tilewidth": str(TILE_SIZE),
+            "tileheight": str(TILE_SIZE),
+            "tilecount": str(len(tiles)),
+            "columns": "0",
+        },
+    )
+    ET.SubElement(tileset, "grid", orientation="orthogonal", width="1", height="1")
+    image_directory = os.path.relpath(
+        tile_images_directory,
+        start=pathlib.Path(filename).parent,
+    )
+    for tile in tiles:
+        tile_element = ET.SubElement(
+            tileset, "tile", id=str(tile[data.CELL_ID_REFERENCE] - 1)
+        )
+        ET.SubElement(
+            tile_element,
+            "image",
+            width=str(TILE_SIZE),
+            height=str(TILE_SIZE),
+            source=f"{image_directory}/{tile['filename']}",
+        )
+    for layer_id, name, grid, locked in (
+        (1, helper.MAP_LAYER_NAME, map_grid, True),
+        (2, helper.TRACKS_LAYER_NAME, track_grid, False),
+    ):
+        root.append(
+            tmx.layers.TileLayer(
+                id=layer_id,
+                name=name,
+                data=grid,
+                locked=locked,
+            ).to_element()
+        )
+    ET.indent(root, space=" ", level=0)
+    ET.ElementTree(root).write(filename, encoding="UTF-8", xml_declaration=True)
+
+
+def _manhattan_distance(cell: Cell, other_cell: Cell) -> int:
+    return abs(cell[0] - other_cell[0]) + abs(cell[1] - other_cell[1])
+
+
+def _coordinate_of(cell: Cell) -> mapping.coordinate.Coordinate:
+    x, y = cell
+    return mapping.coordinate.Coordinate(x=x, y=y)
+
+
+@click.command()
+@click.option(
+    "--distances-path",
+    help="Path to the distances json file whose tile data is extended.",
+    default=DEFAULT_DISTANCES_FILENAME,
+)
+@click.option(
+    "--tiles-path",
+    help="Path to the tile json file whose tiles are used and extended.",
+    default=DEFAULT_TILES_FILENAME,
+)
+@click.option(
+    "--tile-images-directory",
+    help="Path to the tile images referenced by the generated tmx file.",
+    type=click.Path(file_okay=False),
+    default=DEFAULT_TILE_IMAGES_DIRECTORY,
+)
+@click.option(
+    "--output-directory",
+    help="Directory to write the generated tmx, tiles and distances files to.",
+    type=click.Path(file_okay=False),
+    default=DEFAULT_OUTPUT_DIRECTORY,
+)
+@click.option(
+    "--width",
+    help="Number of cells across the map.",
+    type=click.IntRange(min=MIN_SIZE, max=MAX_SIZE),
+    default=DEFAULT_SIZE,
+)
+@click.option(
+    "--height",
+    help="Number of cells down the map.",
+    type=click.IntRange(min=MIN_SIZE, max=MAX_SIZE),
+    default=DEFAULT_SIZE,
+)
+@click.option(
+    "--ports",
+    help="Number of ports to place.",
+    type=click.IntRange(min=1),
+    default=DEFAULT_PORTS,
+)
+@click.option(
+    "--cities",
+    help="Number of cities to place.",
+    type=click.IntRange(min=1),
+    default=DEFAULT_CITIES,
+)
+@click.option(
+    "--seed",
+    help="Seed of the generated world, which is the same for the same options.",
+    type=int,
+    default=DEFAULT_SEED,
+)
+def main(
+    distances_path: pathlib.Path,
+    tiles_path: pathlib.Path,
+    tile_images_directory: pathlib.Path,
+    output_directory: pathlib.Path,
+    width: int,
+    height: int,
+    ports: int,
+    cities: int,
+    seed: int,
+) -> None:
+    """
+    Generates a world of the given size, writing a tmx file with map and tracks
+    layers, the tile data extended with the generated locations, and the distances
+    of the generated track network.
+    """
+    world_data = data.Data(
+        distances_filename=distances_path,
+        tiles_filename=tiles_path,
+        port_limit=helper.PORT_LIMIT,
+    )
+    generator = WorldGenerator(
+        world_data=world_data,
+        width=width,
+        height=height,
+        seed=seed,
+    )
+    try:
+        generator.generate(port_count=ports, city_count=cities)
+    except ValueError as error:
+        raise click.UsageError(str(error)) from error
+    distances = generator.distances()
+    tiles = generator.tiles()
+
+    output_directory = pathlib.Path(output_directory)
+    output_directory.mkdir(parents=True, exist_ok=True)
+    write_tmx(
+        filename=output_directory / TMX_FILENAME,
+        tiles=tiles,
+        map_grid=generator.map_grid,
+        track_grid=generator.track_grid(),
+        tile_images_directory=pathlib.Path(tile_images_directory).resolve(),
+    )
+    for filename, content in (
+        (TILES_FILENAME, tiles),
+        (DISTANCES_FILENAME, distances),
+    ):
+        with open(output_directory / filename, "w", encoding="utf8") as file:
+            json.dump(content, file, indent=2, ensure_ascii=False)
+
+    connected_cities = {
+        city_distance["name"]
+        for city_distances in distances.values()
+        for city_distance in city_distances
+    }
+    click.echo(
+        f"Generated a {width}x{height} world with {len(distances)} of {ports} ports"
+        f" connected to {len(connected_cities)} of {cities} cities over"
+        f" {generator.track_count} tracks in {output_directory}."
+    )
+
+
+if __name__ == "__main__":
+    main()